@@ -0,0 +1,115 @@
+"""Local OpenAI-compatible chat completion server for load tests.
+
+Answers /v1/chat/completions with canned JSON shaped like what AIHealthService
+expects (genetic analysis, health plan or daily insight, picked from the
+prompt), after a delay of
+
+    latency + jitter + completion_tokens / tokens_per_second
+
+so the API under test sees realistic LLM wait times without calling OpenAI.
+
+    python benchmarks/fake_llm.py --port 8011 --latency-ms 400 --tokens-per-second 60
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+ANALYSIS = {
+    "risk_assessments": [
+        {"condition": "Cardiovascular Health", "risk_level": "moderate", "confidence_score": 75,
+         "genetic_factors": ["rs429358", "rs1801133"], "recommendations": ["Regular cardio exercise", "Mediterranean diet"]},
+        {"condition": "Type 2 Diabetes", "risk_level": "low", "confidence_score": 68,
+         "genetic_factors": ["rs1801282", "rs12255372"], "recommendations": ["Limit refined carbohydrates"]},
+    ],
+    "nutrition_insights": {"genetic_factors": ["MTHFR variant"], "recommendations": ["Folate-rich foods"],
+                           "foods_to_emphasize": ["Leafy greens", "Fish"], "foods_to_limit": ["Processed sugar"]},
+    "fitness_insights": {"genetic_factors": ["ACTN3", "ACE"], "optimal_exercise_types": ["HIIT training"],
+                         "recovery_recommendations": ["7-9 hours sleep"]},
+    "mental_wellness": {"stress_response_profile": "Moderate stress sensitivity",
+                        "sleep_optimization": ["Consistent schedule"], "cognitive_enhancement": ["Meditation"]},
+}
+
+PLAN = {
+    "title": "Personalized Plan",
+    "description": "A plan tailored to your genetic profile",
+    "objectives": ["Build consistent habits", "Support metabolic health"],
+    "weekly_plan": [{"week": week, "focus": "Foundation building", "actions": ["Track daily habits"],
+                     "metrics": ["Days completed"]} for week in range(1, 5)],
+    "key_recommendations": ["Eat whole foods", "Stay active"],
+    "success_tips": ["Plan ahead"],
+    "genetic_optimization": ["Focus on anti-inflammatory foods"],
+}
+
+INSIGHT = {
+    "title": "Daily Health Focus",
+    "message": "Consistent sleep supports your metabolism today.",
+    "action_items": ["Keep a regular bedtime"],
+    "genetic_connection": "Your circadian rhythm genes respond well to regularity",
+    "encouragement": "Small consistent changes add up!",
+}
+
+def create_app(latency_ms: float, jitter_ms: float, tokens_per_second: float, error_rate: float) -> FastAPI:
+    app = FastAPI(title="Fake LLM")
+    stats = {"requests": 0, "errors": 0, "completion_tokens": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        stats["requests"] += 1
+
+        if '"risk_assessments"' in prompt:
+            content = json.dumps(ANALYSIS)
+        elif '"weekly_plan"' in prompt:
+            content = json.dumps(PLAN)
+        else:
+            content = json.dumps(INSIGHT)
+
+        # Roughly four characters per token
+        prompt_tokens = sum(len(message["content"]) for message in body["messages"]) // 4
+        completion_tokens = len(content) // 4
+        delay = (latency_ms + random.uniform(0, jitter_ms)) / 1000 + completion_tokens / tokens_per_second
+        await asyncio.sleep(delay)
+
+        if random.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "Fake upstream failure", "type": "server_error"}}, status_code=500)
+
+        stats["completion_tokens"] += completion_tokens
+        return {
+            "id": f"chatcmpl-fake-{stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8011)
+    parser.add_argument('--latency-ms', type=float, default=400, help='time to first token')
+    parser.add_argument('--jitter-ms', type=float, default=200, help='extra uniform random latency')
+    parser.add_argument('--tokens-per-second', type=float, default=60, help='completion token rate')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that fail with 500')
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.jitter_ms, args.tokens_per_second, args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Seeded synthetic raw-data files in the formats the DNA parsers accept.
+
+Each writer produces ``lines`` genotype rows with the health-marker panel
+sprinkled through the file, so the same seed always gives the same file.
+"""
+import random
+from typing import Dict, Any
+
+CHROMOSOMES = [str(c) for c in range(1, 23)] + ['X', 'Y', 'MT']
+BASES = 'ACGT'
+
+# A panel marker every this many rows, so every part of the file has hits
+PANEL_EVERY = 50000
+
+def _rows(lines: int, seed: int, panel: Dict[str, Dict[str, Any]]):
+    """(rsid, chromosome, position, allele1, allele2, no-call) rows"""
+    rng = random.Random(seed)
+    panel_rsids = list(panel)
+    for i in range(lines):
+        if i % PANEL_EVERY == 0:
+            rsid = panel_rsids[(i // PANEL_EVERY) % len(panel_rsids)]
+            chromosome, position = panel[rsid]['chromosome'], panel[rsid]['position']
+        else:
+            rsid = f"rs{rng.randint(1, 999999999)}"
+            chromosome, position = rng.choice(CHROMOSOMES), rng.randint(1, 249000000)
+        yield rsid, chromosome, position, rng.choice(BASES), rng.choice(BASES), rng.random() < 0.01
+
+def write_23andme_file(path: str, lines: int, seed: int, panel: Dict[str, Dict[str, Any]]):
+    with open(path, 'w') as f:
+        f.write("# This data file generated by 23andMe\n# rsid\tchromosome\tposition\tgenotype\n")
+        for rsid, chromosome, position, a1, a2, no_call in _rows(lines, seed, panel):
+            f.write(f"{rsid}\t{chromosome}\t{position}\t{'--' if no_call else a1 + a2}\n")
+
+def write_ancestry_csv_file(path: str, lines: int, seed: int, panel: Dict[str, Dict[str, Any]]):
+    with open(path, 'w') as f:
+        f.write("rsid,chromosome,position,genotype\n")
+        for rsid, chromosome, position, a1, a2, no_call in _rows(lines, seed, panel):
+            f.write(f"{rsid},{chromosome},{position},{'--' if no_call else a1 + a2}\n")
+
+def write_vcf_file(path: str, lines: int, seed: int, panel: Dict[str, Dict[str, Any]]):
+    with open(path, 'w') as f:
+        f.write("##fileformat=VCFv4.2\n##source=genefit-bench\n##reference=GRCh37\n")
+        f.write('##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">\n')
+        f.write("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tSAMPLE\n")
+        for rsid, chromosome, position, ref, alt, no_call in _rows(lines, seed, panel):
+            alt = alt if alt != ref else BASES[(BASES.index(ref) + 1) % 4]
+            gt = './.' if no_call else f"{position % 2}/{(position >> 1) % 2}"
+            f.write(f"{chromosome}\t{position}\t{rsid}\t{ref}\t{alt}\t.\tPASS\t.\tGT\t{gt}\n")
+
+# Format name -> (file extension, writer)
+GENERATORS: Dict[str, tuple] = {
+    '23andme': ('.txt', write_23andme_file),
+    'ancestry': ('.csv', write_ancestry_csv_file),
+    'vcf': ('.vcf', write_vcf_file),
+}
@@ -0,0 +1,193 @@
+"""End-to-end check of live dashboard updates against a single-node replica set.
+
+Starts a throwaway single-node replica set mongod (unless --mongo-url is given),
+the fake LLM and server.py, opens /api/ws/dashboard/{user_id} for a new user
+and then makes the writes the dashboard used to poll for:
+
+    health_plans    POST /api/health-plans
+    ai_insights     POST /api/insights/daily/{user_id}
+    wearable_data   POST /api/wearables/sync/{user_id} (--syncs times, pushed as one summary)
+    dna_reports     POST /api/dna/upload, then every status change until analyzed
+
+Reports the delay from each write returning to its delta arriving, and exits
+non-zero if an expected delta doesn't arrive within --timeout.
+
+    python benchmarks/live_updates_check.py --syncs 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import httpx
+import websockets
+from pymongo import MongoClient
+
+from services.dna_service import DNAAnalysisService
+from benchmarks.genomes import write_23andme_file
+from benchmarks.load_test import free_port, start_mongod, wait_for
+
+class Deltas:
+    """Messages received on the socket, with arrival times"""
+
+    def __init__(self):
+        self.messages: List[Dict[str, Any]] = []
+        self.arrived = asyncio.Condition()
+
+    async def listen(self, socket):
+        async for raw in socket:
+            message = json.loads(raw)
+            message['received_at'] = time.perf_counter()
+            async with self.arrived:
+                self.messages.append(message)
+                self.arrived.notify_all()
+
+    async def wait_for(self, predicate, timeout: float) -> Dict[str, Any]:
+        async with self.arrived:
+            await asyncio.wait_for(
+                self.arrived.wait_for(lambda: any(predicate(m) for m in self.messages)), timeout
+            )
+            return next(m for m in self.messages if predicate(m))
+
+async def run_check(base_url: str, args, genome: bytes) -> Dict[str, float]:
+    delays = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+        response = await client.post('/api/users', json={
+            'email': f"livecheck-{os.getpid()}@example.com", 'name': 'Live Check', 'age': 40, 'gender': 'other',
+        })
+        response.raise_for_status()
+        user_id = response.json()['id']
+
+        ws_url = base_url.replace('http', 'ws', 1) + f"/api/ws/dashboard/{user_id}"
+        async with websockets.connect(ws_url) as socket:
+            deltas = Deltas()
+            listener = asyncio.create_task(deltas.listen(socket))
+            try:
+                # Let the subscription register before writing
+                await asyncio.sleep(0.2)
+
+                plan = (await client.post('/api/health-plans', json={'user_id': user_id, 'plan_type': 'fitness'})).json()
+                returned = time.perf_counter()
+                message = await deltas.wait_for(lambda m: m['type'] == 'health_plans' and m['data'].get('id') == plan['id'], args.timeout)
+                delays['health_plans'] = max(0.0, message['received_at'] - returned)
+
+                (await client.post(f'/api/insights/daily/{user_id}')).raise_for_status()
+                returned = time.perf_counter()
+                message = await deltas.wait_for(lambda m: m['type'] == 'ai_insights', args.timeout)
+                delays['ai_insights'] = max(0.0, message['received_at'] - returned)
+
+                for i in range(args.syncs):
+                    (await client.post(f'/api/wearables/sync/{user_id}', json={
+                        'device_name': 'Live Check Watch', 'steps': 100 * (i + 1), 'heart_rate': 70,
+                    })).raise_for_status()
+                returned = time.perf_counter()
+                message = await deltas.wait_for(lambda m: m['type'] == 'wearable_data', args.timeout)
+                summaries = [m for m in deltas.messages if m['type'] == 'wearable_data']
+                delays['wearable_data'] = max(0.0, message['received_at'] - returned)
+                print(f"wearable_data: {args.syncs * 2} samples arrived as {len(summaries)} summary message(s)")
+
+                response = await client.post(
+                    '/api/dna/upload',
+                    data={'user_id': user_id, 'provider': '23andme'},
+                    files={'file': ('genome.txt', genome, 'text/plain')},
+                )
+                response.raise_for_status()
+                report_id = response.json()['id']
+                returned = time.perf_counter()
+                message = await deltas.wait_for(
+                    lambda m: m['type'] == 'dna_reports' and m['data'].get('id') == report_id
+                    and m['data'].get('analysis_status') in ('analyzed', 'failed'),
+                    args.timeout,
+                )
+                statuses = [m['data'].get('analysis_status') for m in deltas.messages
+                            if m['type'] == 'dna_reports' and m['data'].get('id') == report_id]
+                print(f"dna_reports: {' -> '.join(statuses)} in {message['received_at'] - returned:.2f}s")
+                if message['data']['analysis_status'] != 'analyzed':
+                    sys.exit(f"DNA analysis failed: {message['data'].get('error_message')}")
+            finally:
+                listener.cancel()
+
+            largest = max(len(json.dumps({k: v for k, v in m.items() if k != 'received_at'})) for m in deltas.messages)
+            print(f"{len(deltas.messages)} messages, largest {largest} bytes")
+            if any(m['type'] == 'resync' for m in deltas.messages):
+                print("warning: server asked for a resync during the check")
+    return delays
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--syncs', type=int, default=10, help='wearable syncs to send back to back')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds to wait for each delta')
+    parser.add_argument('--genome-lines', type=int, default=5000, help='rows in the uploaded synthetic genome')
+    parser.add_argument('--mongo-url', help='use this replica set instead of starting a throwaway mongod')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    processes = []
+    mongod_dbpath = None
+    db_name = f"genefit_livecheck_{os.getpid()}"
+    try:
+        mongo_url = args.mongo_url
+        if not mongo_url:
+            data_root = Path('/dev/shm') if Path('/dev/shm').is_dir() else Path(tempfile.gettempdir())
+            mongod, mongo_url, mongod_dbpath = start_mongod(data_root, replica_set=True)
+            processes.append(mongod)
+
+        llm_port = free_port()
+        processes.append(subprocess.Popen([
+            sys.executable, str(BACKEND_DIR / 'benchmarks' / 'fake_llm.py'), '--port', str(llm_port), '--latency-ms', '50',
+        ]))
+        wait_for(f"http://127.0.0.1:{llm_port}/stats")
+
+        api_port = free_port()
+        processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'server:app', '--port', str(api_port), '--log-level', 'warning'],
+            cwd=BACKEND_DIR,
+            env={
+                **os.environ,
+                'MONGO_URL': mongo_url,
+                'DB_NAME': db_name,
+                'OPENAI_API_KEY': 'livecheck',
+                'LLM_BASE_URL': f"http://127.0.0.1:{llm_port}/v1",
+            },
+        ))
+        base_url = f"http://127.0.0.1:{api_port}"
+        wait_for(f"{base_url}/api/")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            genome_path = os.path.join(tmp, 'genome.txt')
+            write_23andme_file(genome_path, args.genome_lines, args.seed, DNAAnalysisService(parse_workers=1).health_markers)
+            genome = Path(genome_path).read_bytes()
+
+        try:
+            delays = asyncio.run(run_check(base_url, args, genome))
+        except asyncio.TimeoutError:
+            sys.exit(f"An expected delta did not arrive within {args.timeout:.0f}s")
+
+        for collection, delay in delays.items():
+            print(f"{collection:<14} delta {delay * 1000:>8.1f} ms after the write returned")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if args.mongo_url:
+            # Leave a shared database as we found it
+            with MongoClient(args.mongo_url) as client:
+                client.drop_database(db_name)
+        if mongod_dbpath:
+            shutil.rmtree(mongod_dbpath, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""End-to-end load test of the API against local MongoDB and a fake LLM.
+
+Starts benchmarks/fake_llm.py and server.py (under uvicorn) as subprocesses.
+Unless --mongo-url is given it also starts a throwaway single-node replica set
+mongod with its data directory on tmpfs (/dev/shm) when available. N virtual
+users then each create an account and replay a weighted mix of actions until
+--duration runs out:
+
+    upload          POST /api/dna/upload with a synthetic 23andMe file
+    dashboard       GET  /api/dashboard/{user_id}
+    plan            POST /api/health-plans
+    wearable_sync   POST /api/wearables/sync/{user_id}
+    wearables       GET  /api/wearables/{user_id}?resolution=hourly
+    reports         GET  /api/dna/reports/{user_id}
+
+Per endpoint it reports request count, throughput, p50/p95/p99 latency and
+errors (429 admission rejections are counted separately).
+
+    python benchmarks/load_test.py --users 50 --duration 60 --mix dashboard=6,wearable_sync=3,plan=1,upload=1
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import httpx
+from pymongo import MongoClient
+
+from models.health import PlanType
+from services.dna_service import DNAAnalysisService
+from benchmarks.genomes import write_23andme_file
+
+DEFAULT_MIX = "dashboard=6,wearable_sync=3,wearables=2,reports=2,plan=1,upload=1"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_mongod(data_root: Path, replica_set: bool) -> tuple:
+    """Throwaway mongod; returns (process, connection URL, data directory)"""
+    mongod = shutil.which('mongod')
+    if not mongod:
+        sys.exit("mongod not found on PATH; install MongoDB or pass --mongo-url")
+
+    dbpath = Path(tempfile.mkdtemp(prefix='genefit-loadtest-', dir=data_root))
+    port = free_port()
+    command = [mongod, '--dbpath', str(dbpath), '--port', str(port), '--bind_ip', '127.0.0.1', '--quiet']
+    if replica_set:
+        command += ['--replSet', 'loadtest']
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+    url = f"mongodb://127.0.0.1:{port}/?directConnection=true"
+    client = MongoClient(url, serverSelectionTimeoutMS=20000)
+    client.admin.command('ping')
+    if replica_set:
+        # Transactions (the DNA analysis unit of work) need a replica set
+        client.admin.command('replSetInitiate', {'_id': 'loadtest', 'members': [{'_id': 0, 'host': f"127.0.0.1:{port}"}]})
+        while not client.admin.command('hello').get('isWritablePrimary'):
+            time.sleep(0.2)
+    client.close()
+    return process, url, dbpath
+
+def wait_for(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    sys.exit(f"{url} did not come up within {timeout:.0f}s")
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ACTIONS:
+            sys.exit(f"Unknown action {name!r}; choose from {', '.join(ACTIONS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+class Recorder:
+    """Latencies and outcomes per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+
+    async def call(self, endpoint: str, request) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            return None
+        self.latencies.setdefault(endpoint, []).append(time.perf_counter() - start)
+        if response.status_code == 429:
+            self.rejected[endpoint] = self.rejected.get(endpoint, 0) + 1
+        elif response.status_code >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return response
+
+    def summary(self, duration: float) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            latencies = sorted(self.latencies.get(endpoint, []))
+            results[endpoint] = {
+                'requests': len(latencies),
+                'per_second': round(len(latencies) / duration, 2),
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'errors': self.errors.get(endpoint, 0),
+                'rejected': self.rejected.get(endpoint, 0),
+            }
+        return results
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile, in milliseconds"""
+    if not sorted_values:
+        return None
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return round(sorted_values[rank] * 1000, 1)
+
+async def upload(client, recorder, user_id, rng, genome):
+    await recorder.call('POST /dna/upload', client.post(
+        '/api/dna/upload',
+        data={'user_id': user_id, 'provider': '23andme'},
+        files={'file': ('genome.txt', genome, 'text/plain')},
+    ))
+
+async def dashboard(client, recorder, user_id, rng, genome):
+    await recorder.call('GET /dashboard', client.get(f'/api/dashboard/{user_id}'))
+
+async def plan(client, recorder, user_id, rng, genome):
+    await recorder.call('POST /health-plans', client.post(
+        '/api/health-plans', json={'user_id': user_id, 'plan_type': rng.choice(list(PlanType)).value}
+    ))
+
+async def wearable_sync(client, recorder, user_id, rng, genome):
+    await recorder.call('POST /wearables/sync', client.post(f'/api/wearables/sync/{user_id}', json={
+        'device_name': 'Load Test Watch',
+        'steps': rng.randint(0, 2000),
+        'heart_rate': rng.randint(55, 160),
+        'calories': rng.randint(0, 300),
+        'active_minutes': rng.randint(0, 30),
+    }))
+
+async def wearables(client, recorder, user_id, rng, genome):
+    await recorder.call('GET /wearables', client.get(f'/api/wearables/{user_id}', params={'resolution': 'hourly'}))
+
+async def reports(client, recorder, user_id, rng, genome):
+    await recorder.call('GET /dna/reports', client.get(f'/api/dna/reports/{user_id}'))
+
+ACTIONS = {
+    'upload': upload,
+    'dashboard': dashboard,
+    'plan': plan,
+    'wearable_sync': wearable_sync,
+    'wearables': wearables,
+    'reports': reports,
+}
+
+async def virtual_user(index: int, client: httpx.AsyncClient, recorder: Recorder, mix: Dict[str, float],
+                       genome: bytes, stop_at: float, think_ms: float, seed: int):
+    rng = random.Random(seed + index)
+    response = await recorder.call('POST /users', client.post('/api/users', json={
+        'email': f"loadtest-{seed}-{index}@example.com",
+        'name': f"Load Test {index}",
+        'age': rng.randint(20, 75),
+        'gender': rng.choice(['male', 'female', 'other']),
+    }))
+    if response is None or response.status_code != 200:
+        return
+    user_id = response.json()['id']
+
+    names = list(mix)
+    weights = list(mix.values())
+    while time.monotonic() < stop_at:
+        action = rng.choices(names, weights)[0]
+        await ACTIONS[action](client, recorder, user_id, rng, genome)
+        if think_ms:
+            # Exponential think time keeps arrivals from synchronising
+            await asyncio.sleep(rng.expovariate(1000 / think_ms))
+
+async def run_load(base_url: str, args, genome: bytes) -> Dict[str, Any]:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        started = time.monotonic()
+        stop_at = started + args.duration
+        mix = parse_mix(args.mix)
+        await asyncio.gather(*(
+            virtual_user(i, client, recorder, mix, genome, stop_at, args.think_ms, args.seed)
+            for i in range(args.users)
+        ))
+        duration = time.monotonic() - started
+    return {'duration': round(duration, 2), 'endpoints': recorder.summary(duration)}
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n{'endpoint':<22} {'requests':>9} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'429s':>6}")
+    total = 0
+    for endpoint, stats in report['endpoints'].items():
+        total += stats['requests']
+        print(f"{endpoint:<22} {stats['requests']:>9} {stats['per_second']:>8.1f} "
+              f"{stats['p50_ms'] or 0:>9.1f} {stats['p95_ms'] or 0:>9.1f} {stats['p99_ms'] or 0:>9.1f} "
+              f"{stats['errors']:>7} {stats['rejected']:>6}")
+    print(f"{'total':<22} {total:>9} {total / report['duration']:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load after sign-up')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='action=weight pairs')
+    parser.add_argument('--think-ms', type=float, default=200, help='mean pause between a user\'s actions')
+    parser.add_argument('--timeout', type=float, default=120, help='per-request timeout in seconds')
+    parser.add_argument('--genome-lines', type=int, default=20000, help='rows in the uploaded synthetic genome')
+    parser.add_argument('--mongo-url', help='use this MongoDB instead of starting a throwaway mongod')
+    parser.add_argument('--standalone-mongo', action='store_true', help='start mongod without a replica set (no transactions)')
+    parser.add_argument('--server-workers', type=int, default=1, help='uvicorn worker processes')
+    parser.add_argument('--llm-latency-ms', type=float, default=400)
+    parser.add_argument('--llm-jitter-ms', type=float, default=200)
+    parser.add_argument('--llm-tokens-per-second', type=float, default=60)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=Path, help='also write the report as JSON')
+    args = parser.parse_args()
+    parse_mix(args.mix)
+
+    processes = []
+    mongod_dbpath = None
+    db_name = f"genefit_loadtest_{os.getpid()}"
+    try:
+        mongo_url = args.mongo_url
+        if not mongo_url:
+            data_root = Path('/dev/shm') if Path('/dev/shm').is_dir() else Path(tempfile.gettempdir())
+            mongod, mongo_url, mongod_dbpath = start_mongod(data_root, not args.standalone_mongo)
+            processes.append(mongod)
+
+        llm_port = free_port()
+        processes.append(subprocess.Popen([
+            sys.executable, str(BACKEND_DIR / 'benchmarks' / 'fake_llm.py'), '--port', str(llm_port),
+            '--latency-ms', str(args.llm_latency_ms), '--jitter-ms', str(args.llm_jitter_ms),
+            '--tokens-per-second', str(args.llm_tokens_per_second), '--error-rate', str(args.llm_error_rate),
+        ]))
+        wait_for(f"http://127.0.0.1:{llm_port}/stats")
+
+        api_port = free_port()
+        processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'server:app', '--port', str(api_port),
+             '--workers', str(args.server_workers), '--log-level', 'warning'],
+            cwd=BACKEND_DIR,
+            env={
+                **os.environ,
+                'MONGO_URL': mongo_url,
+                'DB_NAME': db_name,
+                'OPENAI_API_KEY': 'loadtest',
+                'LLM_BASE_URL': f"http://127.0.0.1:{llm_port}/v1",
+            },
+        ))
+        base_url = f"http://127.0.0.1:{api_port}"
+        wait_for(f"{base_url}/api/")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            genome_path = os.path.join(tmp, 'genome.txt')
+            write_23andme_file(genome_path, args.genome_lines, args.seed, DNAAnalysisService(parse_workers=1).health_markers)
+            genome = Path(genome_path).read_bytes()
+
+        print(f"{args.users} users for {args.duration:.0f}s against {base_url} (mix {args.mix})")
+        report = asyncio.run(run_load(base_url, args, genome))
+        report['llm'] = httpx.get(f"http://127.0.0.1:{llm_port}/stats").json()
+        report['config'] = {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()}
+
+        print_report(report)
+        print(f"\nFake LLM: {report['llm']['requests']} requests, {report['llm']['completion_tokens']:,} completion tokens")
+        if args.output:
+            args.output.write_text(json.dumps(report, indent=2) + '\n')
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if args.mongo_url:
+            # Leave a shared database as we found it
+            with MongoClient(args.mongo_url) as client:
+                client.drop_database(db_name)
+        if mongod_dbpath:
+            shutil.rmtree(mongod_dbpath, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Scaling curve for parallel intra-file parsing of a large genotype file.
+
+Generates a seeded synthetic 23andMe-style file, then parses it with 1, 2, 4 ...
+worker processes (up to the core count) and reports wall time, throughput and
+speedup over the single-process parser.
+
+    python benchmarks/parallel_parse_bench.py --lines 5000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import services.dna_service as dna_service_module
+from services.dna_service import DNAAnalysisService
+from benchmarks.genomes import write_23andme_file
+
+def worker_counts(max_workers: int):
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=1_000_000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per worker count (best is reported)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # Force the parallel path regardless of file size
+    dna_service_module.PARALLEL_PARSE_MIN_BYTES = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'genome.txt')
+        write_23andme_file(path, args.lines, args.seed, DNAAnalysisService().health_markers)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{args.lines} lines, {size_mb:.1f} MB")
+        print(f"{'workers':>8} {'seconds':>9} {'lines/s':>12} {'speedup':>8}")
+
+        baseline = None
+        for workers in worker_counts(args.max_workers):
+            service = DNAAnalysisService(parse_workers=workers)
+            # Warm the pool so process start-up isn't counted
+            service._parse_file(path, 'genome.txt', None)
+
+            best = float('inf')
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                service._parse_file(path, 'genome.txt', None)
+                best = min(best, time.perf_counter() - start)
+
+            baseline = baseline or best
+            print(f"{workers:>8} {best:>9.2f} {args.lines / best:>12,.0f} {baseline / best:>7.2f}x")
+
+            service.close()
+
+if __name__ == '__main__':
+    main()
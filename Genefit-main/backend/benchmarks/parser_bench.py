@@ -0,0 +1,165 @@
+"""Parser and scoring benchmarks with JSON baselines and a regression gate.
+
+For every format (23andMe TSV, AncestryDNA CSV, VCF) and size, generates a
+seeded synthetic file and measures throughput and peak Python heap (via
+tracemalloc, in a separate untimed run) of:
+
+    process_dna_file            end to end, single process
+    _parse_<format>_format      the format parser over the mapped file
+    _filter_health_markers      panel matching and annotation
+    get_genetic_summary         summary over the panel hits
+
+    python benchmarks/parser_bench.py --save-baseline
+    python benchmarks/parser_bench.py --sizes 600k --threshold 0.15
+
+With a baseline present, any case whose throughput drops (or peak memory
+grows) by more than the threshold is reported and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.dna import DNAProvider
+from services.dna_service import DNAAnalysisService
+from benchmarks.genomes import GENERATORS
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baselines' / 'parser_bench.json'
+
+PARSERS = {
+    '23andme': '_parse_23andme_format',
+    'ancestry': '_parse_csv_format',
+    'vcf': '_parse_vcf_format',
+}
+
+def parse_size(value: str) -> int:
+    """600k / 1m / 5000000 -> line count"""
+    value = value.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(value[-1], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+def measure(fn: Callable[[], Any], repeat: int) -> Tuple[float, float]:
+    """(best seconds over repeat runs, peak traced heap in MB from one extra run)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1e6
+
+def bench_file(service: DNAAnalysisService, fmt: str, path: str, lines: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    name = os.path.basename(path)
+    parser = getattr(service, PARSERS[fmt])
+
+    def parse():
+        with open(path, 'rb') as raw, service._open_lines(raw, name) as (file_lines, _):
+            return parser(file_lines)
+
+    markers = parse()
+    health_markers = service._filter_health_markers(parse())
+
+    cases = {
+        'process_dna_file': (lambda: asyncio.run(service.process_dna_file(path, name, DNAProvider.GENERIC)), lines),
+        PARSERS[fmt]: (parse, lines),
+        '_filter_health_markers': (lambda: service._filter_health_markers(markers), len(markers)),
+        # The summary only ever sees panel hits, so loop it to get a measurable time
+        'get_genetic_summary': (lambda: [service.get_genetic_summary(health_markers) for _ in range(1000)], 1000),
+    }
+
+    results = {}
+    for case, (fn, items) in cases.items():
+        seconds, peak_mb = measure(fn, repeat)
+        results[case] = {'seconds': round(seconds, 6), 'per_second': round(items / seconds, 1), 'peak_mb': round(peak_mb, 2)}
+    return results
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """Cases that got slower or hungrier than the baseline by more than threshold"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        if current['per_second'] < previous['per_second'] * (1 - threshold):
+            regressions.append(f"{key}: throughput {previous['per_second']:,.0f} -> {current['per_second']:,.0f}/s")
+        if current['peak_mb'] > previous['peak_mb'] * (1 + threshold) and current['peak_mb'] - previous['peak_mb'] > 1:
+            regressions.append(f"{key}: peak memory {previous['peak_mb']:.1f} -> {current['peak_mb']:.1f} MB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--formats', default=','.join(GENERATORS), help='comma-separated formats')
+    parser.add_argument('--sizes', default='600k,1m,5m', help='comma-separated line counts (k/m suffixes allowed)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case (best is reported)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='write these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed regression as a fraction')
+    parser.add_argument('--data-dir', type=Path, help='keep generated files here and reuse them across runs')
+    args = parser.parse_args()
+
+    service = DNAAnalysisService(parse_workers=1)
+    formats = args.formats.split(',')
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+
+    tmp = None
+    data_dir = args.data_dir
+    if data_dir is None:
+        tmp = tempfile.TemporaryDirectory()
+        data_dir = Path(tmp.name)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    results = {}
+    print(f"{'case':<56} {'seconds':>9} {'per second':>14} {'peak MB':>9}")
+    try:
+        for fmt in formats:
+            extension, write = GENERATORS[fmt]
+            for lines in sizes:
+                path = data_dir / f"{fmt}-{lines}-{args.seed}{extension}"
+                if not path.exists():
+                    write(str(path), lines, args.seed, service.health_markers)
+
+                for case, result in bench_file(service, fmt, str(path), lines, args.repeat).items():
+                    key = f"{fmt}/{lines}/{case}"
+                    results[key] = result
+                    print(f"{key:<56} {result['seconds']:>9.3f} {result['per_second']:>14,.0f} {result['peak_mb']:>9.1f}")
+    finally:
+        if tmp:
+            tmp.cleanup()
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({
+            'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+            'results': results,
+        }, indent=2, sort_keys=True) + '\n')
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    regressions = compare(results, json.loads(args.baseline.read_text())['results'], args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == '__main__':
+    main()
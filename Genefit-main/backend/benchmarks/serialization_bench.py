@@ -0,0 +1,151 @@
+"""Microbenchmark: per-endpoint response serialization cost, legacy vs fast path.
+
+Legacy mirrors what the endpoints used to do: build a pydantic ``*Response``
+per document (or strip ``_id`` with a dict comprehension), then let FastAPI
+validate against ``response_model`` and run ``jsonable_encoder`` + ``json.dumps``.
+Fast is the current path: plain dicts encoded straight to bytes with orjson.
+
+    python benchmarks/serialization_bench.py --docs 1000 --repeat 20
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from models.dna import DNAReportResponse, DNAProvider, AnalysisStatus, DNA_REPORT_RESPONSE_FIELDS
+from models.health import HealthPlanResponse, PlanType, HEALTH_PLAN_RESPONSE_FIELDS
+from services.serialization import encode_json, select_fields
+
+def make_dna_reports(rng: random.Random, n: int) -> List[Dict[str, Any]]:
+    now = datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "user_id": "bench-user",
+        "filename": f"genome_{i}.txt",
+        "provider": rng.choice(list(DNAProvider)).value,
+        "file_size": rng.randint(5_000_000, 30_000_000),
+        "analysis_status": rng.choice(list(AnalysisStatus)).value,
+        "markers_analyzed": 847,
+        "total_markers": 900,
+        "uploaded_at": now - timedelta(minutes=i),
+        "analyzed_at": now - timedelta(minutes=i - 1),
+        "error_message": None,
+    } for i in range(n)]
+
+def make_health_plans(rng: random.Random, n: int) -> List[Dict[str, Any]]:
+    now = datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "user_id": "bench-user",
+        "plan_type": rng.choice(list(PlanType)).value,
+        "title": f"Plan {i}",
+        "description": "A balanced approach to nutrition based on your genetic profile",
+        "progress": rng.random() * 100,
+        "is_active": True,
+        "created_at": now - timedelta(hours=i),
+    } for i in range(n)]
+
+def make_insights(rng: random.Random, n: int) -> List[Dict[str, Any]]:
+    now = datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "user_id": "bench-user",
+        "insight_type": "daily_tip",
+        "title": "Daily Health Focus",
+        "content": "Your genetic profile suggests focusing on consistent sleep patterns.",
+        "confidence_score": 85.0,
+        "genetic_basis": ["circadian rhythm genes", "metabolism genes"],
+        "actionable": True,
+        "priority": "medium",
+        "created_at": now - timedelta(hours=i),
+        "expires_at": None,
+    } for i in range(n)]
+
+def make_wearables(rng: random.Random, n: int) -> List[Dict[str, Any]]:
+    now = datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "user_id": "bench-user",
+        "device_name": "Apple Watch",
+        "data_type": "heart_rate",
+        "value": float(rng.randint(55, 150)),
+        "unit": "bpm",
+        "recorded_at": now - timedelta(minutes=i),
+        "synced_at": now,
+    } for i in range(n)]
+
+def strip_id(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in doc.items() if k != '_id'}
+
+def legacy_model_list(model, build: Callable[[Dict[str, Any]], Any]):
+    adapter = TypeAdapter(List[model])
+
+    def run(docs):
+        items = [build(doc) for doc in docs]
+        # FastAPI re-validates against response_model before encoding
+        validated = adapter.validate_python(items, from_attributes=True)
+        return json.dumps(jsonable_encoder(validated)).encode('utf-8')
+    return run
+
+def legacy_raw_list(docs):
+    return json.dumps(jsonable_encoder([strip_id(doc) for doc in docs])).encode('utf-8')
+
+def fast_fields(fields: Dict[str, Any]):
+    def run(docs):
+        return encode_json([select_fields(doc, fields) for doc in docs])
+    return run
+
+def fast_raw_list(docs):
+    # Read paths project out _id in the query, so the documents arrive clean
+    return encode_json(docs)
+
+def time_call(fn: Callable, docs, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(docs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=1000, help='documents per response')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per case (best is reported)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = [
+        ("GET /dna/reports", make_dna_reports(rng, args.docs),
+         legacy_model_list(DNAReportResponse, lambda r: DNAReportResponse(**strip_id(r))), fast_fields(DNA_REPORT_RESPONSE_FIELDS)),
+        ("GET /health-plans", make_health_plans(rng, args.docs),
+         legacy_model_list(HealthPlanResponse, lambda p: HealthPlanResponse(**strip_id(p))), fast_fields(HEALTH_PLAN_RESPONSE_FIELDS)),
+        ("GET /insights", make_insights(rng, args.docs), legacy_raw_list, fast_raw_list),
+        ("GET /wearables", make_wearables(rng, args.docs), legacy_raw_list, fast_raw_list),
+    ]
+
+    print(f"{'endpoint':<20} {'legacy us/doc':>14} {'fast us/doc':>12} {'speedup':>8}")
+    for name, docs, legacy, fast in cases:
+        fast_docs = [strip_id(doc) for doc in docs]
+        legacy_time = time_call(legacy, docs, args.repeat)
+        fast_time = time_call(fast, fast_docs, args.repeat)
+        print(f"{name:<20} {legacy_time / args.docs * 1e6:>14.2f} {fast_time / args.docs * 1e6:>12.2f} "
+              f"{legacy_time / fast_time:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
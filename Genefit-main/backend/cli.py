@@ -0,0 +1,348 @@
+import asyncio
+import csv
+import json
+import multiprocessing
+import os
+import logging
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from models.dna import AnalysisStatus, DNAProvider, GeneticMarker
+from models.health import HealthExportSource
+from services.ai_service import AIHealthService
+from services.analysis_pipeline import DNAAnalysisPipeline
+from services.dna_service import DNAAnalysisService, _reanalyze_worker
+from services.cohort_import import CohortImporter
+from services.retention import RetentionPolicy, RetentionService
+from services.versioning import ResourceVersions, user_key
+from services.wearable_service import WearableService
+from services.import_service import HealthExportImporter
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = typer.Typer(name="genefit", help="GeneFit AI offline tools")
+
+def get_db():
+    """Connect to the same MongoDB database as the API server"""
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    return client, client[os.environ['DB_NAME']]
+
+@app.command("import-health-export")
+def import_health_export(
+    user_id: str = typer.Argument(..., help="User to import samples for"),
+    path: Path = typer.Argument(..., exists=True, dir_okay=False, help="export.xml, Takeout JSON or a .zip of either"),
+    source: HealthExportSource = typer.Option(HealthExportSource.APPLE_HEALTH, help="Export format"),
+    batch_size: int = typer.Option(5000, help="Samples per insert_many batch"),
+):
+    """Stream an Apple Health / Google Fit export into wearable storage"""
+    async def run():
+        client, db = get_db()
+        try:
+            wearable_service = WearableService(db)
+            await wearable_service.ensure_indexes()
+            importer = HealthExportImporter(wearable_service, batch_size=batch_size)
+
+            async def report(imported, batches):
+                typer.echo(f"\r{imported} samples imported ({batches} batches)", nl=False)
+
+            imported = await importer.import_file(str(path), user_id, source, report)
+            typer.echo(f"\nImported {imported} samples for user {user_id}")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+def load_checkpoint(path: Path, query_key: str, restart: bool) -> Dict[str, Any]:
+    """Progress of an earlier run over the same filter, or a fresh state"""
+    state = {"query": query_key, "last_id": None, "failed_ids": [], "reports": 0, "genotypes": 0, "unchanged": 0, "renarrated": 0, "skipped": 0, "failed": 0}
+    if restart or not path.exists():
+        return state
+
+    saved = json.loads(path.read_text())
+    if saved.get("query") != query_key:
+        raise typer.BadParameter(f"{path} was written for a different filter; pass --restart to discard it")
+    return {**state, **saved}
+
+def save_checkpoint(path: Path, state: Dict[str, Any]):
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(state))
+    os.replace(tmp_path, path)
+
+async def iter_report_batches(db, query: Dict[str, Any], after_id: Optional[str], batch_size: int, retry_ids: List[str] = ()):
+    """Batches of reports in ID order, each with its retained genotype table attached
+
+    Reports that failed in an earlier run (retry_ids) come first, then those after after_id.
+    """
+    projection = {"_id": 0, "id": 1, "user_id": 1, "filename": 1, "provider": 1, "genetic_markers": 1}
+    queries = []
+    if retry_ids:
+        queries.append({**query, "id": {"$in": list(retry_ids)}})
+    queries.append({**query, "id": {"$gt": after_id}} if after_id else query)
+
+    for batch_query in queries:
+        batch = []
+        async for report in db.dna_reports.find(batch_query, projection).sort("id", 1):
+            batch.append(report)
+            if len(batch) == batch_size:
+                yield await attach_genotypes(db, batch)
+                batch = []
+        if batch:
+            yield await attach_genotypes(db, batch)
+
+async def attach_genotypes(db, reports: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    chunks: Dict[str, List[bytes]] = {}
+    async for chunk in db.dna_genotypes.find(
+        {"dna_report_id": {"$in": [report["id"] for report in reports]}}, {"_id": 0}
+    ).sort([("dna_report_id", 1), ("seq", 1)]):
+        chunks.setdefault(chunk["dna_report_id"], []).append(chunk["data"])
+
+    for report in reports:
+        report["genotypes"] = b''.join(chunks[report["id"]]) if report["id"] in chunks else None
+    return reports
+
+@app.command("reanalyze")
+def reanalyze(
+    user_id: Optional[List[str]] = typer.Option(None, "--user-id", help="Only these users' reports (repeatable)"),
+    provider: Optional[DNAProvider] = typer.Option(None, help="Only reports from this provider"),
+    stale_only: bool = typer.Option(False, help="Only reports scored against an older marker panel"),
+    workers: int = typer.Option(os.cpu_count() or 1, help="Parser processes"),
+    batch_size: int = typer.Option(20, help="Reports per worker task"),
+    narrate: bool = typer.Option(True, help="Re-run AI analysis for reports whose markers changed"),
+    llm_concurrency: int = typer.Option(4, help="Concurrent AI analyses when narrating"),
+    checkpoint: Path = typer.Option(Path("reanalyze.checkpoint.json"), help="Progress file used to resume an interrupted run"),
+    restart: bool = typer.Option(False, help="Ignore an existing checkpoint and start over"),
+):
+    """Re-run parsing, scoring and summary over stored DNA reports across processes"""
+    async def run():
+        client, db = get_db()
+        dna_service = DNAAnalysisService(parse_workers=1)
+        pipeline = DNAAnalysisPipeline(client, db, AIHealthService(), dna_service)
+
+        query: Dict[str, Any] = {"analysis_status": AnalysisStatus.ANALYZED}
+        if user_id:
+            query["user_id"] = {"$in": user_id}
+        if provider:
+            query["provider"] = provider
+        if stale_only:
+            query["panel_version"] = {"$ne": dna_service.panel_version}
+
+        state = load_checkpoint(checkpoint, json.dumps(query, sort_keys=True), restart)
+        if state["last_id"]:
+            typer.echo(f"Resuming after report {state['last_id']} ({state['reports']} already done, {len(state['failed_ids'])} to retry)")
+
+        remaining = await db.dna_reports.count_documents(
+            {**query, "id": {"$gt": state["last_id"]}} if state["last_id"] else query
+        ) + len(state["failed_ids"])
+        typer.echo(f"{remaining} reports to reanalyze with {workers} workers")
+
+        loop = asyncio.get_running_loop()
+        llm_slots = asyncio.Semaphore(llm_concurrency)
+        started = time.perf_counter()
+        done = 0
+
+        async def renarrate(report, markers) -> bool:
+            async with llm_slots:
+                try:
+                    await pipeline.renarrate(report, [GeneticMarker(**marker) for marker in markers])
+                    state["renarrated"] += 1
+                    return True
+                except Exception as e:
+                    logger.error(f"Re-narration failed for report {report['id']}: {e}")
+                    state["failed"] += 1
+                    return False
+
+        async def finish(batch, future):
+            nonlocal done
+            results = await future
+
+            updates = []
+            updated_users = []
+            changed = []
+            tasks = []
+            failed_ids = []
+            for report, result in zip(batch, results):
+                if result is None:
+                    state["failed"] += 1
+                    failed_ids.append(report["id"])
+                    continue
+                markers, summary, parsed = result
+                state["genotypes"] += parsed
+
+                before = {marker["rsid"]: marker for marker in report.get("genetic_markers", [])}
+                if {marker["rsid"]: marker for marker in markers} == before:
+                    updates.append(UpdateOne(
+                        {"id": report["id"]},
+                        {"$set": {
+                            "genetic_summary": summary,
+                            "total_markers": len(dna_service.health_markers),
+                            "panel_version": dna_service.panel_version,
+                        }}
+                    ))
+                    updated_users.append(report["user_id"])
+                    state["unchanged"] += 1
+                elif narrate:
+                    changed.append(report)
+                    tasks.append(renarrate(report, markers))
+                else:
+                    state["skipped"] += 1
+
+            if updates:
+                await db.dna_reports.bulk_write(updates, ordered=False)
+                await ResourceVersions(db).bump_many(map(user_key, updated_users), "dna_reports")
+            for report, renarrated in zip(changed, await asyncio.gather(*tasks)):
+                if not renarrated:
+                    failed_ids.append(report["id"])
+
+            # Batches finish in ID order, so everything up to here is done except the failures,
+            # which the checkpoint keeps for the next run to retry
+            batch_ids = {report["id"] for report in batch}
+            state["failed_ids"] = [report_id for report_id in state["failed_ids"] if report_id not in batch_ids] + failed_ids
+            done += len(batch)
+            state["reports"] += len(batch)
+            state["last_id"] = max(state["last_id"] or "", batch[-1]["id"])
+            save_checkpoint(checkpoint, state)
+
+            elapsed = time.perf_counter() - started
+            typer.echo(f"\r{done}/{remaining} reports, {done / elapsed:.1f} reports/s", nl=False)
+
+        # Spawned workers don't inherit the Mongo client or event loop
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        pending = deque()
+        try:
+            async for batch in iter_report_batches(db, query, state["last_id"], batch_size, state["failed_ids"]):
+                items = [(report["id"], report.pop("genotypes"), report.get("genetic_markers", [])) for report in batch]
+                pending.append((batch, loop.run_in_executor(pool, _reanalyze_worker, items)))
+                # Keep every worker busy without holding more genotype tables than needed
+                if len(pending) > workers:
+                    await finish(*pending.popleft())
+            while pending:
+                await finish(*pending.popleft())
+        finally:
+            pool.shutdown(cancel_futures=True)
+            client.close()
+
+        elapsed = time.perf_counter() - started
+        typer.echo(
+            f"\nReanalyzed {done} reports in {elapsed:.1f}s "
+            f"({done / elapsed if elapsed else 0:.1f} reports/s, {state['genotypes'] / elapsed if elapsed else 0:,.0f} genotypes/s): "
+            f"{state['unchanged']} unchanged, {state['renarrated']} re-narrated, "
+            f"{state['skipped']} changed but not narrated, {state['failed']} failed"
+        )
+        if state["failed_ids"]:
+            typer.echo(f"{len(state['failed_ids'])} reports failed; run again to retry them")
+        else:
+            # A finished run starts over next time
+            checkpoint.unlink(missing_ok=True)
+
+    asyncio.run(run())
+
+def load_roster(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Participant details keyed by file name, from a CSV with file, email, name and optional profile columns"""
+    roster = {}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            file_name = row.pop("file")
+            roster[file_name] = {key: value for key, value in row.items() if value not in (None, "")}
+    return roster
+
+@app.command("import-genomes")
+def import_genomes(
+    source: Path = typer.Argument(..., exists=True, help="Directory or zip/tar archive of raw-data files"),
+    provider: DNAProvider = typer.Option(DNAProvider.GENERIC, help="Provider the files came from"),
+    roster: Optional[Path] = typer.Option(None, exists=True, dir_okay=False, help="CSV mapping file to email, name, age, gender, height, weight"),
+    email_domain: Optional[str] = typer.Option(None, help="Without a roster, create users as <file name>@<domain>"),
+    workers: int = typer.Option(os.cpu_count() or 1, help="Parser processes"),
+    batch_size: int = typer.Option(500, help="Most reports per write batch"),
+    batch_mb: int = typer.Option(64, help="Most genotype-table megabytes held per write batch"),
+    manifest: Path = typer.Option(Path("import-genomes.manifest.jsonl"), help="Record of imported files, used to resume"),
+    narrate: bool = typer.Option(False, help="Run the AI analysis for imported reports afterwards"),
+    llm_concurrency: int = typer.Option(4, help="Concurrent AI analyses when narrating"),
+):
+    """Bulk-import a partner cohort's raw-data files as users and DNA reports"""
+    if roster is None and not email_domain:
+        raise typer.BadParameter("Pass --roster or --email-domain so imported users get an email")
+
+    async def run():
+        client, db = get_db()
+        try:
+            dna_service = DNAAnalysisService(parse_workers=1)
+            importer = CohortImporter(db, dna_service, workers, batch_size, batch_mb * 1024 * 1024)
+            started = time.perf_counter()
+
+            async def report(counts):
+                elapsed = time.perf_counter() - started
+                typer.echo(
+                    f"\r{counts['imported']} imported, {counts['failed']} failed, "
+                    f"{counts['bytes'] / elapsed / 1e6:.1f} MB/s",
+                    nl=False
+                )
+
+            counts = await importer.import_source(
+                source, manifest, provider, load_roster(roster) if roster else None, email_domain, report
+            )
+            elapsed = time.perf_counter() - started
+            typer.echo(
+                f"\nImported {counts['imported']} files ({counts['bytes'] / 1e6:.1f} MB, {counts['genotypes']:,} genotypes) "
+                f"in {elapsed:.1f}s; {counts['failed']} failed, {counts['skipped']} already imported"
+            )
+
+            if narrate:
+                pipeline = DNAAnalysisPipeline(client, db, AIHealthService(), dna_service)
+                narrated = await importer.narrate_pending(manifest, pipeline, llm_concurrency)
+                typer.echo(f"AI analysis: {narrated['analyzed']} analyzed, {narrated['failed']} failed")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+@app.command("retention")
+def retention(
+    apply: bool = typer.Option(False, "--apply", help="Delete what the policy retires (default: report only)"),
+    wearable_raw_days: Optional[int] = typer.Option(None, help="Keep raw wearable samples this many days (0 keeps them forever)"),
+    daily_insight_days: Optional[int] = typer.Option(None, help="Expire daily insights after this many days (0 never)"),
+    keep_generations: Optional[int] = typer.Option(None, help="Analyzed DNA reports, and genetic insight versions, kept per user"),
+):
+    """Report, or reclaim, storage held by expired insights, aged wearable samples and superseded analyses"""
+    policy = RetentionPolicy.from_env()
+    if wearable_raw_days is not None:
+        policy.wearable_raw_days = wearable_raw_days
+    if daily_insight_days is not None:
+        policy.daily_insight_days = daily_insight_days
+    if keep_generations is not None:
+        policy.keep_analysis_generations = max(keep_generations, 1)
+
+    async def run():
+        client, db = get_db()
+        try:
+            service = RetentionService(db, policy)
+            if apply:
+                await service.ensure_ttl_indexes()
+                for kind, count in (await service.apply()).items():
+                    typer.echo(f"{kind:<30} {count:>12,} removed")
+                return
+
+            total = 0
+            for kind, counted in (await service.report()).items():
+                total += counted["bytes"]
+                typer.echo(f"{kind:<30} {counted['documents']:>12,} docs {counted['bytes'] / 1e6:>12.1f} MB")
+            # Uncompressed BSON sizes; on-disk savings depend on compression and index entries
+            typer.echo(f"{'reclaimable':<30} {'':>17} {total / 1e6:>12.1f} MB (dry run; pass --apply to delete)")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    app()
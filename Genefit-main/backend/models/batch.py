@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import List, Optional, Dict, Any
+
+class SubRequest(BaseModel):
+    id: str
+    method: str = "GET"
+    path: str  # e.g. /api/insights/{user_id}?limit=5
+    headers: Dict[str, str] = {}
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest]
+
+class SubResponse(BaseModel):
+    id: str
+    status: int
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    responses: List[SubResponse]
@@ -3,6 +3,7 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 import uuid
+from models.fields import response_defaults
 
 class DNAProvider(str, Enum):
     TWENTY_THREE_AND_ME = "23andme"
@@ -40,6 +41,8 @@ class DNAReport(BaseModel):
     uploaded_at: datetime = Field(default_factory=datetime.utcnow)
     analyzed_at: Optional[datetime] = None
     error_message: Optional[str] = None
+    genetic_summary: Optional[Dict[str, Any]] = None
+    panel_version: Optional[str] = None
 
 class DNAReportCreate(BaseModel):
     user_id: str
@@ -57,4 +60,7 @@ class DNAReportResponse(BaseModel):
     total_markers: int
     uploaded_at: datetime
     analyzed_at: Optional[datetime]
-    error_message: Optional[str]
\ No newline at end of file
+    error_message: Optional[str]
+
+# DNAReportResponse fields and their defaults, for read paths that skip model validation
+DNA_REPORT_RESPONSE_FIELDS = response_defaults(DNAReportResponse, DNAReport)
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Type
+
+def response_defaults(response_model: Type[BaseModel], stored_model: Type[BaseModel]) -> Dict[str, Any]:
+    """A response model's fields, defaulting to the stored model's plain defaults (None where it has none)"""
+    defaults = {}
+    for name, field in response_model.model_fields.items():
+        stored = stored_model.model_fields.get(name)
+        for source in (field, stored):
+            if source is not None and not source.is_required() and source.default_factory is None:
+                defaults[name] = source.default
+                break
+        else:
+            defaults[name] = None
+    return defaults
@@ -3,12 +3,28 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 import uuid
+from models.fields import response_defaults
 
 class RiskLevel(str, Enum):
     LOW = "low"
     MODERATE = "moderate"
     HIGH = "high"
 
+class Resolution(str, Enum):
+    RAW = "raw"
+    HOURLY = "hourly"
+    DAILY = "daily"
+
+class HealthExportSource(str, Enum):
+    APPLE_HEALTH = "apple_health"
+    GOOGLE_FIT = "google_fit"
+
+class ImportStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
 class PlanType(str, Enum):
     NUTRITION = "nutrition"
     FITNESS = "fitness"
@@ -18,6 +34,7 @@ class PlanType(str, Enum):
 class HealthRiskAssessment(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
+    dna_report_id: Optional[str] = None
     condition: str
     risk_level: RiskLevel
     confidence_score: float  # 0-100
@@ -61,6 +78,19 @@ class WearableData(BaseModel):
     recorded_at: datetime
     synced_at: datetime = Field(default_factory=datetime.utcnow)
 
+class WearableImport(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    source: HealthExportSource
+    filename: str
+    file_size: int
+    status: ImportStatus = ImportStatus.QUEUED
+    records_imported: int = 0
+    batches_written: int = 0
+    started_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+    error_message: Optional[str] = None
+
 class HealthPlanCreate(BaseModel):
     user_id: str
     plan_type: PlanType
@@ -72,4 +102,7 @@ class HealthPlanResponse(BaseModel):
     description: str
     progress: float
     is_active: bool
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+
+# HealthPlanResponse fields and their defaults, for read paths that skip model validation
+HEALTH_PLAN_RESPONSE_FIELDS = response_defaults(HealthPlanResponse, HealthPlan)
@@ -1,37 +1,83 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks, Request, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
 from dotenv import load_dotenv
 from pathlib import Path
 import os
 import logging
 import json
-import base64
 import asyncio
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
 # Import models
 from models.user import User, UserCreate, UserUpdate
-from models.dna import DNAReport, DNAReportCreate, DNAReportResponse, AnalysisStatus, DNAProvider
-from models.health import HealthPlan, HealthPlanCreate, HealthPlanResponse, AIInsight, HealthRiskAssessment, WearableData, PlanType, RiskLevel
+from models.dna import DNAReport, DNAReportResponse, AnalysisStatus, DNAProvider, DNA_REPORT_RESPONSE_FIELDS
+from models.batch import BatchRequest, BatchResponse
+from models.health import HealthPlan, HealthPlanCreate, HealthPlanResponse, AIInsight, WearableData, Resolution, WearableImport, HealthExportSource, ImportStatus, HEALTH_PLAN_RESPONSE_FIELDS
 
 # Import services
 from services.ai_service import AIHealthService
+from services.llm_endpoint import close_client as close_llm_client
 from services.dna_service import DNAAnalysisService
+from services.wearable_service import WearableService, WEARABLE_UNITS
+from services.import_service import HealthExportImporter
+from services.analysis_pipeline import DNAAnalysisPipeline
+from services.staging import stage_upload, discard_staged
+from services.admission import AdmissionController, UploadAdmissionMiddleware
+from services.rescoring import PanelRescorer
+from services.serialization import FastJSONResponse, select_fields, encode_json
+from services.metrics import REGISTRY, CONTENT_TYPE, PIPELINE_STAGE_SECONDS, Gauge, Counter, MetricsMiddleware
+from services.query_trace import QueryTracer, QueryTraceMiddleware, query_budget, traced_job
+from services.profiling import ProfilingMiddleware, profiled
+from services.live_updates import LiveUpdates
+from services.request_cache import find_one_cached
+from services.batch import run_batch, MAX_BATCH_REQUESTS
+from services.retention import RetentionPolicy, RetentionService
+from services.insights_store import GeneticInsightsStore
+from services.versioning import ResourceVersions, DASHBOARD_RESOURCES, user_key, plan_key, resource_etag, request_variant, etag_matches, etag_headers, not_modified
+from services.pagination import fetch_page, find_page, ndjson_stream, wants_ndjson, NDJSON_MEDIA_TYPE, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Every operation is attributed to the request or job that issued it
+client = AsyncIOMotorClient(mongo_url, event_listeners=[QueryTracer()])
 db = client[os.environ['DB_NAME']]
 
 # Initialize services
 ai_service = AIHealthService()
 dna_service = DNAAnalysisService()
+wearable_service = WearableService(db)
+health_export_importer = HealthExportImporter(wearable_service)
+analysis_pipeline = DNAAnalysisPipeline(client, db, ai_service, dna_service)
+panel_rescorer = PanelRescorer(db, dna_service)
+live_updates = LiveUpdates(db)
+resource_versions = ResourceVersions(db)
+retention = RetentionService(db, RetentionPolicy.from_env())
+insights_store = GeneticInsightsStore(db)
+
+# Concurrent per-sample analyses (LLM calls) when fanning out a multi-sample VCF
+BATCH_ANALYSIS_CONCURRENCY = int(os.environ.get('BATCH_ANALYSIS_CONCURRENCY', '4'))
+
+# Admission control for DNA uploads: size, running analyses and queue behind them
+dna_admission = AdmissionController(
+    max_upload_bytes=int(os.environ.get('MAX_UPLOAD_BYTES', str(512 * 1024 * 1024))),
+    max_in_flight=int(os.environ.get('MAX_CONCURRENT_ANALYSES', '4')),
+    max_queued=int(os.environ.get('MAX_QUEUED_ANALYSES', '32'))
+)
+
+# Admission state is read at scrape time, so it costs nothing between scrapes
+REGISTRY.register(Gauge(
+    "genefit_analysis_queue_depth", "DNA analyses admitted and waiting for a slot, or running", ["state"]
+)).set_function(lambda: {("queued",): dna_admission.queued, ("in_flight",): dna_admission.in_flight})
+REGISTRY.register(Counter(
+    "genefit_admission_rejected_total", "DNA uploads rejected by admission control", ["reason"]
+)).set_function(lambda: {(reason,): count for reason, count in dna_admission.rejected_total.items()})
 
 # Create the main app
 app = FastAPI(title="GeneFit AI API", description="AI-powered personalized health platform")
@@ -43,6 +89,9 @@ api_router = APIRouter(prefix="/api")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Inside CORS, so rejected uploads still carry CORS headers the browser can read
+app.add_middleware(UploadAdmissionMiddleware, admission=dna_admission, paths=["/api/dna/upload", "/api/dna/upload/batch"])
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -50,13 +99,30 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(QueryTraceMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
 
 # Health check endpoint
 @api_router.get("/")
 async def health_check():
     return {"message": "GeneFit AI API is running", "status": "healthy"}
 
+# run_batch splices pre-encoded parts into the body, so the schema is documented but not applied
+@api_router.post("/batch", responses={200: {"model": BatchResponse}})
+async def batch_requests(batch: BatchRequest, request: Request):
+    """Run several GET requests in one round trip, concurrently and sharing user/document lookups"""
+    if not batch.requests or len(batch.requests) > MAX_BATCH_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"A batch holds between 1 and {MAX_BATCH_REQUESTS} requests")
+    return await run_batch(request.app, request.scope, batch.requests)
+
 # User Management Endpoints
 @api_router.post("/users", response_model=User)
 async def create_user(user_data: UserCreate):
@@ -80,13 +146,15 @@ async def create_user(user_data: UserCreate):
         logger.error(f"Error creating user: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/users/{user_id}", response_model=User)
+# Returned pre-encoded from the cache, so User documents the schema without re-validating it
+@api_router.get("/users/{user_id}", responses={200: {"model": User}})
+@query_budget(1)
 async def get_user(user_id: str):
     """Get user by ID"""
-    user = await db.users.find_one({"id": user_id})
+    user = await find_one_cached(db.users, {"id": user_id}, {"_id": 0})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return User(**user)
+    return FastJSONResponse(user)
 
 @api_router.put("/users/{user_id}", response_model=User)
 async def update_user(user_id: str, user_data: UserUpdate):
@@ -99,6 +167,7 @@ async def update_user(user_id: str, user_data: UserUpdate):
     update_data['updated_at'] = datetime.utcnow()
     
     await db.users.update_one({"id": user_id}, {"$set": update_data})
+    await resource_versions.bump(user_key(user_id), "users")
     
     updated_user = await db.users.find_one({"id": user_id})
     return User(**updated_user)
@@ -106,43 +175,59 @@ async def update_user(user_id: str, user_data: UserUpdate):
 # DNA Analysis Endpoints
 @api_router.post("/dna/upload", response_model=DNAReportResponse)
 async def upload_dna_report(
+    request: Request,
     background_tasks: BackgroundTasks,
     user_id: str = Form(...),
     provider: DNAProvider = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    index_file: Optional[UploadFile] = File(None),
+    profile: bool = Form(False)
 ):
-    """Upload DNA report file for analysis"""
+    """Upload DNA report file for analysis (bgzipped VCFs may include a .tbi index)"""
+    # Size and queue limits were checked by UploadAdmissionMiddleware before the body was read
+    staged_path = staged_index_path = None
     try:
         # Validate user exists
         user = await db.users.find_one({"id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Read and encode file content
-        file_content = await file.read()
-        encoded_content = base64.b64encode(file_content).decode('utf-8')
+        # Spool the upload to disk; the analysis job reads it from there
+        with PIPELINE_STAGE_SECONDS.time(stage="stage_upload"):
+            staged_path, file_size = await stage_upload(file, dna_admission.check_size)
+            staged_index_path = (await stage_upload(index_file, dna_admission.check_size))[0] if index_file else None
         
         # Create DNA report record
         dna_report = DNAReport(
             user_id=user_id,
             filename=file.filename,
             provider=provider,
-            file_size=len(file_content),
+            file_size=file_size,
             analysis_status=AnalysisStatus.UPLOADED
         )
         
         # Save to database
         await db.dna_reports.insert_one(dna_report.dict())
+        await resource_versions.bump(user_key(user_id), "dna_reports")
+        
+        # Profiling the job needs a request already authorized for profiling
+        profile_id = getattr(request.state, "profile_id", None)
+        job_profile_id = f"{profile_id}-job" if profile and profile_id else None
         
         # Start background analysis
         background_tasks.add_task(
+            dna_admission.run,
             process_dna_analysis, 
             dna_report.id, 
-            encoded_content, 
+            staged_path, 
             file.filename, 
             provider,
-            user_id
+            user_id,
+            staged_index_path,
+            job_profile_id
         )
+        # The job now owns the queue place the middleware reserved
+        request.state.upload_admitted = False
         
         logger.info(f"DNA report uploaded for user {user_id}: {file.filename}")
         
@@ -159,32 +244,131 @@ async def upload_dna_report(
             error_message=None
         )
         
+    except HTTPException:
+        discard_staged(staged_path, staged_index_path)
+        raise
     except Exception as e:
+        discard_staged(staged_path, staged_index_path)
         logger.error(f"Error uploading DNA report: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/dna/upload/batch", response_model=List[DNAReportResponse])
+async def upload_multi_sample_vcf(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    sample_map: str = Form(...),
+    provider: DNAProvider = Form(DNAProvider.GENERIC),
+    file: UploadFile = File(...),
+    index_file: Optional[UploadFile] = File(None)
+):
+    """Upload a multi-sample VCF; sample_map is a JSON object of VCF sample name -> user ID"""
+    staged_path = staged_index_path = None
+    try:
+        try:
+            user_ids = json.loads(sample_map)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="sample_map must be a JSON object")
+        if not isinstance(user_ids, dict) or not user_ids:
+            raise HTTPException(status_code=400, detail="sample_map must map at least one sample to a user")
+        
+        # Validate all users exist in one query
+        found = await db.users.find({"id": {"$in": list(user_ids.values())}}, {"id": 1}).to_list(None)
+        missing = set(user_ids.values()) - {user["id"] for user in found}
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Users not found: {', '.join(sorted(missing))}")
+        
+        with PIPELINE_STAGE_SECONDS.time(stage="stage_upload"):
+            staged_path, file_size = await stage_upload(file, dna_admission.check_size)
+            staged_index_path = (await stage_upload(index_file, dna_admission.check_size))[0] if index_file else None
+        
+        # One report per sample column
+        dna_reports = {
+            sample_name: DNAReport(
+                user_id=user_id,
+                filename=f"{file.filename}#{sample_name}",
+                provider=provider,
+                file_size=file_size,
+                analysis_status=AnalysisStatus.UPLOADED
+            )
+            for sample_name, user_id in user_ids.items()
+        }
+        await db.dna_reports.insert_many([report.dict() for report in dna_reports.values()])
+        await resource_versions.bump_many(map(user_key, user_ids.values()), "dna_reports")
+        
+        background_tasks.add_task(
+            dna_admission.run,
+            process_batch_dna_analysis,
+            {sample_name: report.id for sample_name, report in dna_reports.items()},
+            user_ids,
+            staged_path,
+            file.filename,
+            provider,
+            staged_index_path
+        )
+        request.state.upload_admitted = False
+        
+        logger.info(f"Multi-sample VCF uploaded: {file.filename} ({len(user_ids)} samples)")
+        
+        return [to_dna_report_response(report.dict()) for report in dna_reports.values()]
+        
+    except HTTPException:
+        discard_staged(staged_path, staged_index_path)
+        raise
+    except Exception as e:
+        discard_staged(staged_path, staged_index_path)
+        logger.error(f"Error uploading multi-sample VCF: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.get("/dna/reports/{user_id}", response_model=List[DNAReportResponse])
-async def get_user_dna_reports(user_id: str):
-    """Get all DNA reports for a user"""
-    reports = await db.dna_reports.find({"user_id": user_id}).to_list(100)
+async def get_user_dna_reports(
+    user_id: str,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE)
+):
+    """Get DNA reports for a user, newest first, paginated by cursor or streamed as NDJSON"""
+    # Answer repeat polls from the version stamp alone
+    versions = await resource_versions.get(user_key(user_id))
+    etag = resource_etag(versions, ("dna_reports",), request_variant(request))
+    if etag_matches(request.headers.get("if-none-match"), etag, versions):
+        return not_modified(etag)
     
-    return [
-        DNAReportResponse(
-            id=report["id"],
-            filename=report["filename"],
-            provider=report["provider"],
-            file_size=report["file_size"],
-            analysis_status=report["analysis_status"],
-            markers_analyzed=report.get("markers_analyzed", 0),
-            total_markers=report.get("total_markers", 0),
-            uploaded_at=report["uploaded_at"],
-            analyzed_at=report.get("analyzed_at"),
-            error_message=report.get("error_message")
-        )
-        for report in reports
-    ]
+    query = {"user_id": user_id}
+    projection = {"genetic_markers": 0, "raw_data": 0}
+    
+    if wants_ndjson(request.headers.get("accept")):
+        mongo_cursor = find_page(db.dna_reports, query, "uploaded_at", cursor, projection).limit(limit or 0)
+        return StreamingResponse(ndjson_stream(mongo_cursor, to_dna_report_response), media_type=NDJSON_MEDIA_TYPE, headers=etag_headers(etag))
+    
+    reports, next_cursor = await fetch_page(db.dna_reports, query, "uploaded_at", limit or DEFAULT_PAGE_SIZE, cursor, projection)
+    return page_response([to_dna_report_response(report) for report in reports], next_cursor, etag)
+
+@api_router.post("/dna/rescore")
+async def rescore_dna_reports(background_tasks: BackgroundTasks):
+    """Rescore reports from older marker panels; only reports whose risk output changed are re-analyzed"""
+    # Claimed here rather than when the task starts, so a second request in between is refused
+    if not panel_rescorer.claim():
+        raise HTTPException(status_code=409, detail="Rescoring is already running")
+    
+    try:
+        stale_reports = await panel_rescorer.count_stale()
+    except Exception:
+        panel_rescorer.release()
+        raise
+    if stale_reports:
+        background_tasks.add_task(rescore_stale_reports)
+    else:
+        panel_rescorer.release()
+    
+    return {"panel_version": dna_service.panel_version, "stale_reports": stale_reports}
+
+@api_router.get("/dna/admission")
+async def get_admission_state():
+    """Current DNA upload admission state and limits"""
+    return dna_admission.metrics()
 
 @api_router.get("/dna/status/{report_id}")
+@query_budget(1)
 async def get_analysis_status(report_id: str):
     """Get analysis status for a DNA report"""
     report = await db.dna_reports.find_one({"id": report_id})
@@ -228,6 +412,8 @@ async def create_health_plan(plan_data: HealthPlanCreate):
         )
         
         await db.health_plans.insert_one(health_plan.dict())
+        await resource_versions.bump(user_key(plan_data.user_id), "health_plans")
+        await resource_versions.bump(plan_key(health_plan.id), "health_plan")
         
         logger.info(f"Created {plan_data.plan_type} plan for user {plan_data.user_id}")
         
@@ -246,48 +432,67 @@ async def create_health_plan(plan_data: HealthPlanCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/health-plans/{user_id}", response_model=List[HealthPlanResponse])
-async def get_user_health_plans(user_id: str):
-    """Get all health plans for a user"""
-    plans = await db.health_plans.find({"user_id": user_id, "is_active": True}).to_list(100)
+async def get_user_health_plans(
+    user_id: str,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE)
+):
+    """Get active health plans for a user, newest first, paginated by cursor or streamed as NDJSON"""
+    query = {"user_id": user_id, "is_active": True}
+    projection = {"ai_generated_content": 0}
     
-    return [
-        HealthPlanResponse(
-            id=plan["id"],
-            plan_type=plan["plan_type"],
-            title=plan["title"],
-            description=plan["description"],
-            progress=plan.get("progress", 0),
-            is_active=plan.get("is_active", True),
-            created_at=plan["created_at"]
-        )
-        for plan in plans
-    ]
+    if wants_ndjson(request.headers.get("accept")):
+        mongo_cursor = find_page(db.health_plans, query, "created_at", cursor, projection).limit(limit or 0)
+        return StreamingResponse(ndjson_stream(mongo_cursor, to_health_plan_response), media_type=NDJSON_MEDIA_TYPE)
+    
+    plans, next_cursor = await fetch_page(db.health_plans, query, "created_at", limit or DEFAULT_PAGE_SIZE, cursor, projection)
+    return page_response([to_health_plan_response(plan) for plan in plans], next_cursor)
 
 @api_router.get("/health-plans/detail/{plan_id}")
-async def get_health_plan_detail(plan_id: str):
+@query_budget(2)
+async def get_health_plan_detail(plan_id: str, request: Request):
     """Get detailed health plan content"""
-    plan = await db.health_plans.find_one({"id": plan_id})
+    versions = await resource_versions.get(plan_key(plan_id))
+    etag = resource_etag(versions, ("health_plan",))
+    if etag_matches(request.headers.get("if-none-match"), etag, versions):
+        return not_modified(etag)
+    
+    plan = await find_one_cached(db.health_plans, {"id": plan_id}, {"_id": 0})
     if not plan:
         raise HTTPException(status_code=404, detail="Health plan not found")
     
-    return {
+    return FastJSONResponse({
         "id": plan["id"],
         "title": plan["title"],
         "description": plan["description"],
         "content": plan["ai_generated_content"],
         "progress": plan.get("progress", 0),
         "created_at": plan["created_at"]
-    }
+    }, headers=etag_headers(etag))
 
 # AI Insights Endpoints
 @api_router.get("/insights/{user_id}")
-async def get_user_insights(user_id: str, limit: int = 10):
-    """Get AI insights for a user"""
-    insights = await db.ai_insights.find(
-        {"user_id": user_id}
-    ).sort("created_at", -1).limit(limit).to_list(limit)
+async def get_user_insights(
+    user_id: str,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE)
+):
+    """Get AI insights for a user, newest first, paginated by cursor or streamed as NDJSON"""
+    versions = await resource_versions.get(user_key(user_id))
+    etag = resource_etag(versions, ("ai_insights",), request_variant(request))
+    if etag_matches(request.headers.get("if-none-match"), etag, versions):
+        return not_modified(etag)
+    
+    query = {"user_id": user_id}
     
-    return insights
+    if wants_ndjson(request.headers.get("accept")):
+        mongo_cursor = find_page(db.ai_insights, query, "created_at", cursor).limit(limit or 0)
+        return StreamingResponse(ndjson_stream(mongo_cursor), media_type=NDJSON_MEDIA_TYPE, headers=etag_headers(etag))
+    
+    insights, next_cursor = await fetch_page(db.ai_insights, query, "created_at", limit or 10, cursor)
+    return page_response(insights, next_cursor, etag)
 
 @api_router.post("/insights/daily/{user_id}")
 async def generate_daily_insight(user_id: str):
@@ -319,8 +524,11 @@ async def generate_daily_insight(user_id: str):
             genetic_basis=["circadian rhythm genes", "metabolism genes"],
             priority="medium"
         )
+        # Daily tips go stale; retention deletes them once expires_at passes
+        insight.expires_at = retention.policy.insight_expiry(insight.created_at)
         
         await db.ai_insights.insert_one(insight.dict())
+        await resource_versions.bump(user_key(user_id), "ai_insights")
         
         return insight_content
         
@@ -330,30 +538,37 @@ async def generate_daily_insight(user_id: str):
 
 # Dashboard Endpoints
 @api_router.get("/dashboard/{user_id}")
-async def get_user_dashboard(user_id: str):
+@query_budget(6)
+async def get_user_dashboard(user_id: str, request: Request):
     """Get comprehensive dashboard data for a user"""
     try:
+        # Nothing the dashboard reads has changed since the client's copy
+        versions = await resource_versions.get(user_key(user_id))
+        etag = resource_etag(versions, DASHBOARD_RESOURCES)
+        if etag_matches(request.headers.get("if-none-match"), etag, versions):
+            return not_modified(etag)
+        
         # Get user
-        user = await db.users.find_one({"id": user_id})
+        user = await find_one_cached(db.users, {"id": user_id}, {"_id": 0})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Get health plans
         health_plans = await db.health_plans.find(
-            {"user_id": user_id, "is_active": True}
+            {"user_id": user_id, "is_active": True}, {"_id": 0}
         ).to_list(10)
         
         # Get recent insights
         insights = await db.ai_insights.find(
-            {"user_id": user_id}
+            {"user_id": user_id}, {"_id": 0}
         ).sort("created_at", -1).limit(5).to_list(5)
         
         # Get DNA analysis status
-        dna_reports = await db.dna_reports.find({"user_id": user_id}).to_list(10)
+        dna_reports = await db.dna_reports.find({"user_id": user_id}, {"_id": 0}).to_list(10)
         
         # Get risk assessments
         risk_assessments = await db.health_risk_assessments.find(
-            {"user_id": user_id}
+            {"user_id": user_id}, {"_id": 0}
         ).to_list(10)
         
         # Mock wearable data (in real implementation, this would come from connected devices)
@@ -366,20 +581,49 @@ async def get_user_dashboard(user_id: str):
             "sync_status": "Connected"
         }
         
-        return {
-            "user": {k: str(v) if k == '_id' else v for k, v in user.items() if k != '_id'},
-            "health_plans": [{k: str(v) if k == '_id' else v for k, v in plan.items() if k != '_id'} for plan in health_plans],
-            "insights": [{k: str(v) if k == '_id' else v for k, v in insight.items() if k != '_id'} for insight in insights],
-            "dna_reports": [{k: str(v) if k == '_id' else v for k, v in report.items() if k != '_id'} for report in dna_reports],
-            "risk_assessments": [{k: str(v) if k == '_id' else v for k, v in risk.items() if k != '_id'} for risk in risk_assessments],
+        return FastJSONResponse({
+            "user": user,
+            "health_plans": health_plans,
+            "insights": insights,
+            "dna_reports": dna_reports,
+            "risk_assessments": risk_assessments,
             "wearable_data": wearable_data,
             "wellness_score": calculate_wellness_score(health_plans, insights)
-        }
+        }, headers=etag_headers(etag))
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting dashboard data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.websocket("/ws/dashboard/{user_id}")
+async def dashboard_updates(websocket: WebSocket, user_id: str):
+    """Push dashboard deltas for a user as they are written, in place of polling"""
+    await websocket.accept()
+    if live_updates.available is False:
+        # No change streams on this deployment; 1013 tells the client to keep polling
+        await websocket.close(code=1013)
+        return
+    
+    queue = live_updates.subscribe(user_id)
+    
+    async def forward():
+        while True:
+            message = await queue.get()
+            await websocket.send_text(encode_json(message).decode())
+    
+    sender = asyncio.create_task(forward())
+    try:
+        # Nothing is expected from the client; this only notices the disconnect
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        live_updates.unsubscribe(user_id, queue)
+
 # Wearables Endpoints
 @api_router.post("/wearables/sync/{user_id}")
 async def sync_wearable_data(user_id: str, device_data: Dict[str, Any]):
@@ -390,7 +634,7 @@ async def sync_wearable_data(user_id: str, device_data: Dict[str, Any]):
         
         wearable_entries = []
         for data_type, value in device_data.items():
-            if data_type in ['steps', 'heart_rate', 'sleep_hours', 'calories', 'active_minutes']:
+            if data_type in WEARABLE_UNITS:
                 entry = WearableData(
                     user_id=user_id,
                     device_name=device_data.get('device_name', 'Unknown Device'),
@@ -401,8 +645,8 @@ async def sync_wearable_data(user_id: str, device_data: Dict[str, Any]):
                 )
                 wearable_entries.append(entry.dict())
         
-        if wearable_entries:
-            await db.wearable_data.insert_many(wearable_entries)
+        # Store raw samples and update hourly/daily rollups
+        await wearable_service.ingest(wearable_entries)
         
         logger.info(f"Synced {len(wearable_entries)} wearable data points for user {user_id}")
         
@@ -412,117 +656,214 @@ async def sync_wearable_data(user_id: str, device_data: Dict[str, Any]):
         logger.error(f"Error syncing wearable data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/wearables/import/{user_id}", response_model=WearableImport)
+async def import_health_export(
+    user_id: str,
+    background_tasks: BackgroundTasks,
+    source: HealthExportSource = Form(...),
+    file: UploadFile = File(...)
+):
+    """Import an Apple Health / Google Fit export (raw or zipped) into wearable storage"""
+    try:
+        user = await db.users.find_one({"id": user_id})
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        # Spool the upload to disk so large exports never sit in memory
+        staged_path, file_size = await stage_upload(file)
+        
+        wearable_import = WearableImport(
+            user_id=user_id,
+            source=source,
+            filename=file.filename,
+            file_size=file_size
+        )
+        await db.wearable_imports.insert_one(wearable_import.dict())
+        
+        background_tasks.add_task(process_health_export, wearable_import.id, staged_path, source, user_id)
+        
+        logger.info(f"Health export queued for user {user_id}: {file.filename}")
+        
+        return wearable_import
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error importing health export: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/wearables/import/status/{import_id}", response_model=WearableImport)
+async def get_import_status(import_id: str):
+    """Get progress of a health export import"""
+    wearable_import = await db.wearable_imports.find_one({"id": import_id})
+    if not wearable_import:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return WearableImport(**wearable_import)
+
 @api_router.get("/wearables/{user_id}")
-async def get_wearable_data(user_id: str, days: int = 7):
-    """Get recent wearable data for a user"""
+async def get_wearable_data(
+    user_id: str,
+    request: Request,
+    days: int = 7,
+    resolution: Resolution = Resolution.RAW,
+    data_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE)
+):
+    """Get recent wearable data for a user, raw or as hourly/daily rollups"""
     try:
         from datetime import timedelta
         
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        wearable_data = await db.wearable_data.find({
-            "user_id": user_id,
-            "recorded_at": {"$gte": start_date}
-        }).sort("recorded_at", -1).to_list(1000)
+        # Serve charts from pre-aggregated rollups instead of scanning raw samples
+        if resolution != Resolution.RAW:
+            start_date = WearableService.bucket_start(start_date, resolution)
+            return FastJSONResponse(await wearable_service.get_series(user_id, start_date, resolution, data_type))
+        
+        query = {"user_id": user_id, "recorded_at": {"$gte": start_date}}
+        if data_type:
+            query["data_type"] = data_type
         
-        return wearable_data
+        if wants_ndjson(request.headers.get("accept")):
+            mongo_cursor = find_page(db.wearable_data, query, "recorded_at", cursor).limit(limit or 0)
+            return StreamingResponse(ndjson_stream(mongo_cursor), media_type=NDJSON_MEDIA_TYPE)
         
+        wearable_data, next_cursor = await fetch_page(db.wearable_data, query, "recorded_at", limit or MAX_PAGE_SIZE, cursor)
+        return page_response(wearable_data, next_cursor)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting wearable data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # Helper Functions
-async def process_dna_analysis(report_id: str, file_content: str, filename: str, provider: DNAProvider, user_id: str):
+@traced_job("process_dna_analysis")
+async def process_dna_analysis(report_id: str, path: str, filename: str, provider: DNAProvider, user_id: str, index_path: Optional[str] = None, profile_id: Optional[str] = None):
     """Background task to process DNA analysis"""
     try:
-        # Update status to processing
-        await db.dna_reports.update_one(
-            {"id": report_id},
-            {"$set": {"analysis_status": AnalysisStatus.PROCESSING, "total_markers": 900}}
-        )
-        
-        # Process DNA file
-        genetic_markers = await dna_service.process_dna_file(file_content, filename, provider)
-        
-        # Simulate analysis progress
-        async def update_progress(report_id, analyzed, total):
+        async with profiled(profile_id, f"job:process_dna_analysis {report_id}"):
+            total_markers = len(dna_service.health_markers)
+            
+            # Update status to processing
             await db.dna_reports.update_one(
                 {"id": report_id},
-                {"$set": {"markers_analyzed": analyzed, "total_markers": total}}
+                {"$set": {"analysis_status": AnalysisStatus.PROCESSING, "total_markers": total_markers}}
             )
+            await resource_versions.bump(user_key(user_id), "dna_reports")
+            
+            # Process DNA file
+            genetic_markers, genotypes = await dna_service.process_dna_file(path, filename, provider, index_path)
+            
+            await analysis_pipeline.complete(report_id, user_id, filename, provider, genetic_markers, genotypes)
         
-        await dna_service.simulate_analysis_progress(report_id, update_progress)
-        
-        # Get user for AI analysis
-        user_doc = await db.users.find_one({"id": user_id})
-        user = User(**user_doc)
-        
-        # Create mock DNA report for AI analysis
-        dna_report = DNAReport(
-            id=report_id,
-            user_id=user_id,
-            filename=filename,
-            provider=provider,
-            file_size=0,
-            genetic_markers=genetic_markers
-        )
-        
-        # Generate AI analysis
-        genetic_insights = await ai_service.analyze_genetic_data(dna_report, user)
-        
-        # Store risk assessments
-        for risk_data in genetic_insights.get("risk_assessments", []):
-            risk_assessment = HealthRiskAssessment(
-                user_id=user_id,
-                condition=risk_data["condition"],
-                risk_level=RiskLevel(risk_data["risk_level"]),
-                confidence_score=risk_data["confidence_score"],
-                genetic_factors=risk_data.get("genetic_factors", []),
-                recommendations=risk_data.get("recommendations", [])
-            )
-            await db.health_risk_assessments.insert_one(risk_assessment.dict())
-        
-        # Update DNA report status
+    except Exception as e:
+        logger.error(f"DNA analysis failed for report {report_id}: {e}")
         await db.dna_reports.update_one(
             {"id": report_id},
             {
                 "$set": {
-                    "analysis_status": AnalysisStatus.ANALYZED,
-                    "genetic_markers": [m.dict() for m in genetic_markers],
-                    "markers_analyzed": 847,
-                    "total_markers": 900,
-                    "analyzed_at": datetime.utcnow()
+                    "analysis_status": AnalysisStatus.FAILED,
+                    "error_message": str(e)
                 }
             }
         )
+        await resource_versions.bump(user_key(user_id), "dna_reports")
+    finally:
+        discard_staged(path, index_path)
+
+@traced_job("process_batch_dna_analysis")
+async def process_batch_dna_analysis(report_ids: Dict[str, str], user_ids: Dict[str, str], path: str, filename: str, provider: DNAProvider, index_path: Optional[str] = None):
+    """Background task to analyze every sample of a multi-sample VCF from one parse"""
+    all_report_ids = list(report_ids.values())
+    try:
+        await db.dna_reports.update_many(
+            {"id": {"$in": all_report_ids}},
+            {"$set": {"analysis_status": AnalysisStatus.PROCESSING, "total_markers": len(dna_service.health_markers)}}
+        )
+        await resource_versions.bump_many(map(user_key, user_ids.values()), "dna_reports")
         
-        # Store genetic insights
-        await db.genetic_insights.insert_one({
-            "user_id": user_id,
-            "dna_report_id": report_id,
-            "insights": genetic_insights,
-            "created_at": datetime.utcnow()
-        })
+        # Parse the file once for all sample columns
+        markers_by_sample = await dna_service.process_multi_sample_vcf(path, filename, list(report_ids), index_path)
         
-        logger.info(f"DNA analysis completed for report {report_id}")
+    except Exception as e:
+        logger.error(f"Batch DNA analysis failed for {filename}: {e}")
+        await db.dna_reports.update_many(
+            {"id": {"$in": all_report_ids}},
+            {"$set": {"analysis_status": AnalysisStatus.FAILED, "error_message": str(e)}}
+        )
+        await resource_versions.bump_many(map(user_key, user_ids.values()), "dna_reports")
+        return
+    finally:
+        # Markers are in memory now; the staged upload is no longer needed
+        discard_staged(path, index_path)
+    
+    # Fan out per-user analysis, bounded so a clinic batch doesn't flood the LLM
+    semaphore = asyncio.Semaphore(BATCH_ANALYSIS_CONCURRENCY)
+    
+    async def analyze_sample(sample_name):
+        report_id = report_ids[sample_name]
+        async with semaphore:
+            try:
+                await analysis_pipeline.complete(report_id, user_ids[sample_name], filename, provider, *markers_by_sample[sample_name])
+            except Exception as e:
+                logger.error(f"DNA analysis failed for report {report_id}: {e}")
+                await db.dna_reports.update_one(
+                    {"id": report_id},
+                    {"$set": {"analysis_status": AnalysisStatus.FAILED, "error_message": str(e)}}
+                )
+                await resource_versions.bump(user_key(user_ids[sample_name]), "dna_reports")
+    
+    await asyncio.gather(*(analyze_sample(name) for name in report_ids))
+    logger.info(f"Batch DNA analysis completed for {len(report_ids)} samples in {filename}")
+
+@traced_job("rescore_stale_reports")
+async def rescore_stale_reports():
+    """Background task to bring reports analyzed against an older panel up to date"""
+    try:
+        await panel_rescorer.rescore_stale(analysis_pipeline.renarrate, BATCH_ANALYSIS_CONCURRENCY)
+    except Exception as e:
+        logger.error(f"Panel rescoring failed: {e}")
+
+@traced_job("process_health_export")
+async def process_health_export(import_id: str, path: str, source: HealthExportSource, user_id: str):
+    """Background task to stream a health export into wearable storage"""
+    try:
+        await db.wearable_imports.update_one(
+            {"id": import_id},
+            {"$set": {"status": ImportStatus.RUNNING}}
+        )
+        
+        async def update_progress(imported, batches):
+            await db.wearable_imports.update_one(
+                {"id": import_id},
+                {"$set": {"records_imported": imported, "batches_written": batches}}
+            )
+        
+        imported = await health_export_importer.import_file(path, user_id, source, update_progress)
+        
+        await db.wearable_imports.update_one(
+            {"id": import_id},
+            {"$set": {"status": ImportStatus.COMPLETED, "records_imported": imported, "completed_at": datetime.utcnow()}}
+        )
+        
+        logger.info(f"Health export import {import_id} completed: {imported} samples")
         
     except Exception as e:
-        logger.error(f"DNA analysis failed for report {report_id}: {e}")
-        await db.dna_reports.update_one(
-            {"id": report_id},
-            {
-                "$set": {
-                    "analysis_status": AnalysisStatus.FAILED,
-                    "error_message": str(e)
-                }
-            }
+        logger.error(f"Health export import {import_id} failed: {e}")
+        await db.wearable_imports.update_one(
+            {"id": import_id},
+            {"$set": {"status": ImportStatus.FAILED, "error_message": str(e)}}
         )
+    finally:
+        discard_staged(path)
 
 async def get_user_genetic_insights(user_id: str) -> Dict[str, Any]:
-    """Get genetic insights for a user"""
-    insights = await db.genetic_insights.find_one({"user_id": user_id})
+    """Get the user's latest genetic insights"""
+    insights = await insights_store.get_current(user_id)
     if insights:
-        return insights["insights"]
+        return insights
     
     # Return fallback insights if no analysis available
     return {
@@ -532,6 +873,21 @@ async def get_user_genetic_insights(user_id: str) -> Dict[str, Any]:
         "mental_wellness": {"sleep_optimization": ["7-9 hours sleep", "Cool room"]}
     }
 
+def to_dna_report_response(report: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the API view of a stored DNA report"""
+    return select_fields(report, DNA_REPORT_RESPONSE_FIELDS)
+
+def to_health_plan_response(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the API view of a stored health plan"""
+    return select_fields(plan, HEALTH_PLAN_RESPONSE_FIELDS)
+
+def page_response(items: List[Any], next_cursor: Optional[str], etag: Optional[str] = None) -> FastJSONResponse:
+    """Encode a page of documents, advertising the next cursor if there is one"""
+    headers = etag_headers(etag) if etag else {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return FastJSONResponse(items, headers=headers or None)
+
 def calculate_wellness_score(health_plans: List[Dict], insights: List[Dict]) -> int:
     """Calculate overall wellness score"""
     if not health_plans:
@@ -547,21 +903,38 @@ def calculate_wellness_score(health_plans: List[Dict], insights: List[Dict]) ->
 
 def get_unit_for_data_type(data_type: str) -> str:
     """Get appropriate unit for data type"""
-    units = {
-        "steps": "count",
-        "heart_rate": "bpm",
-        "sleep_hours": "hours",
-        "calories": "kcal",
-        "active_minutes": "minutes"
-    }
-    return units.get(data_type, "unit")
+    return WEARABLE_UNITS.get(data_type, "unit")
 
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.on_event("startup")
+async def create_indexes():
+    # Keyset pagination keys for list endpoints
+    await db.dna_reports.create_index([("user_id", ASCENDING), ("uploaded_at", DESCENDING), ("id", DESCENDING)])
+    await db.health_plans.create_index([("user_id", ASCENDING), ("is_active", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)])
+    await db.ai_insights.create_index([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)])
+    # Analysis results are written and cleaned up per DNA report
+    await db.health_risk_assessments.create_index([("dna_report_id", ASCENDING)])
+    await db.genetic_insights.create_index([("dna_report_id", ASCENDING)])
+    await insights_store.ensure_indexes()
+    # Retained genotype tables and panel versions for rescoring
+    await db.dna_genotypes.create_index([("dna_report_id", ASCENDING), ("seq", ASCENDING)], unique=True)
+    await db.marker_panels.create_index([("version", ASCENDING)], unique=True)
+    await db.dna_reports.create_index([("analysis_status", ASCENDING), ("panel_version", ASCENDING)])
+    await panel_rescorer.register_panel()
+    await wearable_service.ensure_indexes()
+    await retention.ensure_ttl_indexes()
+    retention.start()
+    live_updates.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await live_updates.stop()
+    await retention.stop()
     client.close()
+    dna_service.close()
+    await close_llm_client()
 
 if __name__ == "__main__":
     import uvicorn
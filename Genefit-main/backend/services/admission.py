@@ -0,0 +1,130 @@
+import asyncio
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from services.metrics import PIPELINE_STAGE_SECONDS
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AdmissionController:
+    """Bounds upload size, concurrently running analyses and the queue waiting behind them"""
+
+    def __init__(self, max_upload_bytes: int, max_in_flight: int, max_queued: int):
+        self.max_upload_bytes = max_upload_bytes
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.queued = 0
+        self.in_flight = 0
+        self.admitted_total = 0
+        self.completed_total = 0
+        self.rejected_total = {"too_large": 0, "busy": 0, "no_length": 0}
+        # Moving average of job duration, used to estimate Retry-After
+        self.avg_job_seconds = 30.0
+
+    def check_length(self, content_length: Any):
+        """Reject an upload whose declared size is missing or over the limit"""
+        try:
+            size = int(content_length)
+        except (TypeError, ValueError):
+            self.rejected_total["no_length"] += 1
+            raise HTTPException(status_code=411, detail="Uploads must declare a Content-Length")
+        self.check_size(size)
+
+    def check_size(self, size: int):
+        """Reject an upload that is (or has grown) over the size limit"""
+        if size > self.max_upload_bytes:
+            self.rejected_total["too_large"] += 1
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload exceeds the maximum size of {self.max_upload_bytes} bytes"
+            )
+
+    def admit(self):
+        """Reserve a queue place for a new job, or reject with 429 when the queue is full"""
+        if self.queued + self.in_flight >= self.max_in_flight + self.max_queued:
+            self.rejected_total["busy"] += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many analyses in progress, please retry later",
+                headers={"Retry-After": str(self.retry_after())}
+            )
+        self.queued += 1
+        self.admitted_total += 1
+
+    def release(self):
+        """Give back a queue place for a job that was admitted but never started"""
+        self.queued -= 1
+
+    async def run(self, func: Callable[..., Awaitable[Any]], *args):
+        """Run an admitted job once a slot is free"""
+        queued_at = time.monotonic()
+        async with self._slots:
+            self.queued -= 1
+            self.in_flight += 1
+            started = time.monotonic()
+            PIPELINE_STAGE_SECONDS.observe(started - queued_at, stage="queue_wait")
+            try:
+                return await func(*args)
+            finally:
+                self.in_flight -= 1
+                self.completed_total += 1
+                self.avg_job_seconds = 0.8 * self.avg_job_seconds + 0.2 * (time.monotonic() - started)
+
+    def retry_after(self) -> int:
+        """Seconds until a queue place is likely to free up"""
+        # A queue place frees up whenever any of the running jobs finishes
+        return max(1, math.ceil(self.avg_job_seconds / self.max_in_flight))
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued,
+            "max_upload_bytes": self.max_upload_bytes,
+            "admitted_total": self.admitted_total,
+            "completed_total": self.completed_total,
+            "rejected_total": dict(self.rejected_total),
+            "avg_job_seconds": round(self.avg_job_seconds, 3),
+        }
+
+# request.state key under which an admitted upload holds its queue place
+ADMITTED_STATE_KEY = "upload_admitted"
+
+class UploadAdmissionMiddleware:
+    """ASGI middleware applying admission control to uploads from their headers, before the body is read
+
+    An admitted request holds a queue place. The endpoint hands it over to
+    its background job by setting request.state.upload_admitted to False;
+    otherwise the place is released when the request ends.
+    """
+
+    def __init__(self, app, admission: AdmissionController, paths: Iterable[str]):
+        self.app = app
+        self.admission = admission
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"].rstrip("/") not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        try:
+            self.admission.check_length(headers.get(b"content-length"))
+            self.admission.admit()
+        except HTTPException as e:
+            await JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        state[ADMITTED_STATE_KEY] = True
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if state.get(ADMITTED_STATE_KEY):
+                self.admission.release()
@@ -4,9 +4,12 @@ from emergentintegrations.llm.chat import LlmChat, UserMessage
 from models.dna import DNAReport, GeneticMarker
 from models.health import HealthRiskAssessment, HealthPlan, AIInsight, PlanType, RiskLevel
 from models.user import User
+from services.llm_endpoint import CompletionEndpointChat
+from services.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS, LLM_FALLBACKS
 import asyncio
 import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -15,9 +18,14 @@ class AIHealthService:
         self.api_key = os.environ.get('OPENAI_API_KEY')
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
+        # Any OpenAI-compatible endpoint, e.g. a local fake for load tests
+        self.base_url = os.environ.get('LLM_BASE_URL')
         
     def _create_chat_instance(self, system_message: str, session_id: str) -> LlmChat:
         """Create a new LlmChat instance for each request"""
+        if self.base_url:
+            return CompletionEndpointChat(self.base_url, self.api_key, session_id, system_message, "gpt-4o", 4096)
+        
         chat = LlmChat(
             api_key=self.api_key,
             session_id=session_id,
@@ -25,6 +33,25 @@ class AIHealthService:
         ).with_model("openai", "gpt-4o").with_max_tokens(4096)
         return chat
 
+    async def _send(self, operation: str, chat, system_message: str, prompt: str) -> str:
+        """Send one prompt, recording latency and token usage for the operation"""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await chat.send_message(UserMessage(text=prompt))
+            outcome = "ok"
+        finally:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, operation=operation, outcome=outcome)
+        
+        usage = getattr(chat, "usage", None) or {
+            # LlmChat doesn't surface usage; about four characters per token
+            "prompt_tokens": (len(system_message) + len(prompt)) // 4,
+            "completion_tokens": len(response) // 4,
+        }
+        LLM_TOKENS.inc(usage.get("prompt_tokens", 0), operation=operation, kind="prompt")
+        LLM_TOKENS.inc(usage.get("completion_tokens", 0), operation=operation, kind="completion")
+        return response
+
     async def analyze_genetic_data(self, dna_report: DNAReport, user: User) -> Dict[str, Any]:
         """Analyze genetic data and generate insights"""
         system_message = """You are a world-class genetic counselor and health AI specialist. 
@@ -102,7 +129,7 @@ class AIHealthService:
         chat = self._create_chat_instance(system_message, f"genetic_analysis_{dna_report.id}")
         
         try:
-            response = await chat.send_message(UserMessage(text=prompt))
+            response = await self._send("analyze_genetic_data", chat, system_message, prompt)
             
             # Parse JSON response
             analysis_result = json.loads(response)
@@ -166,7 +193,7 @@ class AIHealthService:
         chat = self._create_chat_instance(system_message, f"plan_{plan_type.value}_{user.id}")
         
         try:
-            response = await chat.send_message(UserMessage(text=prompt))
+            response = await self._send("generate_health_plan", chat, system_message, prompt)
             plan_content = json.loads(response)
             logger.info(f"Generated {plan_type.value} plan for user {user.id}")
             return plan_content
@@ -207,7 +234,7 @@ class AIHealthService:
         chat = self._create_chat_instance(system_message, f"daily_insight_{user.id}")
         
         try:
-            response = await chat.send_message(UserMessage(text=prompt))
+            response = await self._send("generate_daily_insight", chat, system_message, prompt)
             insight = json.loads(response)
             logger.info(f"Generated daily insight for user {user.id}")
             return insight
@@ -230,6 +257,7 @@ class AIHealthService:
 
     def _get_fallback_analysis(self) -> Dict[str, Any]:
         """Fallback analysis if AI fails"""
+        LLM_FALLBACKS.inc(operation="analyze_genetic_data")
         return {
             "risk_assessments": [
                 {
@@ -260,6 +288,7 @@ class AIHealthService:
 
     def _get_fallback_plan(self, plan_type: PlanType) -> Dict[str, Any]:
         """Fallback plan if AI fails"""
+        LLM_FALLBACKS.inc(operation="generate_health_plan")
         plans = {
             PlanType.NUTRITION: {
                 "title": "Personalized Nutrition Plan",
@@ -282,6 +311,7 @@ class AIHealthService:
 
     def _get_fallback_insight(self) -> Dict[str, Any]:
         """Fallback insight if AI fails"""
+        LLM_FALLBACKS.inc(operation="generate_daily_insight")
         return {
             "title": "Daily Health Focus",
             "message": "Your genetic profile suggests focusing on consistent sleep patterns for optimal health.",
@@ -0,0 +1,85 @@
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from models.user import User
+from models.dna import DNAReport, GeneticMarker, AnalysisStatus, DNAProvider
+from models.health import HealthRiskAssessment, RiskLevel
+from services.ai_service import AIHealthService
+from services.dna_service import DNAAnalysisService
+from services.analysis_writer import AnalysisUnitOfWork
+from services.metrics import PIPELINE_STAGE_SECONDS
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DNAAnalysisPipeline:
+    """AI analysis of scored markers and the writes that store it, shared by the API and the CLI"""
+
+    def __init__(self, client, db, ai_service: AIHealthService, dna_service: DNAAnalysisService):
+        self.client = client
+        self.db = db
+        self.ai_service = ai_service
+        self.dna_service = dna_service
+
+    async def complete(self, report_id: str, user_id: str, filename: str, provider: DNAProvider, genetic_markers: List[GeneticMarker], genotypes: Optional[bytes] = None, replace: bool = False):
+        """Run AI analysis on parsed markers and store the results (replacing earlier ones on re-analysis)"""
+        total_markers = len(self.dna_service.health_markers)
+
+        # Get user for AI analysis
+        user_doc = await self.db.users.find_one({"id": user_id})
+        user = User(**user_doc)
+
+        # Create mock DNA report for AI analysis
+        dna_report = DNAReport(
+            id=report_id,
+            user_id=user_id,
+            filename=filename,
+            provider=provider,
+            file_size=0,
+            genetic_markers=genetic_markers
+        )
+
+        # Generate AI analysis
+        with PIPELINE_STAGE_SECONDS.time(stage="ai_analysis"):
+            genetic_insights = await self.ai_service.analyze_genetic_data(dna_report, user)
+
+        # Collect all result writes and apply them in one transaction
+        unit_of_work = AnalysisUnitOfWork(self.client, self.db, report_id, user_id, replace=replace)
+        if genotypes:
+            unit_of_work.set_genotypes(genotypes)
+
+        for risk_data in genetic_insights.get("risk_assessments", []):
+            risk_assessment = HealthRiskAssessment(
+                user_id=user_id,
+                condition=risk_data["condition"],
+                risk_level=RiskLevel(risk_data["risk_level"]),
+                confidence_score=risk_data["confidence_score"],
+                genetic_factors=risk_data.get("genetic_factors", []),
+                recommendations=risk_data.get("recommendations", [])
+            )
+            unit_of_work.add_risk_assessment(risk_assessment.dict())
+
+        unit_of_work.set_genetic_insights({
+            "insights": genetic_insights,
+            "created_at": datetime.utcnow()
+        })
+
+        unit_of_work.update_report(
+            analysis_status=AnalysisStatus.ANALYZED,
+            genetic_markers=[m.dict() for m in genetic_markers],
+            markers_analyzed=len(genetic_markers),
+            total_markers=total_markers,
+            genetic_summary=self.dna_service.get_genetic_summary(genetic_markers),
+            panel_version=self.dna_service.panel_version,
+            analyzed_at=datetime.utcnow()
+        )
+
+        with PIPELINE_STAGE_SECONDS.time(stage="store_results"):
+            await unit_of_work.commit()
+
+        logger.info(f"DNA analysis completed for report {report_id}")
+
+    async def renarrate(self, report: Dict[str, Any], genetic_markers: List[GeneticMarker]):
+        """Re-run AI analysis for a stored report whose markers changed"""
+        await self.complete(
+            report["id"], report["user_id"], report["filename"], DNAProvider(report["provider"]), genetic_markers, replace=True
+        )
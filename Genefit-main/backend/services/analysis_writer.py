@@ -0,0 +1,113 @@
+import uuid
+from typing import List, Dict, Any, Optional
+from services.insights_store import GeneticInsightsStore, invalidate_current
+from services.versioning import ResourceVersions, user_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Genotype tables are split across documents to stay under the 16MB BSON limit
+GENOTYPE_CHUNK_BYTES = 8 * 1024 * 1024
+
+_transactions_supported: Optional[bool] = None
+
+async def supports_transactions(client) -> bool:
+    """Transactions need a replica set (or mongos); a standalone mongod can't run them"""
+    global _transactions_supported
+    if _transactions_supported is None:
+        hello = await client.admin.command("hello")
+        _transactions_supported = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+        if not _transactions_supported:
+            logger.warning("MongoDB is not a replica set; DNA analysis writes fall back to compensating deletes")
+    return _transactions_supported
+
+def genotype_chunks(report_id: str, genotypes: bytes) -> List[Dict[str, Any]]:
+    """dna_genotypes documents holding one report's encoded genotype table"""
+    return [
+        {"dna_report_id": report_id, "seq": seq, "data": genotypes[start:start + GENOTYPE_CHUNK_BYTES]}
+        for seq, start in enumerate(range(0, len(genotypes), GENOTYPE_CHUNK_BYTES))
+    ]
+
+class AnalysisUnitOfWork:
+    """Collects the writes of one DNA analysis and applies them together at the end"""
+
+    def __init__(self, client, db, report_id: str, user_id: str, replace: bool = False):
+        self.client = client
+        self.db = db
+        self.report_id = report_id
+        self.user_id = user_id
+        self.risk_assessments: List[Dict[str, Any]] = []
+        self.report_update: Dict[str, Any] = {}
+        self.genetic_insights: Optional[Dict[str, Any]] = None
+        self.genotype_chunks: List[Dict[str, Any]] = []
+        # Re-analysis swaps out the report's previous results
+        self.replace = replace
+        self._report_updated = False
+
+    def add_risk_assessment(self, risk_assessment: Dict[str, Any]):
+        self.risk_assessments.append({**risk_assessment, "dna_report_id": self.report_id})
+
+    def update_report(self, **fields):
+        self.report_update.update(fields)
+
+    def set_genetic_insights(self, insights: Dict[str, Any]):
+        """Record the analysis's insights as a new version, which becomes the user's current one"""
+        self.genetic_insights = {"id": str(uuid.uuid4()), **insights, "user_id": self.user_id, "dna_report_id": self.report_id}
+
+    def set_genotypes(self, genotypes: bytes):
+        """Retain the report's encoded genotype table for later rescoring"""
+        self.genotype_chunks = genotype_chunks(self.report_id, genotypes)
+
+    async def commit(self):
+        """Write everything atomically: risk assessments, insights and the final report state"""
+        if await supports_transactions(self.client):
+            async with await self.client.start_session() as session:
+                await session.with_transaction(self._apply)
+        else:
+            try:
+                await self._apply(None)
+            except Exception:
+                # No transaction to roll back; until the report flips, removing what this analysis added
+                # leaves the previous results as they were. After that they may already be gone.
+                if not self._report_updated:
+                    await self._discard_written()
+                raise
+        invalidate_current(self.user_id)
+
+    async def _discard_written(self):
+        """Remove the documents this analysis inserted, and only those"""
+        if self.risk_assessments:
+            new_ids = [risk_assessment["id"] for risk_assessment in self.risk_assessments]
+            await self.db.health_risk_assessments.delete_many({"id": {"$in": new_ids}})
+        if self.genetic_insights:
+            await self.db.genetic_insights.delete_one({"id": self.genetic_insights["id"]})
+            await GeneticInsightsStore(self.db).repoint(self.user_id)
+        if self.genotype_chunks:
+            await self.db.dna_genotypes.delete_many({"dna_report_id": self.report_id})
+
+    async def _apply(self, session):
+        self._report_updated = False
+        if self.genotype_chunks:
+            await self.db.dna_genotypes.delete_many({"dna_report_id": self.report_id}, session=session)
+            await self.db.dna_genotypes.insert_many(self.genotype_chunks, session=session)
+        # New results go in before the previous ones are removed, so a failure in between loses neither
+        if self.risk_assessments:
+            await self.db.health_risk_assessments.insert_many(self.risk_assessments, session=session)
+        if self.genetic_insights:
+            await GeneticInsightsStore(self.db).add_version(self.genetic_insights, session=session)
+        # Flip the report before dropping old results so it never reads as analyzed with data missing
+        if self.report_update:
+            await self.db.dna_reports.update_one(
+                {"id": self.report_id},
+                {"$set": self.report_update},
+                session=session
+            )
+        self._report_updated = True
+        # Earlier insight versions are kept; the pointer now names the new one, and retention compacts the rest
+        if self.replace:
+            new_ids = [risk_assessment["id"] for risk_assessment in self.risk_assessments]
+            await self.db.health_risk_assessments.delete_many(
+                {"dna_report_id": self.report_id, "id": {"$nin": new_ids}}, session=session
+            )
+        # Stamped in the same transaction, so an ETag never outlives the data it describes
+        await ResourceVersions(self.db).bump(user_key(self.user_id), "dna_reports", "health_risk_assessments", session=session)
@@ -0,0 +1,117 @@
+import asyncio
+import os
+from typing import List, Dict, Any, Tuple
+from urllib.parse import urlsplit
+from starlette.responses import Response
+from models.batch import SubRequest
+from services.request_cache import request_cache
+from services.serialization import encode_json
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_REQUESTS = int(os.environ.get('MAX_BATCH_REQUESTS', '20'))
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '8'))
+
+BATCH_PATH = "/api/batch"
+
+# Per-request headers that must not leak from the batch request into its parts (the batch is profiled as a whole)
+EXCLUDED_HEADERS = {b"content-length", b"content-type", b"if-none-match", b"if-modified-since", b"transfer-encoding", b"x-profile-token"}
+
+# Sub-response headers worth passing back to the client
+FORWARDED_HEADERS = {"etag", "cache-control", "x-next-cursor", "retry-after", "server-timing"}
+
+def check_sub_request(sub: SubRequest) -> Tuple[int, str]:
+    """Status and reason a sub-request is refused with, or (0, '') if it can run"""
+    if sub.method.upper() != "GET":
+        # Parts run concurrently, so only reads are safe to batch
+        return 405, "Only GET requests can be batched"
+    path = urlsplit(sub.path).path
+    if not path.startswith("/api/") or path.rstrip("/") == BATCH_PATH:
+        return 400, "Sub-request paths must be API paths other than the batch endpoint"
+    return 0, ""
+
+async def dispatch(app, parent_scope: Dict[str, Any], sub: SubRequest) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    """Run one GET through the full ASGI app in-process; returns status, headers and body"""
+    url = urlsplit(sub.path)
+    headers = [(name, value) for name, value in parent_scope["headers"] if name not in EXCLUDED_HEADERS]
+    headers += [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in sub.headers.items()]
+    scope = {
+        **parent_scope,
+        "method": "GET",
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "headers": headers,
+        "state": {},
+    }
+    # Fresh per part, or the parent's matched route would leak into it
+    scope.pop("route", None)
+    scope.pop("endpoint", None)
+    scope.pop("path_params", None)
+
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Never disconnects; streaming responses cancel this wait when done
+        await asyncio.Event().wait()
+
+    status = 500
+    response_headers: List[Tuple[bytes, bytes]] = []
+    chunks: List[bytes] = []
+
+    async def send(message):
+        nonlocal status, response_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except Exception as e:
+        # The error middleware has already sent the 500; it re-raises for the server to log
+        logger.error(f"Batched request {sub.path} failed: {e}")
+    return status, response_headers, b"".join(chunks)
+
+def encode_part(sub: SubRequest, status: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> bytes:
+    """One entry of the combined response, splicing JSON bodies in without re-parsing them"""
+    forwarded = {}
+    content_type = ""
+    for name, value in headers:
+        name = name.decode("latin-1").lower()
+        if name in FORWARDED_HEADERS:
+            forwarded[name] = value.decode("latin-1")
+        elif name == "content-type":
+            content_type = value.decode("latin-1")
+
+    if not body:
+        encoded_body = b"null"
+    elif content_type.startswith("application/json"):
+        encoded_body = body
+    else:
+        encoded_body = encode_json(body.decode("utf-8", errors="replace"))
+
+    head = encode_json({"id": sub.id, "status": status, "headers": forwarded})
+    return head[:-1] + b',"body":' + encoded_body + b'}'
+
+async def run_batch(app, parent_scope: Dict[str, Any], sub_requests: List[SubRequest]) -> Response:
+    """Run the parts concurrently, sharing one lookup cache, and combine their responses in order"""
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(sub: SubRequest) -> bytes:
+        status, reason = check_sub_request(sub)
+        if status:
+            return encode_part(sub, status, [(b"content-type", b"application/json")], encode_json({"detail": reason}))
+        async with semaphore:
+            return encode_part(sub, *await dispatch(app, parent_scope, sub))
+
+    with request_cache():
+        parts = await asyncio.gather(*(run(sub) for sub in sub_requests))
+
+    return Response(b'{"responses":[' + b','.join(parts) + b']}', media_type="application/json")
@@ -0,0 +1,289 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tarfile
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Tuple, Callable, Awaitable
+from pymongo import UpdateOne
+from models.user import User
+from models.dna import DNAReport, DNAProvider, AnalysisStatus, GeneticMarker
+from services.dna_service import DNAAnalysisService, _import_worker
+from services.analysis_pipeline import DNAAnalysisPipeline
+from services.analysis_writer import genotype_chunks
+from services.staging import STAGING_DIR, discard_staged
+from services.versioning import ResourceVersions, user_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Raw-data files as delivered by providers, possibly zipped or gzipped
+GENOME_SUFFIXES = ('.txt', '.csv', '.vcf', '.zip', '.gz', '.bgz')
+
+# Parsed files held in memory before a write; genotype tables of whole genomes run to tens of MB each
+MAX_BATCH_BYTES = 64 * 1024 * 1024
+
+# Namespace for report IDs derived from the source and file name, so a resumed import rewrites the same reports
+REPORT_ID_NAMESPACE = uuid.UUID('5b0c1d6e-2f43-4a8e-9d17-6c3f0e2a9b41')
+
+def iter_genome_files(source: Path, skip: Optional[set] = None) -> Iterator[Tuple[str, str, bool]]:
+    """Yield (name, path, staged) for each raw-data file in a directory or a zip/tar archive
+
+    Archive members are extracted to the staging directory one at a time; staged
+    is True for those so the caller can remove them once parsed.
+    """
+    skip = skip or set()
+
+    if source.is_dir():
+        for path in sorted(source.rglob('*')):
+            name = path.relative_to(source).as_posix()
+            if path.is_file() and name.lower().endswith(GENOME_SUFFIXES) and name not in skip:
+                yield name, str(path), False
+        return
+
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+
+    def stage(name, fileobj):
+        staged = STAGING_DIR / f"{uuid.uuid4()}{''.join(Path(name).suffixes[-2:])}"
+        with open(staged, 'wb') as out:
+            shutil.copyfileobj(fileobj, out, 1024 * 1024)
+        return str(staged)
+
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or name.startswith('__MACOSX/') or not name.lower().endswith(GENOME_SUFFIXES) or name in skip:
+                    continue
+                with archive.open(info) as member:
+                    yield name, stage(name, member), True
+        return
+
+    # Stream mode reads members in order, so compressed tarballs aren't re-read per file
+    with tarfile.open(source, 'r|*') as archive:
+        for info in archive:
+            name = info.name
+            if not info.isfile() or not name.lower().endswith(GENOME_SUFFIXES) or name in skip:
+                continue
+            yield name, stage(name, archive.extractfile(info)), True
+
+def read_manifest(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Files already imported by an earlier run, keyed by name"""
+    entries = {}
+    if path.exists():
+        with open(path) as manifest:
+            for line in manifest:
+                if line.strip():
+                    entry = json.loads(line)
+                    # Failed files are retried on the next run
+                    if entry.get("report_id"):
+                        entries[entry["file"]] = entry
+    return entries
+
+def report_id(source: Path, name: str) -> str:
+    """Stable report ID for one file of a cohort source"""
+    return str(uuid.uuid5(REPORT_ID_NAMESPACE, f"{source.resolve()}#{name}"))
+
+def user_email(name: str, email_domain: str) -> str:
+    """Placeholder address for a participant known only by their file name"""
+    stem = Path(name).name.split('.')[0].lower()
+    return f"{re.sub(r'[^a-z0-9._-]+', '-', stem)}@{email_domain}"
+
+class CohortImporter:
+    """Bulk-imports a partner cohort's raw-data files as users and DNA reports"""
+
+    def __init__(self, db, dna_service: DNAAnalysisService, workers: int, batch_size: int = 500, max_batch_bytes: int = MAX_BATCH_BYTES):
+        self.db = db
+        self.dna_service = dna_service
+        self.workers = workers
+        # A batch is written at whichever limit it reaches first
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+
+    async def import_source(
+        self,
+        source: Path,
+        manifest_path: Path,
+        provider: DNAProvider,
+        roster: Optional[Dict[str, Dict[str, Any]]] = None,
+        email_domain: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict[str, int]], Awaitable[None]]] = None
+    ) -> Dict[str, int]:
+        """Parse files across a process pool and insert users, reports and genotypes in batches"""
+        done = read_manifest(manifest_path)
+        counts = {"files": 0, "imported": 0, "failed": 0, "skipped": len(done), "bytes": 0, "genotypes": 0}
+
+        loop = asyncio.get_running_loop()
+        files = iter_genome_files(source, set(done))
+        pending = deque()
+        parsed = []
+        parsed_bytes = 0
+
+        # Spawned workers don't inherit the Mongo client or event loop
+        pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            with open(manifest_path, 'a') as manifest:
+                while True:
+                    # Walking an archive extracts the next member, so keep it off the event loop
+                    entry = await asyncio.to_thread(next, files, None)
+                    if entry is None:
+                        break
+                    name, path, staged = entry
+                    counts["files"] += 1
+
+                    user_fields = self._user_fields(name, roster, email_domain)
+                    if user_fields is None:
+                        logger.warning(f"No roster entry for {name}, skipping")
+                        counts["failed"] += 1
+                        if staged:
+                            discard_staged(path)
+                        continue
+
+                    future = loop.run_in_executor(pool, _import_worker, path, name)
+                    pending.append((name, path, staged, user_fields, future))
+
+                    # Stay a few files ahead of the workers without staging the whole archive
+                    if len(pending) > self.workers * 2:
+                        parsed_bytes += await self._collect(pending.popleft(), source, provider, parsed, counts, manifest)
+                    if len(parsed) >= self.batch_size or parsed_bytes >= self.max_batch_bytes:
+                        await self._write_batch(parsed, counts, manifest)
+                        parsed = []
+                        parsed_bytes = 0
+                        if progress_callback:
+                            await progress_callback(counts)
+
+                while pending:
+                    parsed_bytes += await self._collect(pending.popleft(), source, provider, parsed, counts, manifest)
+                    if parsed_bytes >= self.max_batch_bytes:
+                        await self._write_batch(parsed, counts, manifest)
+                        parsed = []
+                        parsed_bytes = 0
+                if parsed:
+                    await self._write_batch(parsed, counts, manifest)
+                    if progress_callback:
+                        await progress_callback(counts)
+        finally:
+            pool.shutdown(cancel_futures=True)
+            for name, path, staged, _, _ in pending:
+                if staged:
+                    discard_staged(path)
+
+        logger.info(f"Cohort import from {source}: {counts}")
+        return counts
+
+    def _user_fields(self, name: str, roster: Optional[Dict[str, Dict[str, Any]]], email_domain: Optional[str]) -> Optional[Dict[str, Any]]:
+        if roster is not None:
+            return roster.get(name) or roster.get(Path(name).name)
+        stem = Path(name).name.split('.')[0]
+        return {"email": user_email(name, email_domain), "name": stem}
+
+    async def _collect(self, item, source: Path, provider: DNAProvider, parsed: List[Dict[str, Any]], counts: Dict[str, int], manifest) -> int:
+        """Validate one parsed file into a user and report; returns the bytes it holds until written"""
+        name, path, staged, user_fields, future = item
+        try:
+            markers, genotypes, summary, genotype_count = await future
+            # Bad roster rows or parser output fail this file only, not the batch
+            user = User(**user_fields)
+            report = DNAReport(
+                id=report_id(source, name),
+                user_id=user.id,
+                filename=Path(name).name,
+                provider=provider,
+                file_size=os.path.getsize(path),
+                # Parsed and scored; the AI analysis runs separately
+                analysis_status=AnalysisStatus.UPLOADED,
+                markers_analyzed=len(markers),
+                total_markers=len(self.dna_service.health_markers),
+                genetic_markers=markers,
+                genetic_summary=summary,
+                panel_version=self.dna_service.panel_version
+            )
+            parsed.append({"name": name, "user": user, "report": report, "genotypes": genotypes})
+            counts["genotypes"] += genotype_count
+            return len(genotypes)
+        except Exception as e:
+            logger.error(f"Failed to import {name}: {e}")
+            counts["failed"] += 1
+            manifest.write(json.dumps({"file": name, "error": str(e)}) + "\n")
+            return 0
+        finally:
+            if staged:
+                discard_staged(path)
+
+    async def _write_batch(self, parsed: List[Dict[str, Any]], counts: Dict[str, int], manifest):
+        """Upsert one batch of users, reports and genotype tables, then record it in the manifest
+
+        Every write is keyed (users by email, reports by their derived ID, genotype
+        chunks by report and sequence), so a batch interrupted before its manifest
+        entries were written is rewritten in place when the import resumes.
+        """
+        # Participants who already have an account (or appear twice) keep one user
+        emails = list({item["user"].email for item in parsed})
+        user_ids = {
+            user["email"]: user["id"]
+            async for user in self.db.users.find({"email": {"$in": emails}}, {"_id": 0, "id": 1, "email": 1})
+        }
+
+        users = []
+        reports = []
+        genotypes = []
+        for item in parsed:
+            user, report = item["user"], item["report"]
+            if user.email not in user_ids:
+                user_ids[user.email] = user.id
+                users.append(UpdateOne({"email": user.email}, {"$setOnInsert": user.dict()}, upsert=True))
+            report.user_id = user_ids[user.email]
+            reports.append(UpdateOne({"id": report.id}, {"$setOnInsert": report.dict()}, upsert=True))
+            genotypes.extend(
+                UpdateOne({"dna_report_id": chunk["dna_report_id"], "seq": chunk["seq"]}, {"$setOnInsert": chunk}, upsert=True)
+                for chunk in genotype_chunks(report.id, item["genotypes"])
+            )
+
+        if users:
+            await self.db.users.bulk_write(users, ordered=False)
+        await self.db.dna_reports.bulk_write(reports, ordered=False)
+        if genotypes:
+            await self.db.dna_genotypes.bulk_write(genotypes, ordered=False)
+        await ResourceVersions(self.db).bump_many((user_key(item["report"].user_id) for item in parsed), "users", "dna_reports")
+
+        for item in parsed:
+            report = item["report"]
+            manifest.write(json.dumps({"file": item["name"], "user_id": report.user_id, "report_id": report.id}) + "\n")
+            counts["bytes"] += report.file_size
+        manifest.flush()
+        os.fsync(manifest.fileno())
+        counts["imported"] += len(parsed)
+
+    async def narrate_pending(self, manifest_path: Path, pipeline: DNAAnalysisPipeline, concurrency: int) -> Dict[str, int]:
+        """Run the AI analysis for imported reports that don't have one yet"""
+        report_ids = [entry["report_id"] for entry in read_manifest(manifest_path).values()]
+        counts = {"analyzed": 0, "failed": 0}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def analyze(report):
+            async with semaphore:
+                try:
+                    await pipeline.complete(
+                        report["id"], report["user_id"], report["filename"], DNAProvider(report["provider"]),
+                        [GeneticMarker(**marker) for marker in report["genetic_markers"]]
+                    )
+                    counts["analyzed"] += 1
+                except Exception as e:
+                    logger.error(f"DNA analysis failed for report {report['id']}: {e}")
+                    counts["failed"] += 1
+
+        # Look reports up in slices so the $in list stays small
+        for start in range(0, len(report_ids), self.batch_size):
+            reports = await self.db.dna_reports.find(
+                {"id": {"$in": report_ids[start:start + self.batch_size]}, "analysis_status": AnalysisStatus.UPLOADED},
+                {"_id": 0}
+            ).to_list(None)
+            await asyncio.gather(*(analyze(report) for report in reports))
+
+        return counts
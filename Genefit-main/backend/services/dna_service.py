@@ -1,61 +1,257 @@
-import base64
+import gzip
+import hashlib
+import io
+import itertools
 import json
+import multiprocessing
+import os
 import re
-from typing import List, Dict, Any, Optional
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Iterator, IO, Set, Tuple
 from models.dna import DNAReport, GeneticMarker, DNAProvider, AnalysisStatus
 from models.user import User
+from services.vcf_index import is_bgzf, load_or_build_index, normalize_chromosome
+from services.staging import map_file, iter_mapped_lines
+from services.metrics import PIPELINE_STAGE_SECONDS
 import logging
 import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Plain-text files at least this large are parsed in parallel byte ranges
+PARALLEL_PARSE_MIN_BYTES = int(os.environ.get('PARALLEL_PARSE_MIN_BYTES', str(16 * 1024 * 1024)))
+
+# Reference build of the panel's positions; files on other builds are matched by rsID only
+PANEL_BUILD = 'GRCh37'
+
+# Names a VCF header may use for each build (##reference, ##contig assembly=)
+BUILD_ALIASES = {
+    'GRCh37': ('grch37', 'hg19', 'hs37', 'b37', 'g1k_v37', 'build37'),
+    'GRCh38': ('grch38', 'hg38', 'hs38', 'b38', 'build38'),
+    'T2T-CHM13': ('chm13', 't2t'),
+}
+
+# Length of chromosome 1 in each build, for headers that list contigs without naming the assembly
+CHR1_LENGTHS = {'249250621': 'GRCh37', '248956422': 'GRCh38', '248387328': 'T2T-CHM13'}
+
 class DNAAnalysisService:
-    def __init__(self):
+    def __init__(self, parse_workers: Optional[int] = None):
+        self.parse_workers = parse_workers or int(os.environ.get('PARSE_WORKERS', '0')) or os.cpu_count() or 1
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        # Files are parsed on several threads at once; only one may start the pool
+        self._parse_pool_lock = threading.Lock()
+        
         # Common genetic markers for health analysis
         self.health_markers = {
-            'rs7412': {'gene': 'APOE', 'condition': 'Alzheimer\'s risk', 'risk_allele': 'T'},
-            'rs429358': {'gene': 'APOE', 'condition': 'Cardiovascular risk', 'risk_allele': 'C'},
-            'rs1801282': {'gene': 'PPARG', 'condition': 'Type 2 Diabetes', 'risk_allele': 'G'},
-            'rs1800497': {'gene': 'DRD2', 'condition': 'Addiction susceptibility', 'risk_allele': 'A'},
-            'rs1815739': {'gene': 'ACTN3', 'condition': 'Athletic performance', 'risk_allele': 'T'},
-            'rs1799752': {'gene': 'ACE', 'condition': 'Athletic endurance', 'risk_allele': 'D'},
-            'rs1801133': {'gene': 'MTHFR', 'condition': 'Folate metabolism', 'risk_allele': 'T'},
-            'rs2032582': {'gene': 'COMT', 'condition': 'Stress response', 'risk_allele': 'T'},
-            'rs12255372': {'gene': 'TCF7L2', 'condition': 'Type 2 Diabetes', 'risk_allele': 'T'},
-            'rs4988235': {'gene': 'LCT', 'condition': 'Lactose tolerance', 'risk_allele': 'C'},
+            'rs7412': {'gene': 'APOE', 'condition': 'Alzheimer\'s risk', 'risk_allele': 'T', 'chromosome': '19', 'position': 45412079},
+            'rs429358': {'gene': 'APOE', 'condition': 'Cardiovascular risk', 'risk_allele': 'C', 'chromosome': '19', 'position': 45411941},
+            'rs1801282': {'gene': 'PPARG', 'condition': 'Type 2 Diabetes', 'risk_allele': 'G', 'chromosome': '3', 'position': 12393125},
+            'rs1800497': {'gene': 'DRD2', 'condition': 'Addiction susceptibility', 'risk_allele': 'A', 'chromosome': '11', 'position': 113270828},
+            'rs1815739': {'gene': 'ACTN3', 'condition': 'Athletic performance', 'risk_allele': 'T', 'chromosome': '11', 'position': 66328095},
+            'rs1799752': {'gene': 'ACE', 'condition': 'Athletic endurance', 'risk_allele': 'D', 'chromosome': '17', 'position': 61565891},
+            'rs1801133': {'gene': 'MTHFR', 'condition': 'Folate metabolism', 'risk_allele': 'T', 'chromosome': '1', 'position': 11856378},
+            'rs2032582': {'gene': 'COMT', 'condition': 'Stress response', 'risk_allele': 'T', 'chromosome': '7', 'position': 87160618},
+            'rs12255372': {'gene': 'TCF7L2', 'condition': 'Type 2 Diabetes', 'risk_allele': 'T', 'chromosome': '10', 'position': 114808902},
+            'rs4988235': {'gene': 'LCT', 'condition': 'Lactose tolerance', 'risk_allele': 'C', 'chromosome': '2', 'position': 136608646},
+        }
+        
+        # GRCh37 positions of the panel, for VCFs that leave the ID column empty
+        self.panel_positions = {
+            (info['chromosome'], info['position']): rsid
+            for rsid, info in self.health_markers.items()
         }
+        
+        # Stored reports record the panel version they were scored against
+        self.panel_version = panel_version(self.health_markers)
 
-    async def process_dna_file(self, file_content: str, filename: str, provider: DNAProvider) -> List[GeneticMarker]:
-        """Process DNA file content and extract genetic markers"""
+    async def process_dna_file(self, path: str, filename: str, provider: DNAProvider, index_path: Optional[str] = None) -> Tuple[List[GeneticMarker], bytes]:
+        """Process a staged DNA file; returns the health markers and the encoded genotype table"""
         try:
-            # Decode base64 content
-            decoded_content = base64.b64decode(file_content).decode('utf-8')
-            
-            # Parse based on file format
-            if filename.endswith('.txt'):
-                markers = self._parse_23andme_format(decoded_content)
-            elif filename.endswith('.csv'):
-                markers = self._parse_csv_format(decoded_content)
-            elif filename.endswith('.vcf'):
-                markers = self._parse_vcf_format(decoded_content)
-            else:
-                # Try to auto-detect format
-                markers = self._auto_detect_and_parse(decoded_content)
+            # Parsing is CPU-bound, so keep it off the event loop
+            with PIPELINE_STAGE_SECONDS.time(stage="parse"):
+                markers, genotypes = await asyncio.to_thread(self._parse_file, path, filename, index_path)
             
             # Filter for health-relevant markers
-            health_markers = self._filter_health_markers(markers)
+            with PIPELINE_STAGE_SECONDS.time(stage="filter_health_markers"):
+                health_markers = self._filter_health_markers(markers)
             
             logger.info(f"Processed {len(markers)} total markers, {len(health_markers)} health-relevant")
-            return health_markers
+            return health_markers, genotypes
             
         except Exception as e:
             logger.error(f"Error processing DNA file: {e}")
             raise ValueError(f"Failed to process DNA file: {str(e)}")
 
-    def _parse_23andme_format(self, content: str) -> List[GeneticMarker]:
+    async def process_multi_sample_vcf(self, path: str, filename: str, sample_names: List[str], index_path: Optional[str] = None) -> Dict[str, Tuple[List[GeneticMarker], bytes]]:
+        """Extract panel markers and genotype tables for several VCF sample columns in a single pass"""
+        try:
+            with PIPELINE_STAGE_SECONDS.time(stage="parse_multi_sample"):
+                samples = await asyncio.to_thread(self._parse_multi_sample_file, path, filename, sample_names, index_path)
+            
+            health_markers = {
+                name: (self._filter_health_markers(markers), genotypes)
+                for name, (markers, genotypes) in samples.items()
+            }
+            
+            logger.info(f"Processed {len(sample_names)} VCF samples in one pass")
+            return health_markers
+            
+        except Exception as e:
+            logger.error(f"Error processing multi-sample VCF: {e}")
+            raise ValueError(f"Failed to process multi-sample VCF: {str(e)}")
+
+    def _parse_file(self, path: str, filename: str, index_path: Optional[str]) -> Tuple[List[GeneticMarker], bytes]:
+        """Parse a staged file into markers plus the encoded genotype table to retain"""
+        with open(path, 'rb') as raw:
+            build = self._header_build(raw, filename)
+            if self._is_indexable_vcf(raw, filename) and build == PANEL_BUILD:
+                # Whole-genome VCFs: seek to the panel positions instead of reading every line
+                index_data = Path(index_path).read_bytes() if index_path else None
+                markers = self._parse_indexed_vcf(raw, index_data)
+            elif self.parse_workers > 1 and os.fstat(raw.fileno()).st_size >= PARALLEL_PARSE_MIN_BYTES and not self._is_compressed(raw):
+                return self._parse_file_parallel(raw, path, filename, build)
+            else:
+                with self._open_lines(raw, filename) as (lines, inner_name):
+                    markers = self._parse_lines(lines, inner_name, build)
+        
+        return markers, encode_genotypes(markers, build)
+
+    def _header_build(self, raw: IO[bytes], filename: str) -> Optional[str]:
+        """Reference build declared by a VCF's meta-information lines, or None"""
+        build = None
+        is_vcf = False
+        with self._open_lines(raw, filename) as (lines, _):
+            for line in lines:
+                if not line.startswith('#'):
+                    break
+                is_vcf = is_vcf or line.startswith('##fileformat=VCF')
+                build = build or reference_build(line)
+        raw.seek(0)
+        
+        if is_vcf and build != PANEL_BUILD:
+            # Panel positions are GRCh37; on another build they would land on unrelated variants
+            logger.info(f"{filename}: reference build {build or 'not declared'}, matching panel markers by rsID only")
+        return build
+
+    def _parse_file_parallel(self, raw: IO[bytes], path: str, filename: str, build: Optional[str]) -> Tuple[List[GeneticMarker], bytes]:
+        """Split a plain-text file into newline-aligned ranges and parse them across processes"""
+        with map_file(raw) as buffer:
+            name = filename.lower()
+            if not name.endswith(('.txt', '.csv', '.vcf')):
+                name = self._detect_format(buffer[:64 * 1024].decode('utf-8', errors='replace'))
+            ranges = split_line_ranges(buffer, self.parse_workers * 4)
+        
+        results = self._get_parse_pool().map(
+            _parse_range_worker,
+            itertools.repeat(path), [start for start, _ in ranges], [end for _, end in ranges], itertools.repeat(name),
+            itertools.repeat(build)
+        )
+        markers = []
+        genotypes = []
+        for chunk_markers, chunk_genotypes in results:
+            markers.extend(chunk_markers)
+            genotypes.append(chunk_genotypes)
+        
+        logger.info(f"Parsed {len(ranges)} ranges across {self.parse_workers} workers")
+        # Gzip members concatenate into one valid stream
+        return markers, b''.join(genotypes)
+
+    def _get_parse_pool(self) -> ProcessPoolExecutor:
+        # Started on first use, so processes that never parse a large file don't spawn workers
+        with self._parse_pool_lock:
+            if self._parse_pool is None:
+                # Spawned workers don't inherit the API process's threads or Mongo client
+                self._parse_pool = ProcessPoolExecutor(self.parse_workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._parse_pool
+
+    def close(self):
+        """Stop parse worker processes"""
+        with self._parse_pool_lock:
+            pool, self._parse_pool = self._parse_pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def _is_compressed(self, raw: IO[bytes]) -> bool:
+        magic = raw.read(4)
+        raw.seek(0)
+        return magic.startswith((b'PK\x03\x04', b'\x1f\x8b'))
+
+    def _parse_multi_sample_file(self, path: str, filename: str, sample_names: List[str], index_path: Optional[str]) -> Dict[str, Tuple[List[GeneticMarker], bytes]]:
+        with open(path, 'rb') as raw:
+            build = self._header_build(raw, filename)
+            if self._is_indexable_vcf(raw, filename) and build == PANEL_BUILD:
+                index_data = Path(index_path).read_bytes() if index_path else None
+                reader, index = load_or_build_index(raw, index_data)
+                header = next(
+                    (line for line in reader.iter_lines(0) if line.startswith(b'#CHROM') or not line.startswith(b'#')),
+                    b''
+                )
+                lines = (
+                    line.decode('utf-8', errors='replace')
+                    for line in itertools.chain([header], index.query(reader, self._panel_targets()))
+                )
+                samples = self._parse_multi_sample_vcf(lines, sample_names, build)
+            else:
+                with self._open_lines(raw, filename) as (lines, _):
+                    samples = self._parse_multi_sample_vcf(lines, sample_names, build)
+        
+        return {name: (markers, encode_genotypes(markers, build)) for name, markers in samples.items()}
+
+    def _is_indexable_vcf(self, raw: IO[bytes], filename: str) -> bool:
+        return bool(re.search(r'\.vcf\.(gz|bgz)$', filename.lower())) and is_bgzf(raw)
+
+    @contextmanager
+    def _open_lines(self, raw: IO[bytes], filename: str) -> Iterator[Tuple[Iterable[str], str]]:
+        """Yield (lines, inner filename), decompressing zip/gzip/BGZF on the fly and mmapping plain text"""
+        name = filename.lower()
+        magic = raw.read(4)
+        raw.seek(0)
+        
+        if magic.startswith(b'PK\x03\x04'):
+            with zipfile.ZipFile(raw) as archive:
+                member = self._select_archive_member(archive)
+                with io.TextIOWrapper(archive.open(member), encoding='utf-8', errors='replace') as text:
+                    yield text, member.lower()
+        elif magic.startswith(b'\x1f\x8b'):
+            # BGZF is a series of gzip members, which GzipFile reads back to back
+            with io.TextIOWrapper(gzip.GzipFile(fileobj=raw), encoding='utf-8', errors='replace') as text:
+                yield text, re.sub(r'\.(gz|bgz)$', '', name)
+        else:
+            with map_file(raw) as buffer:
+                yield iter_mapped_lines(buffer), name
+
+    def _select_archive_member(self, archive: zipfile.ZipFile) -> str:
+        """Pick the raw-data file inside a provider's zip download"""
+        candidates = [
+            info for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+        ]
+        if not candidates:
+            raise ValueError("Archive contains no files")
+        
+        genotype_files = [info for info in candidates if info.filename.lower().endswith(('.txt', '.csv', '.vcf'))]
+        # Raw data is by far the largest file next to any README
+        return max(genotype_files or candidates, key=lambda info: info.file_size).filename
+
+    def _parse_lines(self, lines: Iterable[str], name: str, build: Optional[str] = None) -> List[GeneticMarker]:
+        """Parse based on file format; build is the VCF reference build, if declared"""
+        if name.endswith('.txt'):
+            return self._parse_23andme_format(lines)
+        elif name.endswith('.csv'):
+            return self._parse_csv_format(lines)
+        elif name.endswith('.vcf'):
+            return self._parse_vcf_format(lines, build)
+        
+        # Try to auto-detect format
+        return self._auto_detect_and_parse(lines, build)
+
+    def _parse_23andme_format(self, lines: Iterable[str]) -> List[GeneticMarker]:
         """Parse 23andMe format (tab-separated)"""
         markers = []
-        lines = content.strip().split('\n')
         
         for line in lines:
             if line.startswith('#') or not line.strip():
@@ -79,17 +275,20 @@ class DNAAnalysisService:
         
         return markers
 
-    def _parse_csv_format(self, content: str) -> List[GeneticMarker]:
+    def _parse_csv_format(self, lines: Iterable[str]) -> List[GeneticMarker]:
         """Parse CSV format (AncestryDNA, MyHeritage)"""
         markers = []
-        lines = content.strip().split('\n')
+        header_checked = False
         
-        # Skip header if present
-        start_idx = 1 if lines and ('rsid' in lines[0].lower() or 'chromosome' in lines[0].lower()) else 0
-        
-        for line in lines[start_idx:]:
+        for line in lines:
             if not line.strip():
                 continue
+            
+            # Skip header if present
+            if not header_checked:
+                header_checked = True
+                if 'rsid' in line.lower() or 'chromosome' in line.lower():
+                    continue
                 
             parts = line.split(',')
             if len(parts) >= 4:
@@ -109,10 +308,10 @@ class DNAAnalysisService:
         
         return markers
 
-    def _parse_vcf_format(self, content: str) -> List[GeneticMarker]:
-        """Parse VCF format"""
+    def _parse_vcf_format(self, lines: Iterable[str], build: Optional[str] = None) -> List[GeneticMarker]:
+        """Parse VCF format, naming panel positions by rsID when the file is on the panel's build"""
         markers = []
-        lines = content.strip().split('\n')
+        positions = self.panel_positions if build == PANEL_BUILD else {}
         
         for line in lines:
             if line.startswith('#') or not line.strip():
@@ -131,16 +330,81 @@ class DNAAnalysisService:
                 genotype = self._parse_vcf_genotype(genotype_data, ref, alt)
                 
                 if genotype:
+                    position = int(position) if position.isdigit() else 0
+                    if rsid not in self.health_markers:
+                        # Rows without (or with an unknown) rsID at a panel position
+                        rsid = positions.get((normalize_chromosome(chromosome), position), rsid)
                     marker = GeneticMarker(
                         rsid=rsid,
                         chromosome=chromosome,
-                        position=int(position) if position.isdigit() else 0,
+                        position=position,
                         genotype=genotype
                     )
                     markers.append(marker)
         
         return markers
 
+    def _parse_indexed_vcf(self, raw: IO[bytes], index_data: Optional[bytes]) -> List[GeneticMarker]:
+        """Parse only the panel positions of a bgzipped GRCh37 VCF through its tabix index"""
+        reader, index = load_or_build_index(raw, index_data)
+        
+        lines = (line.decode('utf-8', errors='replace') for line in index.query(reader, self._panel_targets()))
+        return self._parse_vcf_format(lines, PANEL_BUILD)
+
+    def _panel_targets(self) -> Dict[str, List[int]]:
+        """Panel positions grouped by chromosome"""
+        targets: Dict[str, List[int]] = {}
+        for chromosome, position in self.panel_positions:
+            targets.setdefault(chromosome, []).append(position)
+        return targets
+
+    def _parse_multi_sample_vcf(self, lines: Iterable[str], sample_names: List[str], build: Optional[str] = None) -> Dict[str, List[GeneticMarker]]:
+        """Parse a multi-sample VCF, reading genotypes only on panel rows"""
+        samples: Dict[str, List[GeneticMarker]] = {name: [] for name in sample_names}
+        columns: Optional[Dict[str, int]] = None
+        positions = self.panel_positions if build == PANEL_BUILD else {}
+        
+        for line in lines:
+            if line.startswith('##') or not line.strip():
+                continue
+            
+            parts = line.rstrip('\r\n').split('\t')
+            if line.startswith('#CHROM'):
+                missing = [name for name in sample_names if name not in parts[9:]]
+                if missing:
+                    raise ValueError(f"Samples not found in VCF: {', '.join(missing)}")
+                columns = {name: parts.index(name, 9) for name in sample_names}
+                continue
+            
+            if columns is None:
+                raise ValueError("VCF header (#CHROM) not found")
+            if len(parts) < 10:
+                continue
+            
+            chromosome = parts[0].strip()
+            position = int(parts[1]) if parts[1].isdigit() else 0
+            rsid = parts[2].strip()
+            
+            # Skip non-panel rows before touching any sample column
+            if rsid not in self.health_markers:
+                rsid = positions.get((normalize_chromosome(chromosome), position))
+                if not rsid:
+                    continue
+            
+            ref = parts[3].strip()
+            alt = parts[4].strip()
+            for name, column in columns.items():
+                genotype = self._parse_vcf_genotype(parts[column].strip(), ref, alt)
+                if genotype:
+                    samples[name].append(GeneticMarker(
+                        rsid=rsid,
+                        chromosome=chromosome,
+                        position=position,
+                        genotype=genotype
+                    ))
+        
+        return samples
+
     def _parse_vcf_genotype(self, genotype_data: str, ref: str, alt: str) -> str:
         """Parse genotype from VCF format"""
         try:
@@ -157,19 +421,26 @@ class DNAAnalysisService:
             pass
         return ""
 
-    def _auto_detect_and_parse(self, content: str) -> List[GeneticMarker]:
-        """Auto-detect file format and parse"""
+    def _auto_detect_and_parse(self, lines: Iterable[str], build: Optional[str] = None) -> List[GeneticMarker]:
+        """Auto-detect file format from the first lines and parse"""
+        lines = iter(lines)
+        head = list(itertools.islice(lines, 200))
+        
+        return self._parse_lines(itertools.chain(head, lines), self._detect_format('\n'.join(head)), build)
+
+    def _detect_format(self, content: str) -> str:
+        """Guess the format of a file from its first lines, as a file extension"""
+        # Check if it looks like VCF (before 23andMe, since VCF is tab-separated too)
+        if '##fileformat=VCF' in content or '#CHROM' in content:
+            return '.vcf'
+        
         # Check if it looks like 23andMe format (tab-separated)
-        if '\t' in content and 'rs' in content:
-            return self._parse_23andme_format(content)
+        elif '\t' in content and 'rs' in content:
+            return '.txt'
         
         # Check if it looks like CSV
         elif ',' in content and 'rs' in content:
-            return self._parse_csv_format(content)
-        
-        # Check if it looks like VCF
-        elif '#CHROM' in content or 'CHROM\tPOS' in content:
-            return self._parse_vcf_format(content)
+            return '.csv'
         
         else:
             raise ValueError("Unrecognized file format")
@@ -179,7 +450,7 @@ class DNAAnalysisService:
         health_markers = []
         
         for marker in markers:
-            if marker.rsid in self.health_markers:
+            if self._match_panel(marker):
                 marker_info = self.health_markers[marker.rsid]
                 
                 # Add health-related metadata
@@ -193,18 +464,65 @@ class DNAAnalysisService:
         
         return health_markers
 
-    async def simulate_analysis_progress(self, dna_report_id: str, callback=None):
-        """Simulate analysis progress for demo purposes"""
-        total_markers = 900
-        steps = [100, 250, 450, 650, 847, 900]
+    def _match_panel(self, marker: GeneticMarker) -> bool:
+        """Whether a marker is on the panel; parsers already named build-matched panel positions by rsID"""
+        return marker.rsid in self.health_markers
+
+    def _table_positions(self, genotypes: bytes) -> Dict[Tuple[str, int], str]:
+        """Panel positions usable on a genotype table, which depends on the build it was parsed from"""
+        return self.panel_positions if genotypes_build(genotypes) == PANEL_BUILD else {}
+
+    def rescore(self, markers: List[GeneticMarker], old_panel: Dict[str, Dict[str, Any]], genotypes: Optional[bytes]) -> List[GeneticMarker]:
+        """Bring a report's markers up to the current panel, rescoring only added or changed markers"""
+        changed = changed_markers(old_panel, self.health_markers)
         
-        for i, markers_analyzed in enumerate(steps):
-            await asyncio.sleep(1.5)  # Simulate processing time
-            
-            if callback:
-                await callback(dna_report_id, markers_analyzed, total_markers)
-            
-            logger.info(f"Analysis progress: {markers_analyzed}/{total_markers} markers")
+        kept = [m for m in markers if m.rsid in self.health_markers and m.rsid not in changed]
+        rescored = self._filter_health_markers([m for m in markers if m.rsid in changed])
+        
+        # Markers the report never had come from the retained genotype table
+        missing = changed - {m.rsid for m in rescored}
+        if missing and genotypes:
+            rescored.extend(self.rescore_genotypes(genotypes, missing))
+        
+        order = {rsid: i for i, rsid in enumerate(self.health_markers)}
+        return sorted(kept + rescored, key=lambda m: order[m.rsid])
+
+    def rescore_genotypes(self, genotypes: bytes, rsids: Set[str]) -> List[GeneticMarker]:
+        """Score the given panel markers from an encoded genotype table"""
+        positions = {key: rsid for key, rsid in self._table_positions(genotypes).items() if rsid in rsids}
+        
+        candidates = [
+            GeneticMarker(
+                rsid=rsid if rsid in rsids else positions[(normalize_chromosome(chromosome), int(position))],
+                chromosome=chromosome, position=int(position), genotype=genotype
+            )
+            for rsid, chromosome, position, genotype in decode_genotypes(genotypes)
+            if rsid in rsids or (normalize_chromosome(chromosome), int(position)) in positions
+        ]
+        
+        return [m for m in self._filter_health_markers(candidates) if m.rsid in rsids]
+
+    def reanalyze(self, genotypes: Optional[bytes], markers: List[GeneticMarker]) -> Tuple[List[GeneticMarker], int]:
+        """Re-parse and re-score a report from its genotype table (or its stored markers without one)
+
+        Returns the health markers and the number of genotypes parsed.
+        """
+        if not genotypes:
+            return self._filter_health_markers(markers), len(markers)
+        
+        parsed = 0
+        candidates = []
+        positions = self._table_positions(genotypes)
+        for rsid, chromosome, position, genotype in decode_genotypes(genotypes):
+            parsed += 1
+            # Only build marker objects for panel hits, by rsID or (on the panel's build) position
+            if rsid not in self.health_markers:
+                rsid = positions.get((normalize_chromosome(chromosome), int(position)))
+                if not rsid:
+                    continue
+            candidates.append(GeneticMarker(rsid=rsid, chromosome=chromosome, position=int(position), genotype=genotype))
+        
+        return self._filter_health_markers(candidates), parsed
 
     def get_genetic_summary(self, markers: List[GeneticMarker]) -> Dict[str, Any]:
         """Generate summary of genetic analysis"""
@@ -219,4 +537,124 @@ class DNAAnalysisService:
             ])),
         }
         
-        return summary
\ No newline at end of file
+        return summary
+
+def panel_version(panel: Dict[str, Dict[str, Any]]) -> str:
+    """Stable fingerprint of a marker panel definition"""
+    return hashlib.sha256(json.dumps(panel, sort_keys=True).encode()).hexdigest()[:12]
+
+def changed_markers(old_panel: Dict[str, Dict[str, Any]], new_panel: Dict[str, Dict[str, Any]]) -> Set[str]:
+    """rsIDs that are new in new_panel or whose definition differs from old_panel"""
+    return {rsid for rsid, info in new_panel.items() if old_panel.get(rsid) != info}
+
+def reference_build(line: str) -> Optional[str]:
+    """Reference build named by a VCF ##reference or ##contig line, or None"""
+    lowered = line.lower()
+    if lowered.startswith('##reference='):
+        value = lowered[len('##reference='):]
+    elif lowered.startswith('##contig=<'):
+        assembly = re.search(r'assembly=([^,>]+)', lowered)
+        value = assembly.group(1) if assembly else ''
+        if not value and re.search(r'id=(chr)?1[,>]', lowered):
+            length = re.search(r'length=(\d+)', lowered)
+            return CHR1_LENGTHS.get(length.group(1)) if length else None
+    else:
+        return None
+    
+    for build, aliases in BUILD_ALIASES.items():
+        if any(alias in value for alias in aliases):
+            return build
+    return None
+
+def encode_genotypes(markers: Iterable[GeneticMarker], build: Optional[str] = None) -> bytes:
+    """Gzipped TSV of parsed genotypes, retained so markers can be rescored without the upload
+
+    The first row records the file's reference build, which decides whether
+    panel positions may be matched when the table is rescored.
+    """
+    rows = f"#build\t{build or ''}\n" + ''.join(f"{m.rsid}\t{m.chromosome}\t{m.position}\t{m.genotype}\n" for m in markers)
+    return gzip.compress(rows.encode(), compresslevel=6)
+
+def genotypes_build(genotypes: bytes) -> Optional[str]:
+    """Reference build recorded in a genotype table; older tables predate the record and were scored as GRCh37"""
+    with gzip.GzipFile(fileobj=io.BytesIO(genotypes)) as rows:
+        first = rows.readline().decode('utf-8')
+    if first.startswith('#build\t'):
+        return first.rstrip('\n').split('\t')[1] or None
+    return PANEL_BUILD
+
+def decode_genotypes(genotypes: bytes) -> Iterator[Tuple[str, str, str, str]]:
+    """(rsid, chromosome, position, genotype) rows of an encoded genotype table"""
+    with io.TextIOWrapper(gzip.GzipFile(fileobj=io.BytesIO(genotypes)), encoding='utf-8') as rows:
+        for row in rows:
+            if row.startswith('#'):
+                continue
+            rsid, chromosome, position, genotype = row.rstrip('\n').split('\t')
+            yield rsid, chromosome, position, genotype
+
+def split_line_ranges(buffer, parts: int) -> List[Tuple[int, int]]:
+    """Cut a buffer into roughly equal byte ranges that start and end on line boundaries"""
+    size = len(buffer)
+    ranges = []
+    start = 0
+    for i in range(1, parts + 1):
+        if start >= size:
+            break
+        end = size if i == parts else max(size * i // parts, start)
+        if end < size:
+            newline = buffer.find(b'\n', end)
+            end = size if newline == -1 else newline + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+_worker_service: Optional[DNAAnalysisService] = None
+
+def _get_worker_service() -> DNAAnalysisService:
+    """Per-process service for pool workers, which parse files serially"""
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = DNAAnalysisService(parse_workers=1)
+    return _worker_service
+
+def _parse_range_worker(path: str, start: int, end: int, name: str, build: Optional[str]) -> Tuple[List[GeneticMarker], bytes]:
+    """Parse one byte range of a staged file in a worker process, returning panel markers and encoded genotypes
+
+    build comes from the file's header, which only the first range contains.
+    """
+    service = _get_worker_service()
+    with open(path, 'rb') as raw, map_file(raw) as buffer:
+        markers = service._parse_lines(iter_mapped_lines(buffer, start, end), name, build)
+    
+    # Every range's table carries the build row; decoding skips the repeats
+    genotypes = encode_genotypes(markers, build)
+    
+    # Only panel hits travel back as objects; the rest come back compressed
+    return [marker for marker in markers if service._match_panel(marker)], genotypes
+
+def _reanalyze_worker(reports: List[Tuple[str, Optional[bytes], List[Dict[str, Any]]]]) -> List[Optional[Tuple[List[Dict[str, Any]], Dict[str, Any], int]]]:
+    """Re-parse, re-score and summarize a batch of stored reports in a worker process
+
+    Each report comes in as (report ID, genotype table, stored markers) and goes back as
+    (markers, summary, genotypes parsed), or None if it could not be reanalyzed.
+    """
+    service = _get_worker_service()
+    results = []
+    for report_id, genotypes, stored in reports:
+        try:
+            markers, parsed = service.reanalyze(genotypes, [GeneticMarker(**marker) for marker in stored])
+            results.append(([m.dict() for m in markers], service.get_genetic_summary(markers), parsed))
+        except Exception as e:
+            logger.error(f"Reanalysis failed for report {report_id}: {e}")
+            results.append(None)
+    return results
+
+def _import_worker(path: str, filename: str) -> Tuple[List[Dict[str, Any]], bytes, Dict[str, Any], int]:
+    """Parse and score one raw-data file in a worker process for a bulk import
+
+    Returns (health markers, encoded genotype table, summary, genotypes parsed).
+    """
+    service = _get_worker_service()
+    markers, genotypes = service._parse_file(path, filename, None)
+    health_markers = service._filter_health_markers(markers)
+    return [m.dict() for m in health_markers], genotypes, service.get_genetic_summary(health_markers), len(markers)
@@ -0,0 +1,229 @@
+import asyncio
+import codecs
+import itertools
+import json
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import List, Dict, Any, Optional, Iterator, IO, Callable, Awaitable
+from datetime import datetime, timezone
+from models.health import WearableData, HealthExportSource
+from services.wearable_service import WearableService, WEARABLE_UNITS
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Apple Health record types mapped to our wearable metrics
+APPLE_HEALTH_TYPES = {
+    'HKQuantityTypeIdentifierStepCount': 'steps',
+    'HKQuantityTypeIdentifierHeartRate': 'heart_rate',
+    'HKQuantityTypeIdentifierActiveEnergyBurned': 'calories',
+    'HKQuantityTypeIdentifierAppleExerciseTime': 'active_minutes',
+    'HKCategoryTypeIdentifierSleepAnalysis': 'sleep_hours',
+}
+
+# Google Fit (Takeout "All Data") data types mapped to our wearable metrics
+GOOGLE_FIT_TYPES = {
+    'com.google.step_count.delta': 'steps',
+    'com.google.heart_rate.bpm': 'heart_rate',
+    'com.google.calories.expended': 'calories',
+    'com.google.active_minutes': 'active_minutes',
+    'com.google.sleep.segment': 'sleep_hours',
+}
+
+# Google Fit sleep stages that count as sleep (1 = awake, 3 = out of bed)
+GOOGLE_FIT_SLEEP_STAGES = {2, 4, 5, 6}
+
+class HealthExportImporter:
+    def __init__(self, wearable_service: WearableService, batch_size: int = 5000):
+        self.wearable_service = wearable_service
+        self.batch_size = batch_size
+
+    async def import_file(
+        self,
+        path: str,
+        user_id: str,
+        source: HealthExportSource,
+        progress_callback: Optional[Callable[[int, int], Awaitable[None]]] = None
+    ) -> int:
+        """Stream-parse a health export and batch-insert samples into wearable storage"""
+        records = self.iter_export(path, user_id, source)
+        imported = 0
+        batches = 0
+
+        while True:
+            # Parsing is blocking, so pull each batch off the event loop
+            batch = await asyncio.to_thread(self._next_batch, records)
+            if not batch:
+                break
+
+            imported += await self.wearable_service.ingest(batch)
+            batches += 1
+
+            if progress_callback:
+                await progress_callback(imported, batches)
+
+            logger.info(f"Import progress for user {user_id}: {imported} samples in {batches} batches")
+
+        return imported
+
+    def iter_export(self, path: str, user_id: str, source: HealthExportSource) -> Iterator[Dict[str, Any]]:
+        """Yield wearable entries from a raw or zipped export without loading it into memory"""
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for member in self._export_members(archive, source):
+                    with archive.open(member) as stream:
+                        yield from self._iter_stream(stream, user_id, source)
+        else:
+            with open(path, 'rb') as stream:
+                yield from self._iter_stream(stream, user_id, source)
+
+    def _export_members(self, archive: zipfile.ZipFile, source: HealthExportSource) -> List[str]:
+        """Pick the archive members that hold samples for the given source"""
+        names = [name for name in archive.namelist() if not name.endswith('/')]
+        if source == HealthExportSource.APPLE_HEALTH:
+            return [name for name in names if name.endswith('export.xml')]
+        return [name for name in names if name.endswith('.json')]
+
+    def _iter_stream(self, stream: IO[bytes], user_id: str, source: HealthExportSource) -> Iterator[Dict[str, Any]]:
+        if source == HealthExportSource.APPLE_HEALTH:
+            return self._iter_apple_health(stream, user_id)
+        return self._iter_google_fit(stream, user_id)
+
+    def _iter_apple_health(self, stream: IO[bytes], user_id: str) -> Iterator[Dict[str, Any]]:
+        """Parse Apple Health export.xml incrementally, clearing elements as we go"""
+        depth = 0
+        root = None
+
+        for event, elem in ET.iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+
+            depth -= 1
+            if elem.tag == 'Record':
+                entry = self._apple_health_entry(elem.attrib, user_id)
+                if entry:
+                    yield entry
+
+            # Drop finished top-level elements so memory stays bounded
+            if depth == 1:
+                root.clear()
+
+    def _apple_health_entry(self, attrib: Dict[str, str], user_id: str) -> Optional[Dict[str, Any]]:
+        data_type = APPLE_HEALTH_TYPES.get(attrib.get('type'))
+        if not data_type:
+            return None
+
+        start = self._parse_apple_date(attrib['startDate'])
+        if data_type == 'sleep_hours':
+            if 'Asleep' not in attrib.get('value', ''):
+                return None
+            value = (self._parse_apple_date(attrib['endDate']) - start).total_seconds() / 3600
+        else:
+            try:
+                value = float(attrib['value'])
+            except (KeyError, ValueError):
+                return None
+            # Apple reports energy in kJ for some locales
+            if data_type == 'calories' and attrib.get('unit') == 'kJ':
+                value = value / 4.184
+
+        return self._entry(user_id, attrib.get('sourceName', 'Apple Health'), data_type, value, start)
+
+    def _iter_google_fit(self, stream: IO[bytes], user_id: str) -> Iterator[Dict[str, Any]]:
+        """Parse a Google Fit Takeout JSON file point by point"""
+        for point in self._iter_json_array(stream, 'Data Points'):
+            entry = self._google_fit_entry(point, user_id)
+            if entry:
+                yield entry
+
+    def _google_fit_entry(self, point: Dict[str, Any], user_id: str) -> Optional[Dict[str, Any]]:
+        data_type = GOOGLE_FIT_TYPES.get(point.get('dataTypeName'))
+        if not data_type or not point.get('fitValue'):
+            return None
+
+        raw = point['fitValue'][0].get('value', {})
+        value = raw.get('fpVal', raw.get('intVal'))
+        if value is None:
+            return None
+
+        start_nanos = int(point['startTimeNanos'])
+        if data_type == 'sleep_hours':
+            if int(value) not in GOOGLE_FIT_SLEEP_STAGES:
+                return None
+            value = (int(point['endTimeNanos']) - start_nanos) / 3.6e12
+
+        recorded_at = datetime.utcfromtimestamp(start_nanos / 1e9)
+        device_name = point.get('originDataSourceId') or 'Google Fit'
+        return self._entry(user_id, device_name, data_type, float(value), recorded_at)
+
+    def _iter_json_array(self, stream: IO[bytes], key: str, chunk_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+        """Yield the objects of a top-level JSON array one at a time from a byte stream"""
+        decoder = json.JSONDecoder()
+        # Holds back a multibyte character split across chunks until its remaining bytes arrive
+        text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        marker = f'"{key}"'
+        buffer = ''
+        in_array = False
+        eof = False
+
+        while True:
+            if not eof:
+                chunk = stream.read(chunk_size)
+                buffer += text_decoder.decode(chunk, final=not chunk)
+                if not chunk:
+                    eof = True
+
+            if not in_array:
+                idx = buffer.find(marker)
+                if idx == -1:
+                    if eof:
+                        return
+                    # Keep a tail in case the key straddles a chunk boundary
+                    buffer = buffer[-len(marker):]
+                    continue
+                bracket = buffer.find('[', idx + len(marker))
+                if bracket == -1:
+                    if eof:
+                        return
+                    continue
+                buffer = buffer[bracket + 1:]
+                in_array = True
+
+            pos = 0
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buffer) and buffer[pos] == ']':
+                    return
+                try:
+                    obj, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break
+                yield obj
+                pos = end
+
+            buffer = buffer[pos:]
+            if eof:
+                return
+
+    def _entry(self, user_id: str, device_name: str, data_type: str, value: float, recorded_at: datetime) -> Dict[str, Any]:
+        return WearableData(
+            user_id=user_id,
+            device_name=device_name,
+            data_type=data_type,
+            value=value,
+            unit=WEARABLE_UNITS[data_type],
+            recorded_at=recorded_at
+        ).dict()
+
+    def _next_batch(self, records: Iterator[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return list(itertools.islice(records, self.batch_size))
+
+    @staticmethod
+    def _parse_apple_date(value: str) -> datetime:
+        """Convert Apple's '2024-01-01 08:00:00 -0800' timestamps to naive UTC"""
+        parsed = datetime.strptime(value, '%Y-%m-%d %H:%M:%S %z')
+        return parsed.astimezone(timezone.utc).replace(tzinfo=None)
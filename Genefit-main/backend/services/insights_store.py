@@ -0,0 +1,114 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from pymongo import ReturnDocument, ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+from services.metrics import CACHE_REQUESTS
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Users whose current insights are held in memory, and for how long; other
+# processes (CLI reanalysis, other workers) are only seen once an entry ages out
+INSIGHTS_CACHE_SIZE = int(os.environ.get('INSIGHTS_CACHE_SIZE', '1024'))
+INSIGHTS_CACHE_SECONDS = float(os.environ.get('INSIGHTS_CACHE_SECONDS', '300'))
+
+# user_id -> (cached at, current insights or None when the user has no analysis)
+_current_cache: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+# Bumped on every invalidation, so a read that raced one isn't cached
+_invalidations = 0
+
+def invalidate_current(user_id: str):
+    """Drop a user's cached insights; called once an analysis has committed"""
+    global _invalidations
+    _invalidations += 1
+    _current_cache.pop(user_id, None)
+
+def pointer_fields(version: Dict[str, Any]) -> Dict[str, Any]:
+    """What the current pointer copies from a version, so reading it needs no second lookup"""
+    return {
+        "version_id": version.get("id"),
+        "dna_report_id": version["dna_report_id"],
+        "insights": version["insights"],
+        "created_at": version["created_at"],
+    }
+
+class GeneticInsightsStore:
+    """Immutable per-analysis insight versions plus one current pointer per user
+
+    genetic_insights holds a document per completed analysis, never updated
+    in place. genetic_insights_current is keyed by user_id and carries a copy
+    of the newest version, so the lookup plan generation needs is one _id read.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.versions = db.genetic_insights
+        self.current = db.genetic_insights_current
+
+    async def ensure_indexes(self):
+        # A user's versions, newest first; also rebuilds pointers for older data
+        await self.versions.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+
+    async def add_version(self, version: Dict[str, Any], session=None) -> int:
+        """Store a version and make it current; returns its per-user version number"""
+        pointer = await self.current.find_one_and_update(
+            {"_id": version["user_id"]},
+            {"$inc": {"version": 1}, "$set": pointer_fields(version)},
+            projection={"version": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+        version["version"] = pointer["version"]
+        await self.versions.insert_one(version, session=session)
+        return version["version"]
+
+    async def _newest_version(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self.versions.find_one({"user_id": user_id}, {"_id": 0}, sort=[("created_at", DESCENDING)])
+
+    async def repoint(self, user_id: str):
+        """Point a user back at their newest remaining version, e.g. after a failed write was undone"""
+        newest = await self._newest_version(user_id)
+        if newest is None:
+            await self.current.delete_one({"_id": user_id})
+        else:
+            await self.current.update_one({"_id": user_id}, {"$set": pointer_fields(newest)})
+        invalidate_current(user_id)
+
+    async def _backfill(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Create the pointer for insights stored before pointers existed"""
+        newest = await self._newest_version(user_id)
+        if newest is None:
+            return None
+        try:
+            # setOnInsert, so an analysis finishing meanwhile keeps its newer pointer
+            await self.current.update_one(
+                {"_id": user_id},
+                {"$setOnInsert": {**pointer_fields(newest), "version": newest.get("version", 1)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass
+        return newest["insights"]
+
+    async def get_current(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """The user's latest insights, from memory when possible; shared, so callers must not modify them"""
+        cached = _current_cache.get(user_id)
+        if cached is not None and time.monotonic() - cached[0] < INSIGHTS_CACHE_SECONDS:
+            CACHE_REQUESTS.inc(cache="genetic_insights", result="hit")
+            _current_cache.move_to_end(user_id)
+            return cached[1]
+        CACHE_REQUESTS.inc(cache="genetic_insights", result="miss")
+
+        invalidations = _invalidations
+        pointer = await self.current.find_one({"_id": user_id}, {"_id": 0, "insights": 1})
+        insights = pointer["insights"] if pointer else await self._backfill(user_id)
+
+        if invalidations == _invalidations:
+            _current_cache[user_id] = (time.monotonic(), insights)
+            _current_cache.move_to_end(user_id)
+            if len(_current_cache) > INSIGHTS_CACHE_SIZE:
+                _current_cache.popitem(last=False)
+        return insights
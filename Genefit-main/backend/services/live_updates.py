@@ -0,0 +1,156 @@
+import asyncio
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Set
+from pymongo.errors import OperationFailure, PyMongoError
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields pushed per collection; everything else (markers, plan content) stays behind the REST API
+PUSHED_FIELDS = {
+    "dna_reports": ["id", "filename", "analysis_status", "markers_analyzed", "total_markers", "error_message", "analyzed_at"],
+    "health_plans": ["id", "title", "plan_type", "progress", "is_active"],
+    "ai_insights": ["id", "insight_type", "title", "content", "priority", "created_at"],
+    "wearable_data": ["data_type", "value", "unit", "recorded_at"],
+}
+
+# Wearable samples arrive in bulk (syncs, imports), so they are pushed as one summary per interval
+WEARABLE_PUSH_INTERVAL = 1.0
+
+# Messages a slow client may fall behind by before it is told to refetch instead
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Server errors meaning the deployment can't run change streams (standalone mongod)
+CHANGE_STREAMS_UNSUPPORTED = {40573, 40324}
+
+RESYNC = {"type": "resync"}
+
+def change_stream_pipeline() -> List[Dict[str, Any]]:
+    """Only watched collections' inserts and updates, trimmed to the pushed fields on the server"""
+    fields = {"fullDocument.user_id"} | {f"fullDocument.{field}" for names in PUSHED_FIELDS.values() for field in names}
+    return [
+        {"$match": {"ns.coll": {"$in": list(PUSHED_FIELDS)}, "operationType": {"$in": ["insert", "update", "replace"]}}},
+        {"$project": {"operationType": 1, "ns.coll": 1, **{field: 1 for field in sorted(fields)}}},
+    ]
+
+class LiveUpdates:
+    """One change stream per process, fanned out to per-user WebSocket subscribers"""
+
+    def __init__(self, db, retry_seconds: float = 5.0):
+        self.db = db
+        self.retry_seconds = retry_seconds
+        # None until the first stream opens, False when change streams aren't available
+        self.available: Optional[bool] = None
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._wearable_pending: Dict[str, Dict[str, Any]] = {}
+        self._resume_token = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def _watch(self):
+        while True:
+            try:
+                # updateLookup supplies user_id for updates, which only carry the changed fields
+                async with self.db.watch(
+                    change_stream_pipeline(), full_document="updateLookup", resume_after=self._resume_token
+                ) as stream:
+                    self.available = True
+                    logger.info(f"Watching {', '.join(PUSHED_FIELDS)} for live dashboard updates")
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        try:
+                            self._dispatch(change)
+                        except Exception as e:
+                            # One malformed document must not stop updates for everyone else
+                            logger.error(f"Could not push change {change.get('_id')}: {e}")
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                    self.available = False
+                    logger.warning(f"Live dashboard updates disabled, change streams need a replica set: {e}")
+                    self._publish_all(RESYNC)
+                    return
+                # The token may have aged out of the oplog; start from now and let clients resync
+                self._resume_token = None
+                logger.error(f"Change stream failed, reopening in {self.retry_seconds}s: {e}")
+            except PyMongoError as e:
+                logger.error(f"Change stream failed, reopening in {self.retry_seconds}s: {e}")
+            except Exception as e:
+                # Anything else would end the task silently while sockets stay open
+                logger.error(f"Live updates watcher failed, reopening in {self.retry_seconds}s: {e}")
+            # Clients may have missed changes while the stream was down
+            self._publish_all(RESYNC)
+            await asyncio.sleep(self.retry_seconds)
+
+    def _dispatch(self, change: Dict[str, Any]):
+        document = change.get("fullDocument") or {}
+        user_id = document.get("user_id")
+        if user_id not in self._subscribers:
+            return
+
+        collection = change["ns"]["coll"]
+        fields = {field: document[field] for field in PUSHED_FIELDS[collection] if field in document}
+
+        if collection == "wearable_data":
+            self._add_wearable_sample(user_id, fields)
+            return
+
+        self._publish(user_id, {"type": collection, "operation": change["operationType"], "data": fields})
+
+    def _add_wearable_sample(self, user_id: str, sample: Dict[str, Any]):
+        pending = self._wearable_pending.get(user_id)
+        if pending is None:
+            pending = self._wearable_pending[user_id] = {"samples": 0, "latest": {}}
+            asyncio.get_running_loop().call_later(WEARABLE_PUSH_INTERVAL, self._flush_wearables, user_id)
+
+        pending["samples"] += 1
+        data_type = sample.get("data_type")
+        latest = pending["latest"].get(data_type)
+        recorded_at = sample.get("recorded_at")
+        if latest is None or (recorded_at is not None and (latest.get("recorded_at") is None or recorded_at >= latest["recorded_at"])):
+            pending["latest"][data_type] = sample
+
+    def _flush_wearables(self, user_id: str):
+        pending = self._wearable_pending.pop(user_id, None)
+        if pending:
+            self._publish(user_id, {"type": "wearable_data", "operation": "insert", "data": pending})
+
+    def _publish(self, user_id: str, message: Dict[str, Any]):
+        for queue in self._subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too far behind for deltas to be useful; replace the backlog with a refetch request
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    def _publish_all(self, message: Dict[str, Any]):
+        for user_id in list(self._subscribers):
+            self._publish(user_id, message)
@@ -0,0 +1,52 @@
+from typing import Optional
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+
+def get_client() -> httpx.AsyncClient:
+    """One pooled HTTP client for every chat, created on first use"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=httpx.Timeout(120.0, connect=10.0), limits=httpx.Limits(max_connections=200))
+    return _client
+
+class CompletionEndpointChat:
+    """Minimal stand-in for LlmChat that talks to any OpenAI-compatible /chat/completions endpoint"""
+
+    def __init__(self, base_url: str, api_key: str, session_id: str, system_message: str, model: str, max_tokens: int):
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
+        self.api_key = api_key
+        self.session_id = session_id
+        self.system_message = system_message
+        self.model = model
+        self.max_tokens = max_tokens
+        # Token usage reported by the last completion
+        self.usage = None
+
+    async def send_message(self, message) -> str:
+        response = await get_client().post(
+            self.url,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={
+                "model": self.model,
+                "max_tokens": self.max_tokens,
+                "user": self.session_id,
+                "messages": [
+                    {"role": "system", "content": self.system_message},
+                    {"role": "user", "content": message.text},
+                ],
+            },
+        )
+        response.raise_for_status()
+        body = response.json()
+        self.usage = body.get("usage")
+        return body["choices"][0]["message"]["content"]
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,75 @@
+import base64
+import json
+from typing import List, Dict, Any, Optional, Tuple, Callable, AsyncIterator
+from datetime import datetime
+from fastapi import HTTPException
+from services.serialization import encode_json
+from pymongo import DESCENDING
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Default and maximum page sizes for list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(doc: Dict[str, Any], sort_field: str) -> str:
+    """Encode the keyset position of the last document on a page"""
+    value = doc[sort_field]
+    payload = {"v": value.isoformat() if isinstance(value, datetime) else value, "id": doc["id"]}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        value = payload["v"]
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return value, payload["id"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_query(query: Dict[str, Any], sort_field: str, cursor: Optional[str]) -> Dict[str, Any]:
+    """Restrict a query to documents after the cursor in (sort_field, id) descending order"""
+    if not cursor:
+        return query
+
+    value, last_id = decode_cursor(cursor)
+    return {
+        **query,
+        "$or": [
+            {sort_field: {"$lt": value}},
+            {sort_field: value, "id": {"$lt": last_id}},
+        ]
+    }
+
+def find_page(collection, query: Dict[str, Any], sort_field: str, cursor: Optional[str] = None, projection: Optional[Dict[str, Any]] = None):
+    """Build a Motor cursor over documents after the keyset cursor, newest first"""
+    return collection.find(
+        keyset_query(query, sort_field, cursor),
+        {"_id": 0, **(projection or {})}
+    ).sort([(sort_field, DESCENDING), ("id", DESCENDING)])
+
+async def fetch_page(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page and the cursor for the next one (None on the last page)"""
+    # Read one extra document to know whether another page exists
+    docs = await find_page(collection, query, sort_field, cursor, projection).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = encode_cursor(docs[limit - 1], sort_field) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+async def ndjson_stream(mongo_cursor, transform: Optional[Callable[[Dict[str, Any]], Any]] = None) -> AsyncIterator[bytes]:
+    """Encode documents as newline-delimited JSON as the Mongo cursor yields them"""
+    async for doc in mongo_cursor:
+        item = transform(doc) if transform else doc
+        yield encode_json(item) + b"\n"
+
+def wants_ndjson(accept: Optional[str]) -> bool:
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
@@ -0,0 +1,215 @@
+import asyncio
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, AsyncIterator
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Profiling is off unless a token is configured; requests opt in by presenting it
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', '/tmp/genefit-profiles'))
+PROFILE_INTERVAL_SECONDS = float(os.environ.get('PROFILE_INTERVAL_SECONDS', '0.005'))
+
+PROFILE_TOKEN_HEADER = "x-profile-token"
+
+# Innermost frames of threads parked with nothing to do; their samples are dropped
+IDLE_FRAMES = {("thread.py", "_worker"), ("threading.py", "wait"), ("selectors.py", "select")}
+
+# tracemalloc is process-wide, so only one profile runs at a time
+_active = threading.Lock()
+
+def is_authorized(token: Optional[str]) -> bool:
+    return bool(PROFILING_TOKEN) and token is not None and hmac.compare_digest(token, PROFILING_TOKEN)
+
+def new_profile_id(request_id: Optional[str] = None) -> str:
+    """Use the caller's request ID when it is safe as a file name, otherwise a fresh one"""
+    if request_id and re.fullmatch(r'[A-Za-z0-9._-]{1,64}', request_id):
+        return request_id
+    return uuid.uuid4().hex
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+class SamplingProfiler:
+    """Samples every thread's Python stack on a timer thread into collapsed-stack counts
+
+    Work in the process pool used for whole-genome parsing is not visible
+    here; the parent's time waiting on it is.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="genefit-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's folded format, readable by flamegraph.pl and speedscope"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class Profile:
+    """One profiling session: stack samples plus tracemalloc peak memory"""
+
+    def __init__(self, profile_id: str, scope: str):
+        self.profile_id = profile_id
+        self.scope = scope
+        self.profiler = SamplingProfiler()
+        self._started_tracing = False
+        self._finished = False
+
+    def start(self) -> bool:
+        """Begin profiling; False when another profile already holds tracemalloc"""
+        if not _active.acquire(blocking=False):
+            logger.warning(f"Skipping profile {self.profile_id} for {self.scope}: another profile is running")
+            self._finished = True
+            return False
+
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self.started_at = datetime.utcnow()
+        self._start = time.perf_counter()
+        self.profiler.start()
+        return True
+
+    async def finish(self):
+        """Stop profiling and write the results; safe to call more than once"""
+        if self._finished:
+            return
+        self._finished = True
+        try:
+            self.profiler.stop()
+            duration = time.perf_counter() - self._start
+            _, peak = tracemalloc.get_traced_memory()
+            # Snapshotting a large heap and writing the files can take seconds; keep it off the event loop
+            await asyncio.to_thread(self._write, duration, peak)
+            logger.info(f"Wrote profile {self.profile_id} for {self.scope} to {PROFILE_DIR}")
+        except Exception as e:
+            logger.error(f"Could not write profile {self.profile_id}: {e}")
+        finally:
+            # Only now is tracemalloc free for the next profile
+            _active.release()
+
+    def _write(self, duration: float, peak: int):
+        try:
+            top = tracemalloc.take_snapshot().statistics("lineno")[:20]
+        finally:
+            if self._started_tracing:
+                tracemalloc.stop()
+
+        write_profile(self.profile_id, self.profiler.collapsed(), {
+            "profile_id": self.profile_id,
+            "scope": self.scope,
+            "started_at": self.started_at.isoformat(),
+            "duration_seconds": round(duration, 3),
+            "samples": self.profiler.samples,
+            "interval_seconds": self.profiler.interval,
+            "peak_memory_bytes": peak,
+            "top_allocations": [{"site": str(stat.traceback), "bytes": stat.size, "count": stat.count} for stat in top],
+            "collapsed": f"{self.profile_id}.collapsed",
+        })
+
+@asynccontextmanager
+async def profiled(profile_id: Optional[str], scope: str) -> AsyncIterator[None]:
+    """Profile the block into PROFILE_DIR under profile_id; a no-op when profile_id is None"""
+    if profile_id is None:
+        yield
+        return
+    profile = Profile(profile_id, scope)
+    profile.start()
+    try:
+        yield
+    finally:
+        await profile.finish()
+
+def write_profile(profile_id: str, collapsed: str, summary: Dict[str, Any]):
+    """Write the stacks and summary, and index the profile by its ID"""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    (PROFILE_DIR / f"{profile_id}.collapsed").write_text(collapsed)
+    (PROFILE_DIR / f"{profile_id}.json").write_text(json.dumps(summary, indent=2))
+
+    entry = {key: summary[key] for key in ("profile_id", "scope", "started_at", "duration_seconds", "peak_memory_bytes")}
+    with open(PROFILE_DIR / "index.jsonl", "a") as index:
+        index.write(json.dumps(entry) + "\n")
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that carry a valid X-Profile-Token
+
+    The profile ID (the caller's X-Request-ID when usable) is returned in
+    X-Profile-ID and left in request.state.profile_id for endpoints that
+    queue jobs, so a job profile can be filed under the same ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILING_TOKEN:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        if not is_authorized(headers.get(PROFILE_TOKEN_HEADER)):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = new_profile_id(headers.get("x-request-id"))
+        scope.setdefault("state", {})["profile_id"] = profile_id
+        profile = Profile(profile_id, f"{scope['method']} {scope['path']}")
+        running = profile.start()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and running:
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+            # Background tasks run after this; queued jobs are profiled separately
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                await profile.finish()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await profile.finish()
@@ -0,0 +1,244 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+from collections import Counter as ShapeCounter
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterator
+import bson
+from pymongo import monitoring
+from services.metrics import REGISTRY, Counter, Histogram
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Same-shape queries inside one request or job at which they are reported as N+1
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', '5'))
+
+# off: no budget checks; warn: log over-budget scopes; enforce: fail them (for test runs)
+QUERY_BUDGET_MODE = os.environ.get('QUERY_BUDGET_MODE', 'warn')
+
+# on: count reply bytes per scope; re-encodes every reply to BSON, so it's for profiling runs only
+QUERY_TRACE_REPLY_BYTES = os.environ.get('QUERY_TRACE_REPLY_BYTES', 'off') == 'on'
+
+# Driver chatter that isn't issued by application code
+IGNORED_COMMANDS = {"hello", "isMaster", "ismaster", "ping", "endSessions", "saslStart", "saslContinue"}
+
+MONGO_OPERATIONS = REGISTRY.register(Histogram(
+    "genefit_mongo_operations_per_scope", "Mongo operations issued by one request or job",
+    ["scope"], buckets=(1, 2, 5, 10, 20, 50, 100, 250, 1000)
+))
+MONGO_SECONDS = REGISTRY.register(Histogram(
+    "genefit_mongo_seconds_per_scope", "Total Mongo round-trip time of one request or job", ["scope"]
+))
+MONGO_REPLY_BYTES = REGISTRY.register(Counter(
+    "genefit_mongo_reply_bytes_total", "BSON bytes returned by Mongo, by request or job (with QUERY_TRACE_REPLY_BYTES=on)", ["scope"]
+))
+MONGO_N_PLUS_ONE = REGISTRY.register(Counter(
+    "genefit_mongo_n_plus_one_total", "Query shapes repeated at least N_PLUS_ONE_THRESHOLD times in one request or job", ["scope"]
+))
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+def _shape(value: Any) -> str:
+    """Structure of a filter or pipeline with every literal replaced by ?"""
+    if isinstance(value, dict):
+        return '{' + ', '.join(f'{key}: {_shape(item)}' for key, item in value.items()) + '}'
+    if isinstance(value, list):
+        # $in lists and bulk writes of any length share a shape
+        return '[' + ', '.join(sorted({_shape(item) for item in value})) + ']'
+    return '?'
+
+def command_shape(name: str, command: Dict[str, Any]) -> str:
+    collection = command.get(name)
+    if name in ("update", "delete"):
+        statements = command.get("updates" if name == "update" else "deletes") or [{}]
+        selector = [statement.get("q") for statement in statements]
+    elif name == "aggregate":
+        selector = command.get("pipeline")
+    elif name == "insert":
+        selector = None
+    else:
+        selector = command.get("filter", command.get("query"))
+    return f"{name} {collection} {_shape(selector)}" if selector is not None else f"{name} {collection}"
+
+class QueryTrace:
+    """Mongo operations attributed to one request or background job"""
+
+    def __init__(self, scope: str, budget: Optional[int] = None):
+        self.scope = scope
+        self.budget = budget
+        self.count = 0
+        self.seconds = 0.0
+        self.reply_bytes = 0
+        self.shapes: ShapeCounter = ShapeCounter()
+        self.closed = False
+        # Commands run concurrently on Motor's executor threads
+        self._lock = threading.Lock()
+        self._pending: Dict[int, str] = {}
+
+    def started(self, request_id: int, shape: Optional[str]):
+        with self._lock:
+            self._pending[request_id] = shape
+
+    def finished(self, request_id: int, seconds: float, reply_bytes: int):
+        with self._lock:
+            shape = self._pending.pop(request_id, None)
+            self.count += 1
+            self.seconds += seconds
+            self.reply_bytes += reply_bytes
+            if shape:
+                self.shapes[shape] += 1
+
+    def repeated_shapes(self) -> Dict[str, int]:
+        return {shape: count for shape, count in self.shapes.items() if count >= N_PLUS_ONE_THRESHOLD}
+
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+    def budget_message(self) -> str:
+        return (
+            f"{self.scope} issued {self.count} Mongo operations, budget is {self.budget}; "
+            f"most repeated: {self.shapes.most_common(3)}"
+        )
+
+    def check_budget(self):
+        """Raise QueryBudgetExceeded if more operations were issued than budgeted"""
+        if self.over_budget():
+            raise QueryBudgetExceeded(self.budget_message())
+
+    def close(self):
+        """Stop attributing operations to this scope and report what it issued"""
+        self.closed = True
+        MONGO_OPERATIONS.observe(self.count, scope=self.scope)
+        MONGO_SECONDS.observe(self.seconds, scope=self.scope)
+        MONGO_REPLY_BYTES.inc(self.reply_bytes, scope=self.scope)
+
+        for shape, count in self.repeated_shapes().items():
+            MONGO_N_PLUS_ONE.inc(scope=self.scope)
+            logger.warning(f"N+1 query pattern in {self.scope}: '{shape}' ran {count} times")
+
+        if QUERY_BUDGET_MODE != 'off' and self.over_budget():
+            logger.warning(self.budget_message())
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries"'
+
+_current_trace: contextvars.ContextVar[Optional[QueryTrace]] = contextvars.ContextVar("query_trace", default=None)
+
+def current_trace() -> Optional[QueryTrace]:
+    return _current_trace.get()
+
+class QueryTracer(monitoring.CommandListener):
+    """Command listener crediting each operation to the active QueryTrace
+
+    Motor copies the calling task's context onto its executor threads, so the
+    trace set by the request or job is visible where the driver fires events.
+    """
+
+    def started(self, event):
+        trace = _current_trace.get()
+        if trace is None or trace.closed or event.command_name in IGNORED_COMMANDS:
+            return
+        shape = None if event.command_name == "getMore" else command_shape(event.command_name, event.command)
+        trace.started(event.request_id, shape)
+
+    def succeeded(self, event):
+        trace = _current_trace.get()
+        if trace is None or trace.closed or event.command_name in IGNORED_COMMANDS:
+            return
+        # The driver doesn't expose the wire size, and re-encoding the reply costs as much as decoding it
+        reply_bytes = len(bson.encode(event.reply)) if QUERY_TRACE_REPLY_BYTES else 0
+        trace.finished(event.request_id, event.duration_micros / 1e6, reply_bytes)
+
+    def failed(self, event):
+        trace = _current_trace.get()
+        if trace is None or trace.closed or event.command_name in IGNORED_COMMANDS:
+            return
+        trace.finished(event.request_id, event.duration_micros / 1e6, 0)
+
+@contextmanager
+def query_trace(scope: str, budget: Optional[int] = None) -> Iterator[QueryTrace]:
+    """Attribute Mongo operations issued inside the block to a new scope"""
+    trace = QueryTrace(scope, budget)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.close()
+
+def traced_job(name: str, budget: Optional[int] = None):
+    """Run a background coroutine under its own trace instead of the request that queued it"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with query_trace(f"job:{name}", budget):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def query_budget(limit: int):
+    """Maximum Mongo operations an endpoint may issue, checked by QueryTraceMiddleware"""
+    def decorator(func):
+        func.query_budget = limit
+        return func
+    return decorator
+
+class QueryTraceMiddleware:
+    """ASGI middleware opening a QueryTrace per request and reporting it in Server-Timing
+
+    With QUERY_BUDGET_MODE=enforce a request that is over its endpoint's
+    query_budget when the response starts is answered with a 500 instead.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = QueryTrace(scope["method"])
+        token = _current_trace.set(trace)
+        replaced = False
+
+        def resolve():
+            # The router stores the matched route and endpoint in the shared scope
+            trace.scope = f"{scope['method']} {getattr(scope.get('route'), 'path', 'unmatched')}"
+            trace.budget = getattr(scope.get("endpoint"), "query_budget", None)
+
+        async def send_wrapper(message):
+            nonlocal replaced
+            if replaced:
+                return
+
+            if message["type"] == "http.response.start":
+                resolve()
+                if QUERY_BUDGET_MODE == 'enforce' and trace.over_budget():
+                    replaced = True
+                    body = json.dumps({"detail": trace.budget_message()}).encode()
+                    await send({
+                        "type": "http.response.start",
+                        "status": 500,
+                        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+                    })
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", trace.server_timing().encode())]
+
+            await send(message)
+            # Background tasks run after this; they trace themselves with traced_job
+            if message["type"] == "http.response.body" and not message.get("more_body") and not trace.closed:
+                trace.close()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            if not trace.closed:
+                resolve()
+                trace.close()
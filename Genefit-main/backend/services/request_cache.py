@@ -0,0 +1,30 @@
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterator, Tuple
+
+# Lookups shared by the sub-requests of one batch; None outside a batch
+_cache: contextvars.ContextVar[Optional[Dict[Tuple[str, str, str], asyncio.Future]]] = contextvars.ContextVar("request_cache", default=None)
+
+@contextmanager
+def request_cache() -> Iterator[None]:
+    """Share find_one_cached results between everything run inside the block"""
+    token = _cache.set({})
+    try:
+        yield
+    finally:
+        _cache.reset(token)
+
+async def find_one_cached(collection, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """find_one, issued once per batch for identical lookups (concurrent callers share the round trip)"""
+    cache = _cache.get()
+    if cache is None:
+        return await collection.find_one(query, projection)
+
+    key = (collection.name, repr(query), repr(projection))
+    future = cache.get(key)
+    if future is None:
+        future = cache[key] = asyncio.ensure_future(collection.find_one(query, projection))
+    doc = await asyncio.shield(future)
+    # Callers may add to what they get back
+    return dict(doc) if doc is not None else None
@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from models.dna import AnalysisStatus, GeneticMarker
+from services.dna_service import DNAAnalysisService, changed_markers
+from services.metrics import CACHE_REQUESTS
+from services.versioning import ResourceVersions, user_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PanelRescorer:
+    """Brings stored DNA reports up to the current marker panel without a re-upload"""
+
+    def __init__(self, db, dna_service: DNAAnalysisService):
+        self.db = db
+        self.dna_service = dna_service
+        self.running = False
+        self._panels: Dict[str, Dict[str, Any]] = {}
+        self.versions = ResourceVersions(db)
+
+    def claim(self) -> bool:
+        """Mark a run as started before it's scheduled; False if one already is
+
+        Checked and set without an await in between, so two requests can't both claim it.
+        """
+        if self.running:
+            return False
+        self.running = True
+        return True
+
+    def release(self):
+        self.running = False
+
+    async def register_panel(self):
+        """Record the current panel definition under its version"""
+        await self.db.marker_panels.update_one(
+            {"version": self.dna_service.panel_version},
+            {"$setOnInsert": {"markers": self.dna_service.health_markers, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def get_panel(self, version: Optional[str]) -> Dict[str, Any]:
+        """Panel definition for a version; reports from before versioning get an empty panel"""
+        if not version:
+            return {}
+        if version in self._panels:
+            CACHE_REQUESTS.inc(cache="marker_panel", result="hit")
+        else:
+            CACHE_REQUESTS.inc(cache="marker_panel", result="miss")
+            panel = await self.db.marker_panels.find_one({"version": version}, {"_id": 0, "markers": 1})
+            self._panels[version] = panel["markers"] if panel else {}
+        return self._panels[version]
+
+    async def load_genotypes(self, report_id: str) -> Optional[bytes]:
+        chunks = await self.db.dna_genotypes.find(
+            {"dna_report_id": report_id}, {"_id": 0, "data": 1}
+        ).sort("seq", 1).to_list(None)
+        return b''.join(chunk["data"] for chunk in chunks) if chunks else None
+
+    def stale_query(self) -> Dict[str, Any]:
+        return {"analysis_status": AnalysisStatus.ANALYZED, "panel_version": {"$ne": self.dna_service.panel_version}}
+
+    async def count_stale(self) -> int:
+        return await self.db.dna_reports.count_documents(self.stale_query())
+
+    async def rescore_report(self, report: Dict[str, Any]) -> Optional[List[GeneticMarker]]:
+        """Rescore one report; returns its new markers if the risk output changed, otherwise None"""
+        old_panel = await self.get_panel(report.get("panel_version"))
+        stored = [GeneticMarker(**marker) for marker in report.get("genetic_markers", [])]
+
+        # The genotype table is only needed for markers the report doesn't already carry
+        missing = changed_markers(old_panel, self.dna_service.health_markers) - {m.rsid for m in stored}
+        genotypes = await self.load_genotypes(report["id"]) if missing else None
+
+        markers = await asyncio.to_thread(self.dna_service.rescore, stored, old_panel, genotypes)
+
+        before = {marker["rsid"]: marker for marker in report.get("genetic_markers", [])}
+        if {m.rsid: m.dict() for m in markers} == before:
+            await self.db.dna_reports.update_one(
+                {"id": report["id"]},
+                {"$set": {"panel_version": self.dna_service.panel_version}}
+            )
+            await self.versions.bump(user_key(report["user_id"]), "dna_reports")
+            return None
+        return markers
+
+    async def rescore_stale(self, narrate: Callable[[Dict[str, Any], List[GeneticMarker]], Awaitable[None]], concurrency: int) -> Dict[str, int]:
+        """Rescore every stale report and hand the ones whose risk output changed to narrate"""
+        counts = {"scanned": 0, "unchanged": 0, "renarrated": 0, "failed": 0}
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = []
+
+        async def renarrate(report, markers):
+            try:
+                await narrate(report, markers)
+                counts["renarrated"] += 1
+            except Exception as e:
+                # The report keeps its old panel version, so the next run retries it
+                logger.error(f"Re-narration failed for report {report['id']}: {e}")
+                counts["failed"] += 1
+            finally:
+                semaphore.release()
+
+        self.running = True
+        try:
+            projection = {"_id": 0, "id": 1, "user_id": 1, "filename": 1, "provider": 1, "genetic_markers": 1, "panel_version": 1}
+            async for report in self.db.dna_reports.find(self.stale_query(), projection):
+                counts["scanned"] += 1
+                try:
+                    markers = await self.rescore_report(report)
+                except Exception as e:
+                    logger.error(f"Rescoring failed for report {report['id']}: {e}")
+                    counts["failed"] += 1
+                    continue
+
+                if markers is None:
+                    counts["unchanged"] += 1
+                    continue
+
+                # Only reports with changed risk output go back to the LLM, a few at a time
+                await semaphore.acquire()
+                tasks.append(asyncio.create_task(renarrate(report, markers)))
+
+            await asyncio.gather(*tasks)
+        finally:
+            self.release()
+
+        logger.info(f"Rescored reports against panel {self.dna_service.panel_version}: {counts}")
+        return counts
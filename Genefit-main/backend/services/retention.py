@@ -0,0 +1,209 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+from pymongo import ASCENDING, DESCENDING
+from models.dna import AnalysisStatus
+from services.wearable_service import WearableService
+from services.versioning import ResourceVersions, user_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Samples per rollup fold and report ids per delete, to keep each operation short
+RETENTION_BATCH_SIZE = 1000
+
+# How often the API process removes expired insights
+INSIGHT_EXPIRY_INTERVAL_SECONDS = float(os.environ.get('INSIGHT_EXPIRY_INTERVAL_SECONDS', '3600'))
+
+class RetentionPolicy:
+    """How long derived and raw data is kept; 0 days keeps it forever"""
+
+    def __init__(self, wearable_raw_days: int = 90, daily_insight_days: int = 30, keep_analysis_generations: int = 1):
+        self.wearable_raw_days = wearable_raw_days
+        self.daily_insight_days = daily_insight_days
+        self.keep_analysis_generations = max(keep_analysis_generations, 1)
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        return cls(
+            wearable_raw_days=int(os.environ.get('WEARABLE_RAW_RETENTION_DAYS', '90')),
+            daily_insight_days=int(os.environ.get('DAILY_INSIGHT_TTL_DAYS', '30')),
+            keep_analysis_generations=int(os.environ.get('KEEP_ANALYSIS_GENERATIONS', '1')),
+        )
+
+    def insight_expiry(self, created_at: datetime) -> Optional[datetime]:
+        return created_at + timedelta(days=self.daily_insight_days) if self.daily_insight_days else None
+
+    def wearable_cutoff(self, now: datetime) -> Optional[datetime]:
+        return now - timedelta(days=self.wearable_raw_days) if self.wearable_raw_days else None
+
+class RetentionService:
+    """TTL indexes for expiring data, plus the compaction TTL can't express
+
+    TTL removes raw wearable samples that were folded into the rollups on
+    ingest. Expired insights are deleted here rather than by TTL, since
+    their owners' resource versions must be bumped with them. Samples
+    stored before rollups existed are folded here first. Risk assessments
+    of a user's superseded DNA reports and genetic insight versions (all
+    but the newest keep_analysis_generations of each) are deleted.
+    """
+
+    def __init__(self, db, policy: RetentionPolicy):
+        self.db = db
+        self.policy = policy
+        self.wearable_service = WearableService(db)
+        self.versions = ResourceVersions(db)
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_ttl_indexes(self):
+        # The TTL monitor can't bump resource versions, so insights expire through expire_insights()
+        await self._ensure_ttl(self.db.ai_insights, "expires_at", None)
+        await self.db.ai_insights.create_index([("expires_at", ASCENDING)])
+        # Only samples already in the rollups may expire on their own
+        seconds = self.policy.wearable_raw_days * 86400 if self.policy.wearable_raw_days else None
+        await self._ensure_ttl(self.db.wearable_data, "recorded_at", seconds, {"rolled_up": True})
+
+    async def _ensure_ttl(self, collection, field: str, seconds: Optional[int], partial: Optional[Dict[str, Any]] = None):
+        name = f"{field}_ttl"
+        existing = (await collection.index_information()).get(name)
+        if seconds is None:
+            if existing:
+                await collection.drop_index(name)
+            return
+        if existing is None:
+            options = {"partialFilterExpression": partial} if partial else {}
+            await collection.create_index([(field, ASCENDING)], name=name, expireAfterSeconds=seconds, **options)
+        elif existing.get("expireAfterSeconds") != seconds:
+            # A changed policy retunes the index in place instead of rebuilding it
+            await self.db.command("collMod", collection.name, index={"name": name, "expireAfterSeconds": seconds})
+            logger.info(f"Retention for {collection.name}.{field} set to {seconds}s")
+
+    async def superseded_reports(self) -> Dict[str, List[str]]:
+        """Per user, analyzed reports older than their newest keep_analysis_generations"""
+        pipeline = [
+            {"$match": {"analysis_status": AnalysisStatus.ANALYZED}},
+            {"$sort": {"user_id": ASCENDING, "analyzed_at": DESCENDING}},
+            {"$group": {"_id": "$user_id", "reports": {"$push": "$id"}}},
+            {"$project": {"superseded": {"$slice": ["$reports", self.policy.keep_analysis_generations, 2 ** 31 - 1]}}},
+            {"$match": {"superseded.0": {"$exists": True}}},
+        ]
+        cursor = self.db.dna_reports.aggregate(pipeline, allowDiskUse=True)
+        return {doc["_id"]: doc["superseded"] async for doc in cursor}
+
+    async def superseded_insight_versions(self) -> List[Any]:
+        """_ids of genetic insight versions older than each user's newest keep_analysis_generations"""
+        pipeline = [
+            # Versions stored before numbering fall back to creation order
+            {"$sort": {"user_id": ASCENDING, "version": DESCENDING, "created_at": DESCENDING}},
+            {"$group": {"_id": "$user_id", "versions": {"$push": "$_id"}}},
+            {"$project": {"superseded": {"$slice": ["$versions", self.policy.keep_analysis_generations, 2 ** 31 - 1]}}},
+            {"$match": {"superseded.0": {"$exists": True}}},
+        ]
+        cursor = self.db.genetic_insights.aggregate(pipeline, allowDiskUse=True)
+        return [version_id async for doc in cursor for version_id in doc["superseded"]]
+
+    def _criteria(self, now: datetime) -> Dict[str, Any]:
+        """Collection and filter for each kind of reclaimable document outside analysis results"""
+        criteria = {"expired_insights": (self.db.ai_insights, {"expires_at": {"$lt": now}})}
+        cutoff = self.policy.wearable_cutoff(now)
+        if cutoff:
+            criteria["aged_wearable_samples"] = (self.db.wearable_data, {"recorded_at": {"$lt": cutoff}, "rolled_up": True})
+            criteria["unrolled_wearable_samples"] = (self.db.wearable_data, {"recorded_at": {"$lt": cutoff}, "rolled_up": {"$ne": True}})
+        return criteria
+
+    def _superseded_criteria(self, superseded: Dict[str, List[str]], insight_versions: List[Any]):
+        """Risk assessments of superseded reports and old insight versions, a batch of ids per filter"""
+        report_ids = [report_id for ids in superseded.values() for report_id in ids]
+        for start in range(0, len(report_ids), RETENTION_BATCH_SIZE):
+            query = {"dna_report_id": {"$in": report_ids[start:start + RETENTION_BATCH_SIZE]}}
+            yield "superseded_risk_assessments", self.db.health_risk_assessments, query
+        for start in range(0, len(insight_versions), RETENTION_BATCH_SIZE):
+            query = {"_id": {"$in": insight_versions[start:start + RETENTION_BATCH_SIZE]}}
+            yield "superseded_genetic_insights", self.db.genetic_insights, query
+
+    async def report(self) -> Dict[str, Dict[str, int]]:
+        """Dry run: documents and uncompressed BSON bytes each step would remove"""
+        now = datetime.utcnow()
+        steps = [(kind, collection, query) for kind, (collection, query) in self._criteria(now).items()]
+        steps += self._superseded_criteria(await self.superseded_reports(), await self.superseded_insight_versions())
+
+        results = {kind: {"documents": 0, "bytes": 0} for kind in ("superseded_risk_assessments", "superseded_genetic_insights")}
+        for kind, collection, query in steps:
+            totals = await collection.aggregate([
+                {"$match": query},
+                {"$group": {"_id": None, "documents": {"$sum": 1}, "bytes": {"$sum": {"$bsonSize": "$$ROOT"}}}},
+            ]).to_list(1)
+            counted = results.setdefault(kind, {"documents": 0, "bytes": 0})
+            if totals:
+                counted["documents"] += totals[0]["documents"]
+                counted["bytes"] += totals[0]["bytes"]
+        return results
+
+    async def apply(self) -> Dict[str, int]:
+        """Fold unrolled old samples into the rollups, then delete everything the policy retires"""
+        now = datetime.utcnow()
+        superseded = await self.superseded_reports()
+        insight_versions = await self.superseded_insight_versions()
+        criteria = self._criteria(now)
+        removed = {"superseded_risk_assessments": 0, "superseded_genetic_insights": 0}
+
+        if "unrolled_wearable_samples" in criteria:
+            removed["unrolled_wearable_samples"] = await self._fold_unrolled(*criteria.pop("unrolled_wearable_samples"))
+
+        criteria.pop("expired_insights")
+        removed["expired_insights"] = await self.expire_insights(now)
+
+        for kind, (collection, query) in criteria.items():
+            removed[kind] = (await collection.delete_many(query)).deleted_count
+        for kind, collection, query in self._superseded_criteria(superseded, insight_versions):
+            removed[kind] += (await collection.delete_many(query)).deleted_count
+
+        # Stamp the users whose visible data changed, so cached responses revalidate
+        await self.versions.bump_many(map(user_key, superseded), "health_risk_assessments")
+
+        logger.info(f"Retention removed {removed}")
+        return removed
+
+    async def expire_insights(self, now: Optional[datetime] = None) -> int:
+        """Delete insights past their expires_at and bump their owners' ai_insights version"""
+        query = self._criteria(now or datetime.utcnow())["expired_insights"][1]
+        owners = await self.db.ai_insights.distinct("user_id", query)
+        if not owners:
+            return 0
+        deleted = (await self.db.ai_insights.delete_many(query)).deleted_count
+        await self.versions.bump_many(map(user_key, owners), "ai_insights")
+        return deleted
+
+    def start(self, interval: float = INSIGHT_EXPIRY_INTERVAL_SECONDS):
+        self._task = asyncio.create_task(self._expire_insights_periodically(interval))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _expire_insights_periodically(self, interval: float):
+        while True:
+            try:
+                expired = await self.expire_insights()
+                if expired:
+                    logger.info(f"Expired {expired} insights")
+            except Exception as e:
+                logger.error(f"Insight expiry failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def _fold_unrolled(self, collection, query: Dict[str, Any]) -> int:
+        """Add samples stored before rollups existed to the rollups, a batch at a time, then drop them"""
+        folded = 0
+        while True:
+            batch = await collection.find(query).limit(RETENTION_BATCH_SIZE).to_list(RETENTION_BATCH_SIZE)
+            if not batch:
+                return folded
+            # A crash between these two steps would count the batch twice on the next run
+            await self.wearable_service.update_rollups(batch)
+            await collection.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+            folded += len(batch)
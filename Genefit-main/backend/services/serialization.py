@@ -0,0 +1,30 @@
+from typing import Any, Dict
+from starlette.responses import Response
+from pydantic import BaseModel
+from bson import ObjectId
+import orjson
+
+def _default(obj: Any) -> Any:
+    """Fallback for types orjson doesn't encode natively"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def encode_json(content: Any) -> bytes:
+    """Encode Mongo documents/dicts straight to JSON bytes (datetimes, enums and UUIDs included)"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+def select_fields(doc: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """Pick the response fields from a document, filling in defaults for missing ones"""
+    return {field: doc.get(field, default) for field, default in defaults.items()}
+
+class FastJSONResponse(Response):
+    """JSON response that skips response_model re-validation and encodes with orjson"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
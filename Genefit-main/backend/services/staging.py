@@ -0,0 +1,85 @@
+import asyncio
+import mmap
+import os
+import tempfile
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, IO, Optional, Tuple, Union
+from fastapi import UploadFile
+import logging
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR = Path(os.environ.get('UPLOAD_STAGING_DIR', Path(tempfile.gettempdir()) / 'genefit-uploads'))
+
+# Uploads are copied to disk in chunks of this size
+CHUNK_SIZE = 1024 * 1024
+
+async def stage_upload(upload: UploadFile, check_size: Optional[Callable[[int], None]] = None) -> Tuple[str, int]:
+    """Spool an upload to the staging directory; returns (path, size in bytes)
+
+    check_size is called with the running size after every chunk and may raise
+    to abort the upload, in which case the partial file is removed.
+    """
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    suffix = ''.join(Path(upload.filename or '').suffixes[-2:])
+    path = STAGING_DIR / f"{uuid.uuid4()}{suffix}"
+
+    try:
+        # Starlette has already spooled the body; copying gigabytes from it must not block the event loop
+        size = await asyncio.to_thread(_copy_upload, upload.file, path, check_size)
+    except BaseException:
+        discard_staged(str(path))
+        raise
+
+    return str(path), size
+
+def _copy_upload(source: IO[bytes], path: Path, check_size: Optional[Callable[[int], None]]) -> int:
+    source.seek(0)
+    size = 0
+    with open(path, 'wb') as staged:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                return size
+            size += len(chunk)
+            if check_size:
+                check_size(size)
+            staged.write(chunk)
+
+def discard_staged(*paths: Optional[str]):
+    """Remove staged files once the job that needed them is done"""
+    for path in paths:
+        if not path:
+            continue
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove staged upload {path}: {e}")
+
+@contextmanager
+def map_file(fileobj: IO[bytes]) -> Iterator[Union[mmap.mmap, bytes]]:
+    """Memory-map an open file read-only (empty files can't be mapped)"""
+    if os.fstat(fileobj.fileno()).st_size == 0:
+        yield b''
+        return
+
+    buffer = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        yield buffer
+    finally:
+        buffer.close()
+
+def iter_mapped_lines(buffer: Union[mmap.mmap, bytes], start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+    """Scan lines straight out of a mapped buffer, decoding one line at a time"""
+    end = len(buffer) if end is None else end
+    pos = start
+    while pos < end:
+        newline = buffer.find(b'\n', pos, end)
+        if newline == -1:
+            newline = end
+        yield buffer[pos:newline].decode('utf-8', errors='replace')
+        pos = newline + 1
@@ -0,0 +1,192 @@
+import gzip
+import struct
+import zlib
+from collections import OrderedDict
+from typing import List, Dict, Optional, Iterator, IO, Tuple
+from services.metrics import CACHE_REQUESTS
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tabix linear index window: 2^14 = 16kbp
+LINEAR_SHIFT = 14
+
+def is_bgzf(fileobj: IO[bytes]) -> bool:
+    """BGZF blocks are gzip members with FEXTRA set and a 'BC' subfield"""
+    header = fileobj.read(16)
+    fileobj.seek(0)
+    return len(header) == 16 and header[:4] == b'\x1f\x8b\x08\x04' and header[12:14] == b'BC'
+
+def normalize_chromosome(name: str) -> str:
+    return name[3:] if name.lower().startswith('chr') else name
+
+class BGZFReader:
+    """Random access to a BGZF file by virtual offset, decompressing one block at a time"""
+
+    def __init__(self, fileobj: IO[bytes], cache_blocks: int = 64):
+        self.fileobj = fileobj
+        self.cache_blocks = cache_blocks
+        self._cache: "OrderedDict[int, Tuple[bytes, int]]" = OrderedDict()
+
+    def read_block(self, coffset: int) -> Tuple[Optional[bytes], int]:
+        """Return (decompressed data, next block offset); data is None at end of file"""
+        cached = self._cache.get(coffset)
+        if cached is not None:
+            CACHE_REQUESTS.inc(cache="bgzf_block", result="hit")
+            self._cache.move_to_end(coffset)
+            return cached
+        CACHE_REQUESTS.inc(cache="bgzf_block", result="miss")
+
+        self.fileobj.seek(coffset)
+        header = self.fileobj.read(12)
+        if len(header) < 12:
+            return None, coffset
+        if header[:4] != b'\x1f\x8b\x08\x04':
+            raise ValueError(f"Invalid BGZF block at offset {coffset}")
+
+        xlen = struct.unpack('<H', header[10:12])[0]
+        extra = self.fileobj.read(xlen)
+        bsize = None
+        pos = 0
+        while pos + 4 <= xlen:
+            slen = struct.unpack('<H', extra[pos + 2:pos + 4])[0]
+            if extra[pos:pos + 2] == b'BC':
+                bsize = struct.unpack('<H', extra[pos + 4:pos + 6])[0] + 1
+            pos += 4 + slen
+        if bsize is None:
+            raise ValueError(f"BGZF block at offset {coffset} has no BSIZE")
+
+        payload = self.fileobj.read(bsize - 12 - xlen)
+        block = (zlib.decompress(payload[:-8], -15), coffset + bsize)
+
+        self._cache[coffset] = block
+        if len(self._cache) > self.cache_blocks:
+            self._cache.popitem(last=False)
+        return block
+
+    def iter_blocks(self, coffset: int = 0) -> Iterator[Tuple[int, bytes]]:
+        while True:
+            data, next_coffset = self.read_block(coffset)
+            if data is None:
+                return
+            yield coffset, data
+            coffset = next_coffset
+
+    def iter_lines(self, voffset: int) -> Iterator[bytes]:
+        """Yield lines starting at a virtual offset (compressed offset << 16 | offset in block)"""
+        uoffset = voffset & 0xFFFF
+        pending = b''
+        for _, data in self.iter_blocks(voffset >> 16):
+            lines = (pending + data[uoffset:]).split(b'\n')
+            uoffset = 0
+            pending = lines.pop()
+            yield from lines
+        if pending:
+            yield pending
+
+class TabixIndex:
+    """Per-chromosome tabix linear index: first record offset for every 16kbp window"""
+
+    def __init__(self, linear: Dict[str, List[int]]):
+        self.linear = {normalize_chromosome(name): offsets for name, offsets in linear.items()}
+
+    @classmethod
+    def from_tbi(cls, data: bytes) -> "TabixIndex":
+        """Read the linear index out of a .tbi file (bins are skipped)"""
+        data = gzip.decompress(data)
+        if data[:4] != b'TBI\x01':
+            raise ValueError("Not a tabix index")
+
+        n_ref, _, _, _, _, _, _, l_nm = struct.unpack_from('<8i', data, 4)
+        names = data[36:36 + l_nm].split(b'\x00')[:n_ref]
+        pos = 36 + l_nm
+
+        linear = {}
+        for name in names:
+            n_bin = struct.unpack_from('<i', data, pos)[0]
+            pos += 4
+            for _ in range(n_bin):
+                n_chunk = struct.unpack_from('<i', data, pos + 4)[0]
+                pos += 8 + n_chunk * 16
+            n_intv = struct.unpack_from('<i', data, pos)[0]
+            pos += 4
+            linear[name.decode()] = list(struct.unpack_from(f'<{n_intv}Q', data, pos))
+            pos += n_intv * 8
+
+        return cls(linear)
+
+    @classmethod
+    def build(cls, reader: BGZFReader) -> "TabixIndex":
+        """Index a sorted BGZF VCF with one sequential pass"""
+        linear: Dict[str, List[int]] = {}
+        pending = b''
+        line_start = None
+
+        for coffset, data in reader.iter_blocks():
+            pos = 0
+            while pos < len(data):
+                if line_start is None:
+                    line_start = (coffset << 16) | pos
+                newline = data.find(b'\n', pos)
+                if newline == -1:
+                    pending += data[pos:]
+                    break
+                cls._index_line(linear, pending + data[pos:newline], line_start)
+                pending = b''
+                line_start = None
+                pos = newline + 1
+
+        if pending:
+            cls._index_line(linear, pending, line_start)
+        return cls(linear)
+
+    @staticmethod
+    def _index_line(linear: Dict[str, List[int]], line: bytes, voffset: int):
+        if not line or line.startswith(b'#'):
+            return
+        fields = line.split(b'\t', 2)
+        if len(fields) < 3 or not fields[1].isdigit():
+            return
+
+        offsets = linear.setdefault(fields[0].decode(), [])
+        window = (int(fields[1]) - 1) >> LINEAR_SHIFT
+        # Empty windows point at the next record, which is past anything they could hold
+        while len(offsets) <= window:
+            offsets.append(voffset)
+
+    def query(self, reader: BGZFReader, targets: Dict[str, List[int]]) -> Iterator[bytes]:
+        """Yield the VCF lines at the given 1-based positions, decompressing only nearby blocks"""
+        for chromosome, positions in targets.items():
+            offsets = self.linear.get(normalize_chromosome(chromosome))
+            if not offsets:
+                continue
+
+            for position in sorted(set(positions)):
+                window = min((position - 1) >> LINEAR_SHIFT, len(offsets) - 1)
+                in_chromosome = False
+                for line in reader.iter_lines(offsets[window]):
+                    fields = line.split(b'\t', 2)
+                    if line.startswith(b'#') or len(fields) < 3:
+                        continue
+                    if normalize_chromosome(fields[0].decode()) != normalize_chromosome(chromosome):
+                        # Leading windows may point before the chromosome starts
+                        if in_chromosome:
+                            break
+                        continue
+                    in_chromosome = True
+                    record_position = int(fields[1])
+                    if record_position > position:
+                        break
+                    if record_position == position:
+                        yield line
+
+def load_or_build_index(fileobj: IO[bytes], index_data: Optional[bytes] = None) -> Tuple[BGZFReader, TabixIndex]:
+    """Use an uploaded .tbi, or build an index for this one read
+
+    Built indexes aren't kept: an upload is parsed once, so a cache keyed by
+    its content would never be hit again and would only grow.
+    """
+    reader = BGZFReader(fileobj)
+    if index_data:
+        return reader, TabixIndex.from_tbi(index_data)
+    return reader, TabixIndex.build(reader)
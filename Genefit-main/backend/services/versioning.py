@@ -0,0 +1,74 @@
+import hashlib
+import uuid
+from typing import Dict, Any, Iterable, Optional, Sequence
+from pymongo import UpdateOne
+from starlette.responses import Response
+from services.request_cache import find_one_cached
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Per-user collections whose writes are stamped, and what each read endpoint depends on
+USER_RESOURCES = ("users", "dna_reports", "health_plans", "ai_insights", "health_risk_assessments")
+DASHBOARD_RESOURCES = USER_RESOURCES
+
+def user_key(user_id: str) -> str:
+    return f"user:{user_id}"
+
+def plan_key(plan_id: str) -> str:
+    return f"health_plan:{plan_id}"
+
+class ResourceVersions:
+    """Version counters bumped on every write, so reads can answer If-None-Match without rebuilding
+
+    Each key (a user, a health plan) is one document of counters plus an
+    epoch, so a dropped or restored collection can't revive an old ETag.
+    """
+
+    def __init__(self, db):
+        self.collection = db.resource_versions
+
+    @staticmethod
+    def _update(resources: Sequence[str]) -> Dict[str, Any]:
+        return {"$inc": {resource: 1 for resource in resources}, "$setOnInsert": {"epoch": uuid.uuid4().hex[:12]}}
+
+    async def bump(self, key: str, *resources: str, session=None):
+        await self.collection.update_one({"_id": key}, self._update(resources), upsert=True, session=session)
+
+    async def bump_many(self, keys: Iterable[str], *resources: str, session=None):
+        """Bump the same resources for many keys in one round trip"""
+        operations = [UpdateOne({"_id": key}, self._update(resources), upsert=True) for key in set(keys)]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False, session=session)
+
+    async def get(self, key: str) -> Dict[str, Any]:
+        return await find_one_cached(self.collection, {"_id": key}) or {}
+
+def resource_etag(versions: Dict[str, Any], resources: Sequence[str], variant: str = "") -> str:
+    """Strong ETag from the counters a response depends on, plus anything else that shapes it (query, Accept)"""
+    stamp = '.'.join(str(versions.get(resource, 0)) for resource in resources)
+    if variant:
+        stamp += '.' + hashlib.blake2b(variant.encode(), digest_size=6).hexdigest()
+    return f'"{versions.get("epoch", "0")}.{stamp}"'
+
+def request_variant(request) -> str:
+    """Parts of a request, besides stored data, that change the response body"""
+    return f"{request.url.query}|{request.headers.get('accept', '')}"
+
+def etag_matches(if_none_match: Optional[str], etag: str, versions: Dict[str, Any]) -> bool:
+    """Whether the client's copy is current; versions is the document the ETag was built from"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        # "*" matches any current representation, and there is none without a version document
+        return bool(versions)
+    # Weak comparison, as If-None-Match requires
+    candidates = (candidate.strip() for candidate in if_none_match.split(','))
+    return any((candidate[2:] if candidate.startswith('W/') else candidate) == etag for candidate in candidates)
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    # Cacheable, but revalidated on every use
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
@@ -0,0 +1,130 @@
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+from pymongo import UpdateOne, ASCENDING, DESCENDING
+from models.health import Resolution
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Units for the wearable metrics we store
+WEARABLE_UNITS = {
+    "steps": "count",
+    "heart_rate": "bpm",
+    "sleep_hours": "hours",
+    "calories": "kcal",
+    "active_minutes": "minutes"
+}
+
+class WearableService:
+    def __init__(self, db):
+        self.db = db
+        # Rollup collections maintained on ingest, keyed by resolution
+        self.rollup_collections = {
+            Resolution.HOURLY: db.wearable_rollups_hourly,
+            Resolution.DAILY: db.wearable_rollups_daily,
+        }
+
+    async def ensure_indexes(self):
+        """Create indexes used by wearable ingest and queries"""
+        await self.db.wearable_data.create_index(
+            [("user_id", ASCENDING), ("recorded_at", DESCENDING), ("id", DESCENDING)]
+        )
+        for collection in self.rollup_collections.values():
+            await collection.create_index(
+                [("user_id", ASCENDING), ("data_type", ASCENDING), ("bucket", ASCENDING)],
+                unique=True
+            )
+            await collection.create_index([("user_id", ASCENDING), ("bucket", ASCENDING)])
+
+    async def ingest(self, entries: List[Dict[str, Any]]) -> int:
+        """Store raw wearable samples and fold them into the hourly/daily rollups"""
+        if not entries:
+            return 0
+
+        # Flagged so the raw-sample TTL may expire them; the rollups below already hold their totals
+        for entry in entries:
+            entry["rolled_up"] = True
+        await self.db.wearable_data.insert_many(entries)
+        await self.update_rollups(entries)
+        return len(entries)
+
+    async def update_rollups(self, entries: List[Dict[str, Any]]):
+        """Upsert min/max/sum/count per (user, metric, bucket) for every resolution"""
+        for resolution, collection in self.rollup_collections.items():
+            operations = [
+                UpdateOne(
+                    {"user_id": user_id, "data_type": data_type, "bucket": bucket},
+                    {
+                        "$inc": {"count": stats["count"], "sum": stats["sum"]},
+                        "$min": {"min": stats["min"]},
+                        "$max": {"max": stats["max"]},
+                        "$set": {"unit": stats["unit"]},
+                    },
+                    upsert=True
+                )
+                for (user_id, data_type, bucket), stats in self._aggregate(entries, resolution).items()
+            ]
+            if operations:
+                await collection.bulk_write(operations, ordered=False)
+
+    async def get_series(
+        self,
+        user_id: str,
+        start_date: datetime,
+        resolution: Resolution,
+        data_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Read pre-aggregated points for a user since start_date"""
+        query: Dict[str, Any] = {"user_id": user_id, "bucket": {"$gte": start_date}}
+        if data_type:
+            query["data_type"] = data_type
+
+        cursor = self.rollup_collections[resolution].find(query, {"_id": 0}).sort("bucket", ASCENDING)
+
+        points = []
+        async for doc in cursor:
+            points.append(self.to_rollup(doc, resolution))
+        return points
+
+    @staticmethod
+    def to_rollup(doc: Dict[str, Any], resolution: Resolution) -> Dict[str, Any]:
+        """Build the API view of a stored rollup document"""
+        count = doc.get("count", 0)
+        total = doc.get("sum", 0.0)
+        return {
+            "user_id": doc["user_id"],
+            "data_type": doc["data_type"],
+            "resolution": resolution,
+            "bucket": doc["bucket"],
+            "unit": doc.get("unit", "unit"),
+            "count": count,
+            "sum": total,
+            "min": doc["min"],
+            "max": doc["max"],
+            "avg": total / count if count else 0.0
+        }
+
+    @staticmethod
+    def bucket_start(recorded_at: datetime, resolution: Resolution) -> datetime:
+        """Truncate a timestamp to the start of its rollup bucket"""
+        if resolution == Resolution.DAILY:
+            return recorded_at.replace(hour=0, minute=0, second=0, microsecond=0)
+        return recorded_at.replace(minute=0, second=0, microsecond=0)
+
+    def _aggregate(self, entries: List[Dict[str, Any]], resolution: Resolution) -> Dict[Tuple[str, str, datetime], Dict[str, Any]]:
+        """Pre-aggregate a batch in memory so each bucket costs one upsert"""
+        buckets: Dict[Tuple[str, str, datetime], Dict[str, Any]] = {}
+
+        for entry in entries:
+            key = (entry["user_id"], entry["data_type"], self.bucket_start(entry["recorded_at"], resolution))
+            value = float(entry["value"])
+            stats = buckets.get(key)
+            if stats is None:
+                buckets[key] = {"count": 1, "sum": value, "min": value, "max": value, "unit": entry["unit"]}
+            else:
+                stats["count"] += 1
+                stats["sum"] += value
+                stats["min"] = min(stats["min"], value)
+                stats["max"] = max(stats["max"], value)
+
+        return buckets
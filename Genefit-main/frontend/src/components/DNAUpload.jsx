@@ -9,7 +9,7 @@ import { useApp } from '../contexts/AppContext';
 import DNAStrand from './DNAStrand';
 
 const DNAUpload = ({ onUploadComplete }) => {
-  const { user, refreshDashboard } = useApp();
+  const { user, refreshDashboard, liveConnected, subscribeToUpdates } = useApp();
   const [selectedFile, setSelectedFile] = useState(null);
   const [selectedProvider, setSelectedProvider] = useState('');
   const [uploadProgress, setUploadProgress] = useState(0);
@@ -60,27 +60,34 @@ const DNAUpload = ({ onUploadComplete }) => {
     }
   };
 
-  const startAnalysisTracking = (reportId) => {
-    // Track analysis progress
+  // Returns true once the analysis has finished either way
+  const handleAnalysisStatus = async (status) => {
+    if (status.status === 'analyzed') {
+      setShowSuccess(true);
+      await refreshDashboard(); // Refresh dashboard with new data
+      setTimeout(() => {
+        onUploadComplete && onUploadComplete();
+      }, 2000);
+      return true;
+    }
+    if (status.status === 'failed') {
+      setError('Analysis failed. Please try again.');
+      setIsUploading(false);
+      return true;
+    }
+    // Update progress based on markers analyzed
+    const progressSteps = Math.floor((status.progress / 100) * dnaUploadSteps.length);
+    setAnalysisStep(progressSteps);
+    return false;
+  };
+
+  // Poll analysis progress until it finishes
+  const pollAnalysisStatus = (reportId) => {
     const analysisTimer = setInterval(async () => {
       try {
         const status = await dnaAPI.getStatus(reportId);
-        
-        if (status.status === 'analyzed') {
-          clearInterval(analysisTimer);
-          setShowSuccess(true);
-          await refreshDashboard(); // Refresh dashboard with new data
-          setTimeout(() => {
-            onUploadComplete && onUploadComplete();
-          }, 2000);
-        } else if (status.status === 'failed') {
+        if (await handleAnalysisStatus(status)) {
           clearInterval(analysisTimer);
-          setError('Analysis failed. Please try again.');
-          setIsUploading(false);
-        } else {
-          // Update progress based on markers analyzed
-          const progressSteps = Math.floor((status.progress / 100) * dnaUploadSteps.length);
-          setAnalysisStep(progressSteps);
         }
       } catch (err) {
         console.error('Error tracking analysis:', err);
@@ -88,6 +95,57 @@ const DNAUpload = ({ onUploadComplete }) => {
     }, 2000);
   };
 
+  const startAnalysisTracking = (reportId) => {
+    if (!liveConnected) {
+      pollAnalysisStatus(reportId);
+      return;
+    }
+
+    // Follow pushed report updates while the live channel is up
+    let finished = false;
+    const checkStatus = () => {
+      dnaAPI.getStatus(reportId)
+        .then(async (status) => {
+          if (!finished && await handleAnalysisStatus(status)) {
+            finished = true;
+            unsubscribe();
+          }
+        })
+        .catch((err) => console.error('Error tracking analysis:', err));
+    };
+
+    const unsubscribe = subscribeToUpdates(async (message) => {
+      if (finished) {
+        return;
+      }
+      // Updates may have been missed; read the status rather than wait for the next push
+      if (message.type === 'resync') {
+        checkStatus();
+        return;
+      }
+      // The socket dropped, so nothing more will be pushed to this subscription
+      if (message.type === 'disconnected') {
+        finished = true;
+        unsubscribe();
+        pollAnalysisStatus(reportId);
+        return;
+      }
+      if (message.type !== 'dna_reports' || message.data.id !== reportId) {
+        return;
+      }
+      const { analysis_status, markers_analyzed = 0, total_markers = 0 } = message.data;
+      if (await handleAnalysisStatus({
+        status: analysis_status,
+        progress: (markers_analyzed / Math.max(total_markers, 1)) * 100
+      })) {
+        finished = true;
+        unsubscribe();
+      }
+    });
+    // Catch a status change that landed before the subscription
+    checkStatus();
+  };
+
   const supportedFormats = [
     { name: '23andMe', format: '.txt', icon: '🧬', value: 'twenty_three_and_me' },
     { name: 'AncestryDNA', format: '.txt', icon: '🌳', value: 'ancestry_dna' },
@@ -198,7 +256,7 @@ const DNAUpload = ({ onUploadComplete }) => {
                         Drag and drop your file here, or click to browse
                       </p>
                       <p className="text-sm text-gray-500">
-                        Supported formats: .txt, .csv, .vcf (Max 50MB)
+                        Supported formats: .txt, .csv, .vcf, .zip, .gz (Max 50MB)
                       </p>
                     </div>
                   </div>
@@ -207,7 +265,7 @@ const DNAUpload = ({ onUploadComplete }) => {
                 <input
                   id="file-input"
                   type="file"
-                  accept=".txt,.csv,.vcf"
+                  accept=".txt,.csv,.vcf,.zip,.gz,.bgz"
                   onChange={handleFileSelect}
                   className="hidden"
                 />
@@ -1,8 +1,57 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
-import { userAPI, dashboardAPI } from '../services/api';
+import React, { createContext, useContext, useState, useEffect, useRef } from 'react';
+import { userAPI, dashboardAPI, liveAPI, batchAPI } from '../services/api';
 
 const AppContext = createContext();
 
+// Wearable sample types and the dashboard summary fields they update
+const WEARABLE_SUMMARY_FIELDS = {
+  steps: 'steps',
+  heart_rate: 'heart_rate',
+  sleep_hours: 'sleep',
+  calories: 'calories',
+  active_minutes: 'active_minutes'
+};
+
+// Close code the server uses when it can't push updates; keep polling instead
+const LIVE_UNAVAILABLE = 1013;
+
+const upsertById = (items = [], item) => {
+  const index = items.findIndex((existing) => existing.id === item.id);
+  if (index === -1) {
+    return [item, ...items];
+  }
+  const updated = [...items];
+  updated[index] = { ...updated[index], ...item };
+  return updated;
+};
+
+// Fold one pushed delta into the dashboard data
+const applyDashboardUpdate = (dashboard, message) => {
+  const { type, data } = message;
+  switch (type) {
+    case 'dna_reports':
+      return { ...dashboard, dna_reports: upsertById(dashboard.dna_reports, data) };
+    case 'health_plans': {
+      const plans = upsertById(dashboard.health_plans, data);
+      return { ...dashboard, health_plans: plans.filter((plan) => plan.is_active !== false) };
+    }
+    case 'ai_insights':
+      return { ...dashboard, insights: upsertById(dashboard.insights, data).slice(0, 5) };
+    case 'wearable_data': {
+      const wearableData = { ...dashboard.wearable_data };
+      Object.values(data.latest).forEach((sample) => {
+        const field = WEARABLE_SUMMARY_FIELDS[sample.data_type];
+        if (field) {
+          wearableData[field] = sample.value;
+        }
+      });
+      return { ...dashboard, wearable_data: wearableData };
+    }
+    default:
+      return dashboard;
+  }
+};
+
 export const useApp = () => {
   const context = useContext(AppContext);
   if (!context) {
@@ -16,6 +65,8 @@ export const AppProvider = ({ children }) => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [dashboardData, setDashboardData] = useState(null);
+  const [liveConnected, setLiveConnected] = useState(false);
+  const liveListeners = useRef(new Set());
 
   // Create or get user (simplified for demo - in production you'd have proper auth)
   const initializeUser = async (userData) => {
@@ -73,6 +124,83 @@ export const AppProvider = ({ children }) => {
     }
   };
 
+  // Components can follow pushed updates (e.g. DNA analysis progress) instead of polling
+  const subscribeToUpdates = (listener) => {
+    liveListeners.current.add(listener);
+    return () => liveListeners.current.delete(listener);
+  };
+
+  // Keep the dashboard current from pushed deltas rather than re-fetching it
+  useEffect(() => {
+    if (!user) {
+      return undefined;
+    }
+
+    let socket;
+    let retryTimer;
+    let retryDelay = 1000;
+    let closed = false;
+
+    const connect = () => {
+      socket = liveAPI.dashboardSocket(user.id);
+
+      socket.onopen = () => {
+        retryDelay = 1000;
+        setLiveConnected(true);
+      };
+
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        liveListeners.current.forEach((listener) => listener(message));
+
+        // Missed updates, or a finished analysis whose risk assessments aren't pushed
+        if (message.type === 'resync' || (message.type === 'dna_reports' && message.data.analysis_status === 'analyzed')) {
+          loadDashboardData(user.id);
+          return;
+        }
+        setDashboardData((current) => (current ? applyDashboardUpdate(current, message) : current));
+      };
+
+      socket.onclose = (event) => {
+        setLiveConnected(false);
+        // Followers fall back to polling until they start over
+        liveListeners.current.forEach((listener) => listener({ type: 'disconnected' }));
+        if (closed || event.code === LIVE_UNAVAILABLE) {
+          return;
+        }
+        retryTimer = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      };
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      socket.close();
+    };
+  }, [user?.id]);
+
+  // Refresh the stored user and the dashboard in one round trip
+  const loadStartupData = async (userId) => {
+    try {
+      const parts = await batchAPI.get({
+        user: `/users/${userId}`,
+        dashboard: `/dashboard/${userId}`
+      });
+      if (parts.user.status === 200) {
+        setUser(parts.user.body);
+        localStorage.setItem('genefit_user', JSON.stringify(parts.user.body));
+      }
+      if (parts.dashboard.status === 200) {
+        setDashboardData(parts.dashboard.body);
+      }
+    } catch (err) {
+      console.error('Error loading start-up data:', err);
+    }
+  };
+
   // Initialize user from localStorage on app start
   useEffect(() => {
     const storedUser = localStorage.getItem('genefit_user');
@@ -80,7 +208,7 @@ export const AppProvider = ({ children }) => {
       try {
         const userData = JSON.parse(storedUser);
         setUser(userData);
-        loadDashboardData(userData.id);
+        loadStartupData(userData.id);
       } catch (err) {
         console.error('Error loading stored user:', err);
         localStorage.removeItem('genefit_user');
@@ -93,6 +221,8 @@ export const AppProvider = ({ children }) => {
     loading,
     error,
     dashboardData,
+    liveConnected,
+    subscribeToUpdates,
     initializeUser,
     updateUser,
     refreshDashboard,
@@ -30,11 +30,14 @@ export const userAPI = {
 
 // DNA API
 export const dnaAPI = {
-  upload: async (userId, provider, file) => {
+  upload: async (userId, provider, file, indexFile = null) => {
     const formData = new FormData();
     formData.append('user_id', userId);
     formData.append('provider', provider);
     formData.append('file', file);
+    if (indexFile) {
+      formData.append('index_file', indexFile);
+    }
     
     const response = await api.post('/dna/upload', formData, {
       headers: {
@@ -97,6 +100,22 @@ export const dashboardAPI = {
   }
 };
 
+// Batch API: several reads in one round trip
+export const batchAPI = {
+  get: async (requests) => {
+    const response = await api.post('/batch', {
+      requests: Object.entries(requests).map(([id, path]) => ({ id, path: `/api${path}` }))
+    });
+    // Keyed by request name; failed parts keep their status and error detail
+    return Object.fromEntries(response.data.responses.map((part) => [part.id, part]));
+  }
+};
+
+// Live dashboard updates
+export const liveAPI = {
+  dashboardSocket: (userId) => new WebSocket(`${API.replace(/^http/, 'ws')}/ws/dashboard/${userId}`)
+};
+
 // Wearables API
 export const wearablesAPI = {
   sync: async (userId, deviceData) => {
@@ -104,8 +123,28 @@ export const wearablesAPI = {
     return response.data;
   },
   
-  getData: async (userId, days = 7) => {
-    const response = await api.get(`/wearables/${userId}?days=${days}`);
+  importExport: async (userId, source, file) => {
+    const formData = new FormData();
+    formData.append('source', source);
+    formData.append('file', file);
+    
+    const response = await api.post(`/wearables/import/${userId}`, formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return response.data;
+  },
+  
+  getImportStatus: async (importId) => {
+    const response = await api.get(`/wearables/import/status/${importId}`);
+    return response.data;
+  },
+  
+  getData: async (userId, days = 7, resolution = 'raw') => {
+    const response = await api.get(`/wearables/${userId}`, {
+      params: { days, resolution },
+    });
     return response.data;
   }
 };
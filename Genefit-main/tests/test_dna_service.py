@@ -0,0 +1,31 @@
+from services.dna_service import reference_build, split_line_ranges
+
+def test_reference_build_from_reference_line():
+    assert reference_build('##reference=GRCh37') == 'GRCh37'
+    assert reference_build('##reference=file:///ref/hg38.fa') == 'GRCh38'
+    assert reference_build('##reference=file:///ref/human_g1k_v37.fasta') == 'GRCh37'
+
+def test_reference_build_from_contig_lines():
+    assert reference_build('##contig=<ID=1,length=249250621,assembly=b37>') == 'GRCh37'
+    assert reference_build('##contig=<ID=chr1,length=248956422>') == 'GRCh38'
+    # Only chromosome 1's length identifies the build
+    assert reference_build('##contig=<ID=2,length=243199373>') is None
+
+def test_reference_build_ignores_other_lines():
+    assert reference_build('##fileformat=VCFv4.2') is None
+    assert reference_build('#CHROM\tPOS\tID\tREF\tALT') is None
+    assert reference_build('##reference=unknown.fa') is None
+
+def test_split_line_ranges_covers_buffer_on_line_boundaries():
+    buffer = b''.join(f"rs{i}\t1\t{i}\tAA\n".encode() for i in range(1000))
+    ranges = split_line_ranges(buffer, 7)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(buffer)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert buffer[end - 1:end] == b'\n'
+
+def test_split_line_ranges_small_buffers():
+    assert split_line_ranges(b'', 4) == []
+    # A single line can't be split, so it comes back as one range
+    assert split_line_ranges(b'rs1\t1\t1\tAA\n', 4) == [(0, 11)]
+    assert split_line_ranges(b'no trailing newline', 3) == [(0, 19)]
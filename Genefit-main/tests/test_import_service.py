@@ -0,0 +1,25 @@
+import io
+import json
+from services.import_service import HealthExportImporter
+
+def iter_array(data: bytes, key: str, chunk_size: int):
+    return list(HealthExportImporter(None)._iter_json_array(io.BytesIO(data), key, chunk_size))
+
+def test_yields_objects_of_the_named_array():
+    data = json.dumps({"meta": {"data": "not this"}, "data": [{"a": 1}, {"b": [2, 3]}, {"c": {"d": 4}}]}).encode()
+    assert iter_array(data, "data", 1 << 16) == [{"a": 1}, {"b": [2, 3]}, {"c": {"d": 4}}]
+
+def test_missing_key_yields_nothing():
+    assert iter_array(b'{"other": [1, 2]}', "data", 4) == []
+
+def test_objects_spanning_chunks():
+    objects = [{"id": i, "value": "x" * 50} for i in range(20)]
+    data = json.dumps({"data": objects}).encode()
+    assert iter_array(data, "data", 7) == objects
+
+def test_chunk_boundary_inside_multibyte_character():
+    objects = [{"name": "Zoë ✓ 🧬"}, {"name": "Søren"}]
+    data = json.dumps({"data": objects}, ensure_ascii=False).encode('utf-8')
+    # Every split point, so some chunk ends partway through each of the 2-, 3- and 4-byte characters
+    for chunk_size in range(1, 12):
+        assert iter_array(data, "data", chunk_size) == objects
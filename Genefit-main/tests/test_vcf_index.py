@@ -0,0 +1,72 @@
+import gzip
+import io
+import struct
+import zlib
+import pytest
+from services.vcf_index import BGZFReader, TabixIndex, is_bgzf
+
+RECORDS = [
+    (b'1', 100), (b'1', 150), (b'1', 20000), (b'1', 40000),
+    (b'chr2', 500), (b'chr2', 70000),
+]
+
+def bgzf_block(data: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    payload = compressor.compress(data) + compressor.flush()
+    # gzip header with FEXTRA, a 6-byte 'BC' subfield holding the block size, then CRC32 and ISIZE
+    bsize = 12 + 6 + len(payload) + 8
+    header = b'\x1f\x8b\x08\x04' + b'\x00' * 4 + b'\x00\xff' + struct.pack('<H', 6) + b'BC' + struct.pack('<HH', 2, bsize - 1)
+    return header + payload + struct.pack('<II', zlib.crc32(data), len(data))
+
+def vcf_line(chromosome: bytes, position: int) -> bytes:
+    return chromosome + b'\t' + str(position).encode() + b'\trs' + str(position).encode() + b'\tA\tG\t.\t.\t.\tGT\t0/1'
+
+def make_vcf() -> io.BytesIO:
+    text = b'##fileformat=VCFv4.2\n#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tS1\n'
+    text += b''.join(vcf_line(chromosome, position) + b'\n' for chromosome, position in RECORDS)
+    # Small blocks, so records straddle block boundaries
+    blocks = [bgzf_block(text[start:start + 40]) for start in range(0, len(text), 40)]
+    return io.BytesIO(b''.join(blocks) + bgzf_block(b''))
+
+def make_tbi(linear) -> bytes:
+    names = b''.join(name.encode() + b'\x00' for name in linear)
+    data = b'TBI\x01' + struct.pack('<8i', len(linear), 2, 1, 2, 0, ord('#'), 0, len(names)) + names
+    for offsets in linear.values():
+        # One bin with one chunk, which from_tbi has to skip over
+        data += struct.pack('<i', 1) + struct.pack('<Ii', 4681, 1) + struct.pack('<QQ', 0, 0)
+        data += struct.pack('<i', len(offsets)) + struct.pack(f'<{len(offsets)}Q', *offsets)
+    return gzip.compress(data)
+
+def test_is_bgzf():
+    assert is_bgzf(make_vcf())
+    assert not is_bgzf(io.BytesIO(gzip.compress(b'plain gzip')))
+
+def test_iter_lines_across_blocks():
+    reader = BGZFReader(make_vcf())
+    lines = [line for line in reader.iter_lines(0) if line and not line.startswith(b'#')]
+    assert lines == [vcf_line(chromosome, position) for chromosome, position in RECORDS]
+
+def test_build_and_query():
+    reader = BGZFReader(make_vcf())
+    index = TabixIndex.build(reader)
+    assert set(index.linear) == {'1', '2'}
+
+    targets = {'chr1': [20000, 100, 99999], '2': [70000, 501]}
+    assert list(index.query(reader, targets)) == [
+        vcf_line(b'1', 100), vcf_line(b'1', 20000), vcf_line(b'chr2', 70000),
+    ]
+
+def test_query_unknown_chromosome():
+    reader = BGZFReader(make_vcf())
+    assert list(TabixIndex.build(reader).query(reader, {'X': [100]})) == []
+
+def test_from_tbi_matches_built_index():
+    reader = BGZFReader(make_vcf())
+    built = TabixIndex.build(reader)
+    loaded = TabixIndex.from_tbi(make_tbi({'1': built.linear['1'], 'chr2': built.linear['2']}))
+    assert loaded.linear == built.linear
+    assert list(loaded.query(reader, {'1': [40000]})) == [vcf_line(b'1', 40000)]
+
+def test_from_tbi_rejects_other_files():
+    with pytest.raises(ValueError):
+        TabixIndex.from_tbi(gzip.compress(b'BAI\x01'))